@@ -1,6 +1,6 @@
 from google.adk.agents import LlmAgent, BaseAgent
 from app.adk.instructions import SAHI_LOAN_AGENT_INSTRUCTIONS, APPLY_FOR_NEW_LOAN_AGENT_INSTRUCTIONS, APPLY_FOR_REFINANCE_AGENT_INSTRUCTIONS, GENERAL_QUERY_AGENT_INSTRUCTIONS, USER_DETAILS_AGENT_INSTRUCTIONS
-from app.adk.tools import get_user_details_tool, get_available_market_loans_tool, save_new_loan_request_tool, save_switch_loan_request_tool, web_search_tool
+from app.adk.tools import get_user_details_tool, get_available_market_loans_tool, get_refinance_options_tool, get_prepayment_scenario_tool, save_new_loan_request_tool, save_switch_loan_request_tool, web_search_tool
 
 model = "gemini-2.5-flash"
 
@@ -27,7 +27,7 @@ apply_for_refinance_agent = LlmAgent(
     description="Apply for refinance. Use when user wants to apply for refinance.",
     model=model,
     instruction=APPLY_FOR_REFINANCE_AGENT_INSTRUCTIONS,
-    tools=[get_available_market_loans_tool, save_switch_loan_request_tool],
+    tools=[get_refinance_options_tool, save_switch_loan_request_tool],
     output_key="refinance_loans_output"
 )
 
@@ -37,7 +37,7 @@ general_query_agent = LlmAgent(
     model=model,
     instruction=GENERAL_QUERY_AGENT_INSTRUCTIONS,
     output_key="general_query_output",
-    tools=[web_search_tool],
+    tools=[web_search_tool, get_prepayment_scenario_tool],
 )
 
 sahi_loan_agent = LlmAgent(
@@ -16,21 +16,22 @@ APPLY_FOR_REFINANCE_AGENT_INSTRUCTIONS = """
 - Wait for user response
 - Validate selection against available loans
 
-## Step 4: Fetch Available Market Loans
-- Use get_available_market_loans_tool with selected loan details:
-  * loan_type: Same as selected loan
-  * required_amount: Outstanding amount from selected loan
-  * preferred_tenure: Remaining tenure from selected loan
-  * preferred_interest_rate: Lower than current rate (aim 1-2% lower)
-
-  e.g. get_available_market_loans_tool(loan_type="Personal", required_amount=100000, preferred_tenure=3, preferred_interest_rate=9.5)
-
-## Step 5: Filter and Calculate
-- Only show offers with interest rate LOWER than current loan
-- Calculate for each offer:
-  * Monthly savings = Current EMI - New EMI
-  * Total savings = Monthly savings × remaining months
-  * Break-even = Processing fee ÷ Monthly savings
+## Step 4: Fetch Refinancing Options
+- Use get_refinance_options_tool with the selected loan:
+  * user_id: From user_details
+  * loan_id: ID of the selected loan
+  * top_k: 3
+
+  e.g. get_refinance_options_tool(user_id="550e8400-e29b-41d4-a716-446655440002", loan_id="123e4567-e89b-12d3-a456-426614174000", top_k=3)
+
+## Step 5: Use the Calculated Savings
+- The tool already calculated, for each offer:
+  * new_emi and monthly_savings = Current EMI - New EMI
+  * net_savings = Remaining payments on the current loan - Payments on the new loan - Processing fee - Foreclosure penalty
+  * break_even_month = First month the monthly savings cover the processing fee and foreclosure penalty (-1 means never)
+- NEVER recalculate these numbers, show them as returned
+- Offers are already sorted by net_savings and only include offers that save money
+- Total Savings below is net_savings
 
 ## Step 6: Present Top 3 Options
 Display:
@@ -66,7 +67,7 @@ Display:
   * user_id: From user_details
   * loan_type: Current loan type
   * from_loan_id: Current loan ID
-  * to_loan_id: Selected refinancing loan ID
+  * to_loan_id: market_loan_id of the selected option
 
   e.g. save_switch_loan_request_tool(user_id="550e8400-e29b-41d4-a716-446655440002", loan_type="Personal", from_loan_id="123e4567-e89b-12d3-a456-426614174000", to_loan_id="123e4567-e89b-12d3-a456-426614174000")
 
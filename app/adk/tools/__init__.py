@@ -4,6 +4,12 @@ from .user_tools import (
 from .market_loans_tools import (
     get_available_market_loans_tool
 )
+from .refinance_tools import (
+    get_refinance_options_tool
+)
+from .prepayment_tools import (
+    get_prepayment_scenario_tool
+)
 from .loan_request import (
     save_new_loan_request_tool,
     save_switch_loan_request_tool
@@ -12,4 +18,4 @@ from .web_search_tool import (
     web_search_tool
 )
 
-__all__ = ["get_user_details_tool", "get_available_market_loans_tool", "save_new_loan_request_tool", "save_switch_loan_request_tool", "web_search_tool"]
\ No newline at end of file
+__all__ = ["get_user_details_tool", "get_available_market_loans_tool", "get_refinance_options_tool", "get_prepayment_scenario_tool", "save_new_loan_request_tool", "save_switch_loan_request_tool", "web_search_tool"]
\ No newline at end of file
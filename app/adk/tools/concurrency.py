@@ -0,0 +1,56 @@
+"""Per-tool concurrency limits for the async ADK tools."""
+
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# tool name -> {"limit": max concurrent calls, "in_flight": running calls, "waiting": queued calls}
+_tool_stats: Dict[str, Dict[str, int]] = {}
+
+
+def limit_concurrency(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Limit how many calls of an async tool can run at the same time.
+
+    The limit is read from ``settings.TOOL_CONCURRENCY_LIMITS`` by tool name and
+    falls back to ``settings.TOOL_DEFAULT_CONCURRENCY``. Calls above the limit
+    wait for a free slot instead of piling more work on the database.
+
+    Args:
+        func (Callable[..., Awaitable[T]]): The async tool function.
+
+    Returns:
+        Callable[..., Awaitable[T]]: The wrapped tool, with the same name, signature and docstring.
+    """
+    name = func.__name__
+    limit = settings.TOOL_CONCURRENCY_LIMITS.get(name, settings.TOOL_DEFAULT_CONCURRENCY)
+    semaphore = asyncio.Semaphore(limit)
+    stats = _tool_stats.setdefault(name, {"limit": limit, "in_flight": 0, "waiting": 0})
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        stats["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["waiting"] -= 1
+        stats["in_flight"] += 1
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            stats["in_flight"] -= 1
+            semaphore.release()
+
+    return wrapper
+
+
+def get_tool_concurrency_stats() -> Dict[str, Dict[str, int]]:
+    """Get the limit, running and waiting calls of every concurrency-limited tool.
+
+    Returns:
+        Dict[str, Dict[str, int]]: The stats keyed by tool name.
+    """
+    return {name: dict(stats) for name, stats in _tool_stats.items()}
@@ -1,11 +1,13 @@
-from app.services.loan_request_service import loan_request_service
-from app.database.session import SessionLocal
+from app.services.loan_request_service import async_loan_request_service
+from app.database.session import AsyncSessionLocal
+from app.adk.tools.concurrency import limit_concurrency
 from typing import Dict, Any, Optional
 from app.core.logger import logger
 import uuid
 
 
-def save_new_loan_request_tool(user_id: str, loan_id: str, loan_type: str) -> Dict[str, Any]:
+@limit_concurrency
+async def save_new_loan_request_tool(user_id: str, loan_id: str, loan_type: str) -> Dict[str, Any]:
     """
     Save a new loan request by the user to the database.
 
@@ -27,10 +29,13 @@ def save_new_loan_request_tool(user_id: str, loan_id: str, loan_type: str) -> Di
             "loan_request_id": "123e4567-e89b-12d3-a456-426614174000",
         }
     """
-    db = SessionLocal()
     try:
         logger.info(f"save_new_loan_request_tool called for user_id: {user_id}, loan_id: {loan_id}, loan_type: {loan_type} ...")
-        response = loan_request_service.create_loan_request(db, user_id, "new_loan", loan_type, None, loan_id)
+        user_id_uuid = uuid.UUID(user_id)
+        loan_id_uuid = uuid.UUID(loan_id)
+
+        async with AsyncSessionLocal() as db:
+            response = await async_loan_request_service.create_loan_request(db, user_id_uuid, "new_loan", loan_type, None, loan_id_uuid)
         logger.info(f"save_new_loan_request_tool response: {response}")
         return response
     except Exception as e:
@@ -39,11 +44,10 @@ def save_new_loan_request_tool(user_id: str, loan_id: str, loan_type: str) -> Di
             "success": False,
             "message": "Error in save_new_loan_request_tool"
         }
-    finally:
-        db.close()
 
 
-def save_switch_loan_request_tool(user_id: str, loan_type: str, from_loan_id: Optional[str], to_loan_id: str) -> Dict[str, Any]: 
+@limit_concurrency
+async def save_switch_loan_request_tool(user_id: str, loan_type: str, from_loan_id: Optional[str], to_loan_id: str) -> Dict[str, Any]: 
     """
     Save a new loan request by the user to the database.
 
@@ -64,22 +68,20 @@ def save_switch_loan_request_tool(user_id: str, loan_type: str, from_loan_id: Op
         or
         {
             "success": False,
-            "message": "To loan already exists",
+            "message": "Loan request already exists",
             "loan_request_id": "123e4567-e89b-12d3-a456-426614174000",
         }
     """
-    db = SessionLocal()
     try:
         logger.info(f"save_switch_loan_request_tool called for user_id: {user_id}, loan_type: {loan_type}, from_loan_id: {from_loan_id}, to_loan_id: {to_loan_id} ...")
         user_id_uuid = uuid.UUID(user_id)
         to_loan_id_uuid = uuid.UUID(to_loan_id)
-        from_loan_id_uuid = uuid.UUID(from_loan_id)
+        from_loan_id_uuid = uuid.UUID(from_loan_id) if from_loan_id else None
         
-        response = loan_request_service.create_loan_request(db, user_id_uuid, "switch_loan", loan_type, from_loan_id_uuid, to_loan_id_uuid)
+        async with AsyncSessionLocal() as db:
+            response = await async_loan_request_service.create_loan_request(db, user_id_uuid, "switch_loan", loan_type, from_loan_id_uuid, to_loan_id_uuid)
         logger.info(f"save_switch_loan_request_tool response: {response}")
         return response
     except Exception as e:
         logger.error(f"Error in save_switch_loan_request_tool: {e}")
         return { "success": False, "message": "Error in save_switch_loan_request_tool", "error": str(e) }
-    finally:
-        db.close()
\ No newline at end of file
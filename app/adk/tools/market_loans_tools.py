@@ -1,9 +1,10 @@
-from app.services.market_loan_service import market_loan_service
-from app.database.session import SessionLocal
+from app.services.market_loan_catalog import market_loan_catalog
+from app.adk.tools.concurrency import limit_concurrency
 from app.core.logger import logger
 from typing import Dict, Any, List, Optional
 
-def get_available_market_loans_tool(loan_type: str = "Personal", amount: float = 100000.0, interest_rate: float = 10.5, tenure: int = 1, lender_name: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+@limit_concurrency
+async def get_available_market_loans_tool(loan_type: str = "Personal", amount: float = 100000.0, interest_rate: float = 10.5, tenure: int = 1, lender_name: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
     """
     Get the information about market loans based on the provided loan type, amount and tenure.
     
@@ -19,12 +20,13 @@ def get_available_market_loans_tool(loan_type: str = "Personal", amount: float =
     Returns:
         A list of dictionaries containing market loan information if found, otherwise None.
     """
-    db = SessionLocal()
     try:
         logger.info(f"Getting market loans info for loan type: {loan_type}, amount: {amount}, interest_rate: {interest_rate}, tenure: {tenure} years, lender_name: {lender_name} ...")
 
-        market_loans = market_loan_service.get_by_loan_type_and_amount_and_interest_rate_and_tenure(db, loan_type, amount, interest_rate, tenure, lender_name)
-        
+        # Answered from memory; only a stale catalog is reloaded from the database
+        catalog = await market_loan_catalog.aget()
+        market_loans = catalog.search(loan_type, amount, interest_rate, tenure, lender_name)
+
         if len(market_loans) == 0:
             logger.warning(f"No market loans found for loan type: {loan_type}, amount: {amount}, tenure: {tenure} years")
             return None
@@ -55,6 +57,4 @@ def get_available_market_loans_tool(loan_type: str = "Personal", amount: float =
 
     except Exception as e:
         logger.error(f"Error getting market loans info for loan type: {loan_type}, amount: {amount}, tenure: {tenure}: {e}")
-        return None
-    finally:
-        db.close()
\ No newline at end of file
+        return None
\ No newline at end of file
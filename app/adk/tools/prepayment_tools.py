@@ -0,0 +1,64 @@
+from app.services.amortization_engine import Prepayment, RateReset, Scenario
+from app.services.amortization_service import async_amortization_service
+from app.database.session import async_read_session
+from app.adk.tools.concurrency import limit_concurrency
+from app.core.logger import logger
+from typing import Dict, Any, Optional
+import uuid
+
+
+@limit_concurrency
+async def get_prepayment_scenario_tool(
+    user_id: str,
+    loan_id: str,
+    prepayment_amount: float = 0,
+    prepayment_month: int = 1,
+    every_months: Optional[int] = None,
+    new_interest_rate: Optional[float] = None,
+    rate_reset_month: int = 1,
+    reduce: str = "tenure",
+) -> Optional[Dict[str, Any]]:
+    """
+    Compare one of the user's loans with a "what if" scenario: a prepayment, recurring prepayments or a new interest rate.
+
+    The interest and months saved are calculated from the full amortization schedule, do not recalculate them.
+
+    Args:
+        user_id: The ID of the user. (e.g. 550e8400-e29b-41d4-a716-446655440002)
+        loan_id: The ID of the loan, from user_details. (e.g. 123e4567-e89b-12d3-a456-426614174000)
+        prepayment_amount: The amount prepaid, 0 for none. (e.g. 100000)
+        prepayment_month: The month of the (first) prepayment, 1 for the next EMI. (e.g. 6)
+        every_months: Repeat the prepayment every this many months, e.g. 12 for yearly. If not provided, it is paid once.
+        new_interest_rate: A new yearly interest rate in percent, e.g. after a rate reset or a rate cut. If not provided, the rate is unchanged.
+        rate_reset_month: The first month charged at new_interest_rate, 1 for the next EMI.
+        reduce: "tenure" to keep the EMI and close the loan earlier, or "emi" to lower the EMI instead.
+
+    Returns:
+        A dictionary with the totals of the loan as it is under "current" and with the scenario under "scenario",
+        and the interest and months saved, otherwise None. e.g. {
+            "loan_id": "123e4567-e89b-12d3-a456-426614174000",
+            "current": {"months": 180, "total_interest": 1520000.0, "total_prepaid": 0.0, "total_paid": 3520000.0, "last_emi": 19555.0},
+            "scenario": {"months": 151, "total_interest": 1190000.0, "total_prepaid": 100000.0, "total_paid": 3190000.0, "last_emi": 19555.0},
+            "interest_saved": 330000.0,
+            "months_saved": 29
+        }
+    """
+    try:
+        logger.info(f"get_prepayment_scenario_tool called for user_id: {user_id}, loan_id: {loan_id}, prepayment_amount: {prepayment_amount}, prepayment_month: {prepayment_month}, every_months: {every_months}, new_interest_rate: {new_interest_rate} ...")
+        user_id_uuid = uuid.UUID(user_id)
+        scenario = Scenario(
+            prepayments=(Prepayment(amount=prepayment_amount, month=prepayment_month, every=every_months),) if prepayment_amount > 0 else (),
+            rate_resets=(RateReset(month=rate_reset_month, annual_rate=new_interest_rate),) if new_interest_rate is not None else (),
+            reduce=reduce,
+        )
+
+        async with async_read_session(user_id_uuid) as db:
+            comparison = await async_amortization_service.compare_scenario(db, user_id_uuid, uuid.UUID(loan_id), scenario)
+
+        if comparison is None:
+            logger.warning(f"No loan of the user found for user_id: {user_id}, loan_id: {loan_id}")
+        return comparison
+
+    except Exception as e:
+        logger.error(f"Error comparing prepayment scenario for user_id: {user_id}, loan_id: {loan_id}: {e}")
+        return None
@@ -0,0 +1,61 @@
+from app.services.refinance_service import async_refinance_service
+from app.services.market_loan_catalog import market_loan_catalog
+from app.database.session import async_read_session
+from app.adk.tools.concurrency import limit_concurrency
+from app.core.logger import logger
+from typing import Dict, Any, Optional
+import uuid
+
+
+@limit_concurrency
+async def get_refinance_options_tool(user_id: str, loan_id: Optional[str] = None, top_k: int = 3) -> Optional[Dict[str, Any]]:
+    """
+    Get the market loans that save the user the most by refinancing their active loans.
+
+    The new EMI, monthly savings, total interest, processing fee, foreclosure penalty,
+    net savings and break-even month of every offer are already calculated, do not recalculate them.
+
+    Args:
+        user_id: The ID of the user. (e.g. 550e8400-e29b-41d4-a716-446655440002)
+        loan_id: The ID of the loan to refinance, from user_details. If not provided, all active loans are compared.
+        top_k: The maximum number of offers per loan. (e.g. 3)
+
+    Returns:
+        A dictionary containing each active loan with its current EMI, remaining months and remaining interest,
+        and its best offers by net savings under "options", otherwise None. A break_even_month of -1 means the
+        savings never cover the fees. e.g. {
+            "user_id": "550e8400-e29b-41d4-a716-446655440002",
+            "loans": [{
+                "loan_id": "123e4567-e89b-12d3-a456-426614174000",
+                "current_emi": 12500.0,
+                "remaining_months": 36,
+                "options": [{
+                    "market_loan_id": "123e4567-e89b-12d3-a456-426614174001",
+                    "lender_name": "HDFC Bank",
+                    "interest_rate": 10.5,
+                    "new_emi": 11800.0,
+                    "monthly_savings": 700.0,
+                    "net_savings": 21000.0,
+                    "break_even_month": 5,
+                    ...
+                }]
+            }]
+        }
+    """
+    try:
+        logger.info(f"get_refinance_options_tool called for user_id: {user_id}, loan_id: {loan_id}, top_k: {top_k} ...")
+        user_id_uuid = uuid.UUID(user_id)
+        loan_id_uuid = uuid.UUID(loan_id) if loan_id else None
+
+        catalog = await market_loan_catalog.aget()
+        async with async_read_session(user_id_uuid) as db:
+            options = await async_refinance_service.get_refinance_options(db, user_id_uuid, catalog, loan_id=loan_id_uuid, top_k=top_k)
+
+        if not options["loans"]:
+            logger.warning(f"No active loans found for user_id: {user_id}, loan_id: {loan_id}")
+            return None
+        return options
+
+    except Exception as e:
+        logger.error(f"Error getting refinance options for user_id: {user_id}, loan_id: {loan_id}: {e}")
+        return None
@@ -1,9 +1,11 @@
-from app.services.user_service import user_service
-from app.database.session import SessionLocal
+from app.services.user_service import async_user_service
+from app.database.session import async_read_session
+from app.adk.tools.concurrency import limit_concurrency
 from app.core.logger import logger
 from typing import Dict, Any, Optional
 
-def get_user_details_tool(phone_number: str) -> Optional[Dict[str, Any]]:
+@limit_concurrency
+async def get_user_details_tool(phone_number: str) -> Optional[Dict[str, Any]]:
     """
     Get the details of a user by their phone number.
 
@@ -13,10 +15,11 @@ def get_user_details_tool(phone_number: str) -> Optional[Dict[str, Any]]:
     Returns:
         A dictionary containing user information if found, otherwise None.
     """
-    db = SessionLocal()
     try:
         logger.info(f"Getting user details for phone number: {phone_number}...")
-        user = user_service.get_user_details_by_phone(db, phone_number)
+        # Right after the user was stored this reads from the primary, see async_read_session
+        async with async_read_session(phone_number) as db:
+            user = await async_user_service.get_user_details_by_phone(db, phone_number)
         if user is None:
             logger.warning(f"User not found for phone number: {phone_number} !")
             return None
@@ -25,8 +28,6 @@ def get_user_details_tool(phone_number: str) -> Optional[Dict[str, Any]]:
     except Exception as e:
         logger.error(f"Error getting user details for phone number '{phone_number}': {e}")
         return None
-    finally:
-        db.close()
 
 
 # def search_user_by_name(name: str) -> Optional[Dict[str, Any]]:
@@ -1,8 +1,12 @@
 from ddgs import DDGS
+from app.adk.tools.concurrency import limit_concurrency
+import asyncio
 
 
-def web_search_tool(query: str) -> str:
+@limit_concurrency
+async def web_search_tool(query: str) -> str:
     """
     Search the web for the given query.
     """
-    return DDGS().text(query, max_results=5)
\ No newline at end of file
+    # DDGS is a blocking HTTP client, run it off the event loop
+    return await asyncio.to_thread(DDGS().text, query, max_results=5)
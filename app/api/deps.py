@@ -1,6 +1,14 @@
 from fastapi import Request
+from typing import Any, Dict
 from app.mcp.fi_mcp import FiMCP
 
 async def get_fi_mcp(request: Request) -> FiMCP:
     """Get FiMCP instance from application state."""
-    return request.app.state.app_state.fi_mcp 
\ No newline at end of file
+    return request.app.state.app_state.fi_mcp
+
+async def get_list_filters(request: Request) -> Dict[str, Any]:
+    """Get the ``field__operator`` list filters from the query string, without the paging parameters.
+
+    The values stay strings, ``FilterCompiler`` parses them as the type of the filtered column.
+    """
+    return {key: value for key, value in request.query_params.items() if key not in ("cursor", "limit")}
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.session import get_db
-from app.services import bank_account_service
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from app.database.session import get_async_db, get_async_read_db
+from app.api.deps import get_list_filters
+from app.core.exception import InvalidCursorException, InvalidFilterException
+from app.services.bank_account_service import async_bank_account_service
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -28,11 +30,11 @@ class BankAccountUpdate(BaseModel):
 @router.post("/")
 async def create_bank_account(
     bank_account_data: BankAccountCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new bank account."""
     try:
-        result = bank_account_service.create_bank_account(db, bank_account_data.dict())
+        result = await async_bank_account_service.create_bank_account(db, bank_account_data.dict())
         if result["success"]:
             return result
         else:
@@ -41,11 +43,27 @@ async def create_bank_account(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/")
+async def get_bank_accounts(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of bank accounts per page"),
+    filters: Dict[str, Any] = Depends(get_list_filters),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a page of bank accounts, oldest first, filtered by ``field`` or ``field__operator`` query parameters."""
+    try:
+        return await async_bank_account_service.get_bank_accounts(db, cursor=cursor, limit=limit, filters=filters)
+    except (InvalidCursorException, InvalidFilterException) as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{bank_account_id}")
-async def get_bank_account(bank_account_id: int, db: Session = Depends(get_db)):
+async def get_bank_account(bank_account_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get bank account by ID."""
     try:
-        result = bank_account_service.get_bank_account(db, bank_account_id)
+        result = await async_bank_account_service.get_bank_account(db, bank_account_id)
         if result:
             return result
         else:
@@ -55,30 +73,30 @@ async def get_bank_account(bank_account_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/user/{user_id}")
-async def get_bank_accounts_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_bank_accounts_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get all bank accounts for a user."""
     try:
-        result = bank_account_service.get_bank_accounts_by_user(db, user_id)
+        result = await async_bank_account_service.get_bank_accounts_by_user(db, user_id)
         return {"bank_accounts": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/bank/{bank_name}")
-async def get_bank_accounts_by_bank(bank_name: str, db: Session = Depends(get_db)):
+async def get_bank_accounts_by_bank(bank_name: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get all accounts for a specific bank."""
     try:
-        result = bank_account_service.get_bank_accounts_by_bank(db, bank_name)
+        result = await async_bank_account_service.get_bank_accounts_by_bank(db, bank_name)
         return {"bank_accounts": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/type/{account_type}")
-async def get_bank_accounts_by_type(account_type: str, db: Session = Depends(get_db)):
+async def get_bank_accounts_by_type(account_type: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get all accounts of a specific type."""
     try:
-        result = bank_account_service.get_bank_accounts_by_type(db, account_type)
+        result = await async_bank_account_service.get_bank_accounts_by_type(db, account_type)
         return {"bank_accounts": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -88,11 +106,11 @@ async def get_bank_accounts_by_type(account_type: str, db: Session = Depends(get
 async def update_bank_account(
     bank_account_id: int,
     update_data: BankAccountUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update bank account."""
     try:
-        result = bank_account_service.update_bank_account(db, bank_account_id, update_data.dict(exclude_unset=True))
+        result = await async_bank_account_service.update_bank_account(db, bank_account_id, update_data.dict(exclude_unset=True))
         if result and result["success"]:
             return result
         elif result and not result["success"]:
@@ -104,10 +122,10 @@ async def update_bank_account(
 
 
 @router.delete("/{bank_account_id}")
-async def delete_bank_account(bank_account_id: int, db: Session = Depends(get_db)):
+async def delete_bank_account(bank_account_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete bank account."""
     try:
-        success = bank_account_service.delete_bank_account(db, bank_account_id)
+        success = await async_bank_account_service.delete_bank_account(db, bank_account_id)
         if success:
             return {"message": "Bank account deleted successfully"}
         else:
@@ -117,20 +135,20 @@ async def delete_bank_account(bank_account_id: int, db: Session = Depends(get_db
 
 
 @router.get("/user/{user_id}/total-balance")
-async def get_total_balance_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_total_balance_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get total balance across all bank accounts for a user."""
     try:
-        result = bank_account_service.get_total_balance_by_user(db, user_id)
+        result = await async_bank_account_service.get_total_balance_by_user(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/user/{user_id}/summary")
-async def get_bank_accounts_summary(user_id: int, db: Session = Depends(get_db)):
+async def get_bank_accounts_summary(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get comprehensive summary of user's bank accounts."""
     try:
-        result = bank_account_service.get_bank_accounts_summary(db, user_id)
+        result = await async_bank_account_service.get_bank_accounts_summary(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
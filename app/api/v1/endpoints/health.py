@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from app.database.session import get_db_pool_stats, get_db_statement_stats
 
 router = APIRouter()
 
@@ -11,3 +12,25 @@ async def health_check() -> dict[str, str]:
         dict: A dictionary containing the status of the API.
     """
     return {"status": "healthy"}
+
+
+@router.get("/db-pool")
+async def db_pool_stats() -> dict:
+    """Get live statistics of the database connection pool.
+
+    Returns:
+    --------
+        dict: Pool size, checked out connections, overflow and checkout wait times.
+    """
+    return get_db_pool_stats()
+
+
+@router.get("/db-statements")
+async def db_statement_stats(top: int = Query(20, ge=1, le=500)) -> list:
+    """Get the database statements with the highest total execution time.
+
+    Returns:
+    --------
+        list: Per statement: SQL, calls, compiled cache hits and total, mean and max milliseconds.
+    """
+    return get_db_statement_stats(top)
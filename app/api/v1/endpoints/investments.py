@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.session import get_db
-from app.services import investment_service
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from app.database.session import get_async_db, get_async_read_db
+from app.api.deps import get_list_filters
+from app.core.exception import InvalidCursorException, InvalidFilterException
+from app.services.investment_service import async_investment_service
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -33,11 +35,11 @@ class InvestmentUpdate(BaseModel):
 @router.post("/")
 async def create_investment(
     investment_data: InvestmentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new investment."""
     try:
-        result = investment_service.create_investment(db, investment_data.dict())
+        result = await async_investment_service.create_investment(db, investment_data.dict())
         if result["success"]:
             return result
         else:
@@ -46,11 +48,27 @@ async def create_investment(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/")
+async def get_investments(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of investments per page"),
+    filters: Dict[str, Any] = Depends(get_list_filters),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a page of investments, oldest first, filtered by ``field`` or ``field__operator`` query parameters."""
+    try:
+        return await async_investment_service.get_investments(db, cursor=cursor, limit=limit, filters=filters)
+    except (InvalidCursorException, InvalidFilterException) as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{investment_id}")
-async def get_investment(investment_id: int, db: Session = Depends(get_db)):
+async def get_investment(investment_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get investment by ID."""
     try:
-        result = investment_service.get_investment(db, investment_id)
+        result = await async_investment_service.get_investment(db, investment_id)
         if result:
             return result
         else:
@@ -60,50 +78,50 @@ async def get_investment(investment_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/user/{user_id}")
-async def get_investments_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_investments_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get all investments for a user."""
     try:
-        result = investment_service.get_investments_by_user(db, user_id)
+        result = await async_investment_service.get_investments_by_user(db, user_id)
         return {"investments": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/institution/{institution}")
-async def get_investments_by_institution(institution: str, db: Session = Depends(get_db)):
+async def get_investments_by_institution(institution: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get all investments from a specific institution."""
     try:
-        result = investment_service.get_investments_by_institution(db, institution)
+        result = await async_investment_service.get_investments_by_institution(db, institution)
         return {"investments": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/type/{investment_type}")
-async def get_investments_by_type(investment_type: str, db: Session = Depends(get_db)):
+async def get_investments_by_type(investment_type: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get all investments of a specific type."""
     try:
-        result = investment_service.get_investments_by_type(db, investment_type)
+        result = await async_investment_service.get_investments_by_type(db, investment_type)
         return {"investments": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/matured")
-async def get_matured_investments(db: Session = Depends(get_db)):
+async def get_matured_investments(db: AsyncSession = Depends(get_async_read_db)):
     """Get all matured investments."""
     try:
-        result = investment_service.get_matured_investments(db)
+        result = await async_investment_service.get_matured_investments(db)
         return {"investments": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/profitable")
-async def get_profitable_investments(db: Session = Depends(get_db)):
+async def get_profitable_investments(db: AsyncSession = Depends(get_async_read_db)):
     """Get investments where current value > amount invested."""
     try:
-        result = investment_service.get_profitable_investments(db)
+        result = await async_investment_service.get_profitable_investments(db)
         return {"investments": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -112,11 +130,11 @@ async def get_profitable_investments(db: Session = Depends(get_db)):
 @router.get("/high-value")
 async def get_high_value_investments(
     min_value: int = Query(100000, description="Minimum investment value"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get investments with current value above threshold."""
     try:
-        result = investment_service.get_high_value_investments(db, min_value)
+        result = await async_investment_service.get_high_value_investments(db, min_value)
         return {"investments": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -126,11 +144,11 @@ async def get_high_value_investments(
 async def update_investment(
     investment_id: int,
     update_data: InvestmentUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update investment."""
     try:
-        result = investment_service.update_investment(db, investment_id, update_data.dict(exclude_unset=True))
+        result = await async_investment_service.update_investment(db, investment_id, update_data.dict(exclude_unset=True))
         if result and result["success"]:
             return result
         elif result and not result["success"]:
@@ -142,10 +160,10 @@ async def update_investment(
 
 
 @router.delete("/{investment_id}")
-async def delete_investment(investment_id: int, db: Session = Depends(get_db)):
+async def delete_investment(investment_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete investment."""
     try:
-        success = investment_service.delete_investment(db, investment_id)
+        success = await async_investment_service.delete_investment(db, investment_id)
         if success:
             return {"message": "Investment deleted successfully"}
         else:
@@ -155,30 +173,30 @@ async def delete_investment(investment_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/user/{user_id}/total-value")
-async def get_total_investment_value_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_total_investment_value_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get total current value of investments for a user."""
     try:
-        result = investment_service.get_total_investment_value_by_user(db, user_id)
+        result = await async_investment_service.get_total_investment_value_by_user(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/user/{user_id}/summary")
-async def get_investments_summary(user_id: int, db: Session = Depends(get_db)):
+async def get_investments_summary(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get comprehensive summary of user's investments."""
     try:
-        result = investment_service.get_investments_summary(db, user_id)
+        result = await async_investment_service.get_investments_summary(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/user/{user_id}/analytics")
-async def get_investment_analytics(user_id: int, db: Session = Depends(get_db)):
+async def get_investment_analytics(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get investment analytics for a user."""
     try:
-        result = investment_service.get_investment_analytics(db, user_id)
+        result = await async_investment_service.get_investment_analytics(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
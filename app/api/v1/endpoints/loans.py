@@ -1,10 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.session import get_db
-from app.services import loan_service
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Iterator, List, Literal, Optional
+from app.database.session import get_async_db, get_async_read_db
+from app.api.deps import get_list_filters
+from app.core.exception import IncompleteLoanTermsException, InvalidCursorException, InvalidFilterException
+from app.services.amortization_engine import Schedule, Scenario
+from app.services.amortization_service import async_amortization_service
+from app.services.loan_service import async_loan_service
+from app.services.market_loan_catalog import market_loan_catalog
+from app.services.refinance_service import async_refinance_service
+from pydantic import BaseModel, Field
 from datetime import datetime
+from itertools import islice
+import json
+import uuid
 
 router = APIRouter()
 
@@ -44,14 +54,32 @@ class LoanUpdate(BaseModel):
     prepayment_penalty: Optional[int] = None
 
 
+class Prepayment(BaseModel):
+    amount: float = Field(gt=0)
+    month: int = Field(ge=1, description="First month it is paid in, 1 for the next EMI")
+    every: Optional[int] = Field(None, ge=1, description="Months between payments, once if not given")
+    until: Optional[int] = Field(None, ge=1, description="Last month of a recurring prepayment")
+
+
+class RateReset(BaseModel):
+    month: int = Field(ge=1, description="First month charged at the new rate")
+    annual_rate: float = Field(ge=0)
+
+
+class ScheduleScenario(BaseModel):
+    prepayments: List[Prepayment] = []
+    rate_resets: List[RateReset] = []
+    reduce: Literal["tenure", "emi"] = "tenure"
+
+
 @router.post("/")
 async def create_loan(
     loan_data: LoanCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new loan."""
     try:
-        result = loan_service.create_loan(db, loan_data.dict())
+        result = await async_loan_service.create_loan(db, loan_data.dict())
         if result["success"]:
             return result
         else:
@@ -60,11 +88,30 @@ async def create_loan(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/")
+async def get_loans(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of loans per page"),
+    filters: Dict[str, Any] = Depends(get_list_filters),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a page of loans, oldest first.
+    
+    Filter with ``field`` or ``field__operator`` query parameters, e.g. ``?lender__prefix=hdfc&interest_rate__gte=10``.
+    """
+    try:
+        return await async_loan_service.get_loans(db, cursor=cursor, limit=limit, filters=filters)
+    except (InvalidCursorException, InvalidFilterException) as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{loan_id}")
-async def get_loan(loan_id: int, db: Session = Depends(get_db)):
+async def get_loan(loan_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get loan by ID."""
     try:
-        result = loan_service.get_loan(db, loan_id)
+        result = await async_loan_service.get_loan(db, loan_id)
         if result:
             return result
         else:
@@ -74,50 +121,50 @@ async def get_loan(loan_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/user/{user_id}")
-async def get_loans_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_loans_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get all loans for a user."""
     try:
-        result = loan_service.get_loans_by_user(db, user_id)
+        result = await async_loan_service.get_loans_by_user(db, user_id)
         return {"loans": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/user/{user_id}/active")
-async def get_active_loans_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_active_loans_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get all active loans for a user."""
     try:
-        result = loan_service.get_active_loans_by_user(db, user_id)
+        result = await async_loan_service.get_active_loans_by_user(db, user_id)
         return {"loans": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/overdue")
-async def get_overdue_loans(db: Session = Depends(get_db)):
+async def get_overdue_loans(db: AsyncSession = Depends(get_async_read_db)):
     """Get all overdue loans."""
     try:
-        result = loan_service.get_overdue_loans(db)
+        result = await async_loan_service.get_overdue_loans(db)
         return {"loans": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/lender/{lender}")
-async def get_loans_by_lender(lender: str, db: Session = Depends(get_db)):
+async def get_loans_by_lender(lender: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get all loans from a specific lender."""
     try:
-        result = loan_service.get_loans_by_lender(db, lender)
+        result = await async_loan_service.get_loans_by_lender(db, lender)
         return {"loans": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/type/{loan_type}")
-async def get_loans_by_type(loan_type: str, db: Session = Depends(get_db)):
+async def get_loans_by_type(loan_type: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get all loans of a specific type."""
     try:
-        result = loan_service.get_loans_by_type(db, loan_type)
+        result = await async_loan_service.get_loans_by_type(db, loan_type)
         return {"loans": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -126,11 +173,11 @@ async def get_loans_by_type(loan_type: str, db: Session = Depends(get_db)):
 @router.get("/high-interest")
 async def get_high_interest_loans(
     min_interest_rate: float = Query(10.0, description="Minimum interest rate"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get loans with interest rate above threshold."""
     try:
-        result = loan_service.get_high_interest_loans(db, min_interest_rate)
+        result = await async_loan_service.get_high_interest_loans(db, min_interest_rate)
         return {"loans": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -140,11 +187,11 @@ async def get_high_interest_loans(
 async def update_loan(
     loan_id: int,
     update_data: LoanUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update loan."""
     try:
-        result = loan_service.update_loan(db, loan_id, update_data.dict(exclude_unset=True))
+        result = await async_loan_service.update_loan(db, loan_id, update_data.dict(exclude_unset=True))
         if result and result["success"]:
             return result
         elif result and not result["success"]:
@@ -156,10 +203,10 @@ async def update_loan(
 
 
 @router.delete("/{loan_id}")
-async def delete_loan(loan_id: int, db: Session = Depends(get_db)):
+async def delete_loan(loan_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete loan."""
     try:
-        success = loan_service.delete_loan(db, loan_id)
+        success = await async_loan_service.delete_loan(db, loan_id)
         if success:
             return {"message": "Loan deleted successfully"}
         else:
@@ -169,30 +216,92 @@ async def delete_loan(loan_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/user/{user_id}/total-liability")
-async def get_total_liability_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_total_liability_by_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get total loan liability for a user."""
     try:
-        result = loan_service.get_total_liability_by_user(db, user_id)
+        result = await async_loan_service.get_total_liability_by_user(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/user/{user_id}/summary")
-async def get_loans_summary(user_id: int, db: Session = Depends(get_db)):
+async def get_loans_summary(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get comprehensive summary of user's loans."""
     try:
-        result = loan_service.get_loans_summary(db, user_id)
+        result = await async_loan_service.get_loans_summary(db, user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/user/{user_id}/analytics")
-async def get_loan_analytics(user_id: int, db: Session = Depends(get_db)):
+async def get_loan_analytics(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get loan analytics for a user."""
     try:
-        result = loan_service.get_loan_analytics(db, user_id)
+        result = await async_loan_service.get_loan_analytics(db, user_id)
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/user/{user_id}/refinance-options")
+async def get_refinance_options(
+    user_id: uuid.UUID,
+    loan_id: Optional[uuid.UUID] = Query(None, description="Only this loan, all active loans if not given"),
+    top_k: int = Query(3, ge=1, le=50, description="Maximum number of offers per loan"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get the market loans with the largest net savings for each active loan of a user.
+
+    Every offer of the market loan catalog is compared with every loan in one batch,
+    see app.services.refinance_engine.
+    """
+    try:
+        catalog = await market_loan_catalog.aget()
+        return await async_refinance_service.get_refinance_options(db, user_id, catalog, loan_id=loan_id, top_k=top_k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ndjson(schedule: Schedule, months: Optional[int]) -> Iterator[str]:
+    for row in islice(schedule, months):
+        yield json.dumps(row.to_dict()) + "\n"
+
+
+async def _stream_schedule(db: AsyncSession, loan_id: uuid.UUID, scenario: Optional[Scenario], months: Optional[int]) -> StreamingResponse:
+    try:
+        schedule = await async_amortization_service.get_schedule(db, loan_id, scenario)
+    except IncompleteLoanTermsException as e:
+        raise HTTPException(status_code=422, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Loan not found")
+    # Rows are computed while they are sent, no more than ``months`` of them
+    return StreamingResponse(_ndjson(schedule, months), media_type="application/x-ndjson")
+
+
+@router.get("/{loan_id}/schedule")
+async def get_loan_schedule(
+    loan_id: uuid.UUID,
+    months: Optional[int] = Query(None, ge=1, description="Only the first months, the whole schedule if not given"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Stream the amortization schedule of a loan, one JSON row per month."""
+    return await _stream_schedule(db, loan_id, None, months)
+
+
+@router.post("/{loan_id}/schedule")
+async def get_loan_schedule_with_scenario(
+    loan_id: uuid.UUID,
+    scenario: ScheduleScenario,
+    months: Optional[int] = Query(None, ge=1, description="Only the first months, the whole schedule if not given"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Stream the amortization schedule of a loan with lump-sum or recurring prepayments and rate resets, one JSON row per month.
+
+    With ``reduce`` "tenure" a prepayment keeps the EMI and the loan closes earlier,
+    with "emi" the EMI is lowered instead, see app.services.amortization_engine.
+    """
+    return await _stream_schedule(db, loan_id, Scenario.from_dict(scenario.model_dump()), months)
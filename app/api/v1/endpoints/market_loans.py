@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+from tempfile import SpooledTemporaryFile
+import asyncio
+from app.core.exception import CatalogFormatException
+from app.core.logger import logger
+from app.database.session import SessionLocal
+from app.schemas.response import BaseResponse
+from app.services.market_loan_import_service import FORMATS, market_loan_import_service
+
+router = APIRouter()
+
+# Uploads larger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_SIZE = 8 << 20
+CONTENT_TYPE_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+@router.post("/import")
+async def import_market_loans(
+    request: Request,
+    format: Optional[str] = Query(None, description=f"One of {', '.join(FORMATS)}, from the Content-Type if not given"),
+    prune: bool = Query(True, description="Delete the market loans missing from the catalog, off for partial catalogs"),
+    dry_run: bool = Query(False, description="Report the changes without applying them"),
+    force_prune: bool = Query(False, description="Prune even if the catalog has no valid offer or some invalid ones"),
+):
+    """Replace the market loans with a provider catalog sent as the request body.
+
+    The body is a JSON array, NDJSON or CSV file of offers. It is streamed to a
+    temporary file and imported in a worker thread, in one transaction. A catalog
+    with no valid offer or some invalid ones does not prune unless ``force_prune``
+    is set, see ``prune_skipped`` in the result.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    format = format or CONTENT_TYPE_FORMATS.get(content_type)
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown catalog format, pass format as one of {', '.join(FORMATS)}")
+
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as file:
+        async for chunk in request.stream():
+            file.write(chunk)
+        file.seek(0)
+
+        def run_import():
+            db = SessionLocal()
+            try:
+                return market_loan_import_service.import_catalog(db, file, format, prune=prune, dry_run=dry_run, force_prune=force_prune)
+            finally:
+                db.close()
+
+        try:
+            result = await asyncio.to_thread(run_import)
+        except CatalogFormatException as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        except Exception as e:
+            logger.error(f"Error in import_market_loans endpoint: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return BaseResponse(
+        status="success",
+        message="Market loan catalog checked" if dry_run else "Market loan catalog imported",
+        data=result.to_dict(),
+    )
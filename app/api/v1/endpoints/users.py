@@ -1,23 +1,40 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.mcp.fi_mcp import FiMCP
 from app.schemas.user_details import UserInfo
-from app.api.deps import get_fi_mcp
-from app.database.session import get_db
-from app.services.user_service import user_service
+from app.api.deps import get_fi_mcp, get_list_filters
+from app.database.session import get_async_db, get_async_read_db
+from app.services.user_service import async_user_service
 from app.core.logger import logger
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from app.core.exception import InvalidCursorException, InvalidFilterException
 from app.schemas.response import BaseResponse
+from pydantic import BaseModel, Field
+import uuid
 
 router = APIRouter()
 
+
+class UserPurge(BaseModel):
+    user_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=10000)
+
+
 @router.get("/")
-async def get_users():
-    """Get all users."""
-    return {"message": "Users fetched successfully"}
+async def get_users(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of users per page"),
+    filters: Dict[str, Any] = Depends(get_list_filters),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a page of users, oldest first, filtered by ``field`` or ``field__operator`` query parameters."""
+    try:
+        result = await async_user_service.get_users(db, cursor=cursor, limit=limit, filters=filters)
+    except (InvalidCursorException, InvalidFilterException) as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    return {"message": "Users fetched successfully", **result}
 
 @router.post("/user-info")
-async def user_info(fi_mcp: FiMCP = Depends(get_fi_mcp), db: Session = Depends(get_db)):
+async def user_info(fi_mcp: FiMCP = Depends(get_fi_mcp), db: AsyncSession = Depends(get_async_db)):
     """Get user info from Fi MCP and store in database."""
     try:
         logger.info("Fetching user info from Fi MCP...")
@@ -62,7 +79,35 @@ async def user_info(fi_mcp: FiMCP = Depends(get_fi_mcp), db: Session = Depends(g
             data=str(e)
         )
 
-async def _process_user_info(user_info: UserInfo, db: Session) -> Dict[str, Any]:
+@router.post("/bulk-user-info")
+async def bulk_user_info(user_infos: List[UserInfo], db: AsyncSession = Depends(get_async_db)):
+    """Store many FiMCP user snapshots, e.g. for a batch onboarding backfill."""
+    try:
+        logger.info(f"Bulk storing {len(user_infos)} user snapshots...")
+        result = await async_user_service.bulk_store_user_info_from_fi_mcp(db, user_infos)
+        return BaseResponse(
+            status="success",
+            message="User info stored successfully",
+            data=result
+        )
+    except Exception as e:
+        logger.error(f"Error in bulk_user_info endpoint: {str(e)}")
+        return BaseResponse(
+            status="error",
+            message="Error storing user info",
+            data=str(e)
+        )
+
+@router.post("/purge")
+async def purge_users(purge: UserPurge, db: AsyncSession = Depends(get_async_db)):
+    """Erase users and all of their bank accounts, loans, investments and requests."""
+    try:
+        result = await async_user_service.purge_users(db, purge.user_ids)
+        return {"message": "Users purged successfully", **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _process_user_info(user_info: UserInfo, db: AsyncSession) -> Dict[str, Any]:
     """Helper function to process UserInfo object and store in database."""
     # Validate that the response has all required data
     has_user = user_info.user is not None
@@ -76,7 +121,7 @@ async def _process_user_info(user_info: UserInfo, db: Session) -> Dict[str, Any]
     if has_user and (has_bank_accounts or has_investments or has_loans):
         logger.info("Response contains valid user data, storing user info in database...")
         # Store user info in database
-        result = await user_service.store_user_info_from_fi_mcp(db, user_info)
+        result = await async_user_service.store_user_info_from_fi_mcp(db, user_info)
         logger.warning("User info stored in database successfully.")
         return result
     else:
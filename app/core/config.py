@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from dotenv import load_dotenv
+from typing import Dict, List, Optional
 
 load_dotenv()
 
@@ -22,6 +23,29 @@ class Settings(BaseSettings):
         POSTGRES_USER (str): The user of the database.
         POSTGRES_PASSWORD (str): The password of the database.
         POSTGRES_DB (str): The name of the database.
+        POSTGRES_REPLICA_HOSTS (List[str]): The "host" or "host:port" of each read replica of the database.
+        DB_REPLICA_LAG_SECONDS (float): The seconds reads of just written users stay on the primary.
+        POSTGRES_SHARDS (List[str]): The "database" or "host[:port]/database" of each shard after the primary, which is shard 0.
+        DB_POOL_MODE (str): The connection pool mode ("queue", "static" or "null").
+        DB_POOL_SIZE (int): The number of persistent connections kept in the pool.
+        DB_MAX_OVERFLOW (int): The number of extra connections allowed above the pool size.
+        DB_POOL_TIMEOUT (float): The seconds to wait for a connection before giving up.
+        DB_POOL_RECYCLE (int): The seconds after which a connection is recycled.
+        DB_POOL_PRE_PING (bool): Whether to test connections for liveness on checkout.
+        DB_PREPARED_STATEMENT_CACHE_SIZE (int): The number of server-side prepared statements kept per async connection, 0 to disable.
+        DB_STATEMENT_TIMING (bool): Whether to record per-statement execution times.
+        DB_TIME_ORDERED_IDS (bool): Whether new rows get time-ordered UUIDv7 primary keys instead of random uuid4 ones.
+        DB_PARTITION_MONTHS_AHEAD (int): The number of monthly partitions created ahead of the current month.
+        DB_PARTITION_RETENTION_MONTHS (int): The number of months before the current one kept attached to partitioned tables, 0 to keep every month.
+        DB_ARCHIVE_TABLESPACE (Optional[str]): The tablespace archived partitions are moved to, None to keep them in the default tablespace.
+        DB_PARTITION_MAINTENANCE_INTERVAL_SECONDS (int): The seconds between partition maintenance runs.
+        MARKET_LOAN_CATALOG_TTL_SECONDS (float): The seconds after which the in-memory market loan catalog checks the table for changes made by other processes.
+        MARKET_LOAN_IMPORT_BATCH_SIZE (int): The catalog offers validated and staged at a time by the market loan importer.
+        MARKET_LOAN_IMPORT_MAX_ERRORS (int): The rejected catalog offers reported by the market loan importer.
+        REFINANCE_PRECOMPUTE_TOP_K (int): The refinance options precomputed per active loan.
+        REFINANCE_PRECOMPUTE_CHUNK_SIZE (int): The active loans read, scored and written at a time by the refinance precompute job.
+        REFINANCE_PRECOMPUTE_WORKERS (int): The worker processes of the refinance precompute job.
+        AMORTIZATION_SCHEDULE_CACHE_SIZE (int): The amortization schedules kept in memory, by loan terms and scenario.
         MCP_SERVERS_FILE (str): The path to the MCP servers file.
         GEMINI_API_KEY (str): The API key for the Gemini model.
         GEMINI_MODEL (str): The model to use for the Gemini API.
@@ -38,6 +62,8 @@ class Settings(BaseSettings):
         RAG_DEFAULT_SEARCH_TOP_K (int): The number of results to return for the RAG search.
         RAG_DEFAULT_VECTOR_DISTANCE_THRESHOLD (float): The threshold for the RAG vector distance.
         RAG_DEFAULT_PAGE_SIZE (int): The page size for the RAG.
+        TOOL_DEFAULT_CONCURRENCY (int): The default maximum of concurrent calls per ADK tool.
+        TOOL_CONCURRENCY_LIMITS (Dict[str, int]): The maximum of concurrent calls keyed by ADK tool name.
     """
 
     PROJECT_NAME : str = "SahiLoan"
@@ -73,12 +99,140 @@ class Settings(BaseSettings):
         default="sahiloan", # Default database name for PostgreSQL
         description="Database name"
     )
-    
+    POSTGRES_REPLICA_HOSTS : List[str] = Field(
+        default=[], # e.g. '["replica-1", "replica-2:5433"]', same user, password and database as the primary
+        description="Read replica hosts"
+    )
+    DB_REPLICA_LAG_SECONDS : float = Field(
+        default=5.0, # Keep above the replication lag
+        description="Seconds reads of just written users stay on the primary"
+    )
+    POSTGRES_SHARDS : List[str] = Field(
+        default=[], # e.g. '["sahiloan_1", "db-2:5433/sahiloan_2"]', read replicas are not used when sharded
+        description="Databases holding users next to the primary"
+    )
+
     @property
     def SQLALCHEMY_DATABASE_URL(self) -> str:
         """Construct the database URL from individual components."""
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{str(self.POSTGRES_PORT)}/{self.POSTGRES_DB}"
 
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URL(self) -> str:
+        """Construct the asyncpg database URL from individual components."""
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{str(self.POSTGRES_PORT)}/{self.POSTGRES_DB}"
+
+    @property
+    def SQLALCHEMY_REPLICA_DATABASE_URLS(self) -> List[str]:
+        """Construct the database URL of every read replica."""
+        return [f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self._replica_netloc(host)}/{self.POSTGRES_DB}" for host in self.POSTGRES_REPLICA_HOSTS]
+
+    @property
+    def SQLALCHEMY_ASYNC_REPLICA_DATABASE_URLS(self) -> List[str]:
+        """Construct the asyncpg database URL of every read replica."""
+        return [f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self._replica_netloc(host)}/{self.POSTGRES_DB}" for host in self.POSTGRES_REPLICA_HOSTS]
+
+    @property
+    def SQLALCHEMY_SHARD_DATABASE_URLS(self) -> List[str]:
+        """Construct the database URL of every shard after the primary."""
+        return [f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self._shard_location(shard)}" for shard in self.POSTGRES_SHARDS]
+
+    @property
+    def SQLALCHEMY_ASYNC_SHARD_DATABASE_URLS(self) -> List[str]:
+        """Construct the asyncpg database URL of every shard after the primary."""
+        return [f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self._shard_location(shard)}" for shard in self.POSTGRES_SHARDS]
+
+    def _shard_location(self, shard: str) -> str:
+        """Turn a "database" or "host[:port]/database" shard into "host:port/database"."""
+        host, _, database = shard.rpartition("/")
+        return f"{self._replica_netloc(host) if host else f'{self.POSTGRES_HOST}:{str(self.POSTGRES_PORT)}'}/{database}"
+
+    def _replica_netloc(self, host: str) -> str:
+        """Add the primary's port to a replica host given without one."""
+        return host if ":" in host else f"{host}:{str(self.POSTGRES_PORT)}"
+
+    # Connection pool settings
+    DB_POOL_MODE : str = Field(
+        default="queue", # "static" shares a single connection, "null" disables pooling
+        description="Connection pool mode"
+    )
+    DB_POOL_SIZE : int = Field(
+        default=20,
+        description="Number of persistent connections in the pool"
+    )
+    DB_MAX_OVERFLOW : int = Field(
+        default=30,
+        description="Number of connections allowed above the pool size"
+    )
+    DB_POOL_TIMEOUT : float = Field(
+        default=10.0,
+        description="Seconds to wait for a pooled connection"
+    )
+    DB_POOL_RECYCLE : int = Field(
+        default=1800,
+        description="Seconds after which a pooled connection is recycled"
+    )
+    DB_POOL_PRE_PING : bool = Field(
+        default=True,
+        description="Test pooled connections for liveness on checkout"
+    )
+    DB_PREPARED_STATEMENT_CACHE_SIZE : int = Field(
+        default=500, # Set to 0 behind PgBouncer in transaction pooling mode
+        description="Server-side prepared statements cached per async connection"
+    )
+    DB_STATEMENT_TIMING : bool = Field(
+        default=True,
+        description="Record per-statement execution times"
+    )
+    DB_TIME_ORDERED_IDS : bool = Field(
+        default=True, # Existing uuid4 ids stay valid, both kinds share the same columns
+        description="Generate time-ordered UUIDv7 primary keys"
+    )
+    DB_PARTITION_MONTHS_AHEAD : int = Field(
+        default=3, # Inserts fail once maintenance has not run for this many months
+        description="Monthly partitions created ahead of the current month"
+    )
+    DB_PARTITION_RETENTION_MONTHS : int = Field(
+        default=24, # Older months are detached to the archive schema
+        description="Months kept attached to partitioned tables"
+    )
+    DB_ARCHIVE_TABLESPACE : Optional[str] = Field(
+        default=None, # e.g. a tablespace on cheaper disks, must exist
+        description="Tablespace of archived partitions"
+    )
+    DB_PARTITION_MAINTENANCE_INTERVAL_SECONDS : int = Field(
+        default=86400,
+        description="Seconds between partition maintenance runs"
+    )
+    MARKET_LOAN_CATALOG_TTL_SECONDS : float = Field(
+        default=300, # Writes from this process invalidate the catalog at once
+        description="Seconds between checks of market_loans for changes"
+    )
+    MARKET_LOAN_IMPORT_BATCH_SIZE : int = Field(
+        default=5000, # Bounds the importer's memory, whatever the catalog size
+        description="Catalog offers validated and staged at a time"
+    )
+    MARKET_LOAN_IMPORT_MAX_ERRORS : int = Field(
+        default=100,
+        description="Rejected catalog offers reported per import"
+    )
+    REFINANCE_PRECOMPUTE_TOP_K : int = Field(
+        default=5, # The refinance agent asks for 3, more are scored live
+        description="Refinance options precomputed per loan"
+    )
+    REFINANCE_PRECOMPUTE_CHUNK_SIZE : int = Field(
+        default=2000, # Bounds the (loans x offers) matrices and each transaction
+        description="Active loans scored at a time"
+    )
+    REFINANCE_PRECOMPUTE_WORKERS : int = Field(
+        default=4,
+        description="Worker processes of the refinance precompute job"
+    )
+    AMORTIZATION_SCHEDULE_CACHE_SIZE : int = Field(
+        default=1024, # At most one row per month of tenure each, computed as they are read
+        description="Amortization schedules cached per process"
+    )
+
     # MCP settings 
     MCP_SERVERS_CONFIG_FILE : str = "mcp-servers.json"
 
@@ -129,6 +283,19 @@ class Settings(BaseSettings):
     AGENT_MODEL : str = "gemini-2.0-flash-exp"
     AGENT_OUTPUT_KEY : str = "last_response"
 
+    # Tool concurrency settings
+    TOOL_DEFAULT_CONCURRENCY : int = 16
+    TOOL_CONCURRENCY_LIMITS : Dict[str, int] = Field(
+        default={
+            "get_user_details_tool": 32,
+            "get_available_market_loans_tool": 32,
+            "save_new_loan_request_tool": 16,
+            "save_switch_loan_request_tool": 16,
+            "web_search_tool": 8,
+        },
+        description="Maximum concurrent calls per ADK tool"
+    )
+
     model_config = SettingsConfigDict(
         env_file = ".env",
         env_file_encoding = "utf-8",
@@ -1,5 +1,6 @@
 """Datetime utilities for consistent timezone handling accross the application"""
-from datetime import datetime, timezone 
+from datetime import date, datetime, timezone 
+from typing import Any, Optional
 
 def utc_now() -> datetime:
     """
@@ -25,3 +26,26 @@ def utc_now_naive() -> datetime:
         This is specifically for SQLAlchemy models that uses TIMESTAMPS witout TIME Zone columns. For application logic, use utc_now_naive() instead.
     """
     return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def parse_date(value: Any) -> Optional[date]:
+    """
+    Parse a calendar date from a date, a datetime or an ISO string.
+
+    Args:
+        value: A date, a datetime, or a string starting with ``YYYY-MM-DD`` (e.g. ``2025-07-15`` or ``2025-07-15T10:00:00``).
+
+    Returns:
+        The date, or None for None, empty and unparseable values.
+
+    Note:
+        Dates reach us as free-form strings from Fi MCP and the agents, so a bad value is dropped rather than
+        failing the whole write. The date migration parses stored strings the same way.
+    """
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
@@ -11,3 +11,68 @@ class NotFoundException(Exception):
         """
         self.message = message
         super().__init__(self.message)
+
+
+class InvalidCursorException(Exception):
+    """Exception raised when a pagination cursor cannot be decoded."""
+    def __init__(self, message: Optional[str] = "Invalid pagination cursor"):
+        """Create a new InvalidCursorException instance.
+
+        Args:
+        --- 
+            message (str, optional) : The error message. Has default message. 
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class InvalidFilterException(Exception):
+    """Exception raised when a list filter uses an unsupported field or operator."""
+    def __init__(self, message: Optional[str] = "Invalid filter"):
+        """Create a new InvalidFilterException instance.
+
+        Args:
+        --- 
+            message (str, optional) : The error message. Has default message. 
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class ShardRoutingException(Exception):
+    """Exception raised when a statement cannot be routed to a database shard."""
+    def __init__(self, message: Optional[str] = "Cannot choose a database shard"):
+        """Create a new ShardRoutingException instance.
+
+        Args:
+        --- 
+            message (str, optional) : The error message. Has default message. 
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class CatalogFormatException(Exception):
+    """Exception raised when a catalog file cannot be parsed at all."""
+    def __init__(self, message: Optional[str] = "Invalid catalog file"):
+        """Create a new CatalogFormatException instance.
+
+        Args:
+        --- 
+            message (str, optional) : The error message. Has default message. 
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class IncompleteLoanTermsException(Exception):
+    """Exception raised when a loan lacks the balance, interest rate or tenure to amortize it."""
+    def __init__(self, message: Optional[str] = "Loan is missing its balance, interest rate or tenure"):
+        """Create a new IncompleteLoanTermsException instance.
+
+        Args:
+        --- 
+            message (str, optional) : The error message. Has default message. 
+        """
+        self.message = message
+        super().__init__(self.message)
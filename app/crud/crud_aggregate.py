@@ -0,0 +1,57 @@
+"""Per-user SQL aggregates over a child table (bank accounts, loans, investments)."""
+from typing import Any, Dict, Sequence, Type
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+from app.database.base import Base
+import uuid
+
+
+def grouped_totals(
+    db: Session,
+    model: Type[Base],
+    *,
+    user_id: uuid.UUID,
+    group_by: Sequence[str],
+    totals: Dict[str, ColumnElement],
+) -> Dict[str, Any]:
+    """Count and sum a user's rows overall and per value of each grouping column, in one query.
+
+    Uses ``GROUPING SETS``, so the overall totals and every breakdown come back
+    from a single scan without loading any rows into Python. NULL and empty
+    group values are reported as ``"Unknown"``.
+
+    Args:
+        db (Session): The database session.
+        model (Type[Base]): The child model, e.g. ``Loan``.
+        user_id (uuid.UUID): The owning user.
+        group_by (Sequence[str]): The columns to break the totals down by, e.g. ``("lender", "status")``.
+        totals (Dict[str, ColumnElement]): Output name -> expression to sum, e.g. ``{"total_liability": Loan.current_balance}``.
+
+    Returns:
+        Dict[str, Any]: ``count`` and each total, plus ``by_<column>`` mapping each group value to its own count and totals.
+    """
+    keys = [func.coalesce(func.nullif(getattr(model, column), ""), "Unknown") for column in group_by]
+    aggregates = [func.count().label("count")] + [
+        func.coalesce(func.sum(expression), 0).label(name) for name, expression in totals.items()
+    ]
+    grouping = [func.grouping(*keys).label("grouping")] if keys else []
+    stmt = (
+        select(*keys, *grouping, *aggregates)
+        .where(model.user_id == user_id)
+        .group_by(func.grouping_sets(tuple_(), *keys))
+    )
+
+    result: Dict[str, Any] = {f"by_{column}": {} for column in group_by}
+    result.update({"count": 0, **{name: 0 for name in totals}})
+    all_bits = (1 << len(keys)) - 1
+    for row in db.execute(stmt):
+        values = {"count": row.count, **{name: row._mapping[name] for name in totals}}
+        if not keys or row.grouping == all_bits:
+            result.update(values)
+            continue
+        # GROUPING() sets a bit for every key that is *not* part of this row's grouping set
+        for i, column in enumerate(group_by):
+            if not row.grouping & (1 << (len(keys) - 1 - i)):
+                result[f"by_{column}"][row[i]] = values
+    return result
@@ -1,12 +1,25 @@
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, select, func, update, delete
 from app.database.models.bank_account import BankAccount
+from app.crud.crud_pagination import Page, paginate
+from app.crud.crud_filter import FilterCompiler, EQ, SEARCH, RANGE
+from app.crud.crud_aggregate import grouped_totals
 from datetime import datetime
 import uuid
+from app.database.async_adapter import AsyncSessionAdapter
 
 
 class CRUDBankAccount:
+    # Filterable columns and operators, each backed by an index (see app.database.migrations)
+    filter_compiler = FilterCompiler(BankAccount, {
+        "user_id": EQ,
+        "bank_name": SEARCH,
+        "account_number": EQ,
+        "account_type": EQ,
+        "balance": RANGE,
+    })
+
     def get(self, db: Session, bank_account_id: uuid.UUID) -> Optional[BankAccount]:
         """Get bank account by ID."""
         return db.query(BankAccount).filter(BankAccount.id == bank_account_id).first()
@@ -23,30 +36,29 @@ class CRUDBankAccount:
         self, 
         db: Session, 
         *, 
-        skip: int = 0, 
+        cursor: Optional[str] = None, 
         limit: int = 100,
         filters: Optional[Dict[str, Any]] = None
-    ) -> List[BankAccount]:
-        """Get multiple bank accounts with optional filtering."""
-        query = db.query(BankAccount)
-        
-        if filters:
-            for field, value in filters.items():
-                if hasattr(BankAccount, field) and value is not None:
-                    if isinstance(value, str):
-                        query = query.filter(getattr(BankAccount, field).ilike(f"%{value}%"))
-                    else:
-                        query = query.filter(getattr(BankAccount, field) == value)
-        
-        return query.offset(skip).limit(limit).all()
+    ) -> Page[BankAccount]:
+        """Get multiple bank accounts with optional filtering, one keyset page at a time."""
+        stmt = select(BankAccount).where(*self.filter_compiler.compile(filters or {}))
+        return paginate(db, stmt, BankAccount, cursor=cursor, limit=limit)
     
     def create(self, db: Session, *, obj_in: Dict[str, Any]) -> BankAccount:
-        """Create a new bank account."""
-        db_obj = BankAccount(**obj_in)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Create a new bank account with INSERT ... RETURNING.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.scalars(insert(BankAccount).returning(BankAccount), [obj_in]).one()
+    
+    def create_many(self, db: Session, *, objs_in: List[Dict[str, Any]]) -> List[uuid.UUID]:
+        """Create many bank accounts with a multi-row INSERT ... RETURNING.
+
+        Does not commit, so the caller can write several tables in one transaction.
+        """
+        if not objs_in:
+            return []
+        return list(db.scalars(insert(BankAccount).returning(BankAccount.id), objs_in))
     
     def update(
         self, 
@@ -55,24 +67,24 @@ class CRUDBankAccount:
         db_obj: BankAccount, 
         obj_in: Dict[str, Any]
     ) -> BankAccount:
-        """Update bank account."""
-        for field, value in obj_in.items():
-            if hasattr(db_obj, field):
-                setattr(db_obj, field, value)
-        
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Update bank account columns with UPDATE ... RETURNING, refreshing ``db_obj`` in place.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        changes = {field: value for field, value in obj_in.items() if field in BankAccount.__table__.c}
+        if not changes:
+            return db_obj
+        return db.scalars(
+            update(BankAccount).where(BankAccount.id == db_obj.id).values(**changes).returning(BankAccount),
+            execution_options={"populate_existing": True},
+        ).one()
     
     def delete(self, db: Session, *, bank_account_id: uuid.UUID) -> bool:
-        """Delete bank account."""
-        obj = db.query(BankAccount).get(bank_account_id)
-        if obj:
-            db.delete(obj)
-            db.commit()
-            return True
-        return False
+        """Delete bank account with DELETE ... RETURNING, False if it does not exist.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.execute(delete(BankAccount).where(BankAccount.id == bank_account_id).returning(BankAccount.id)).first() is not None
     
     def is_exists(self, db: Session, bank_account_id: uuid.UUID) -> bool:
         """Check if bank account exists."""
@@ -80,9 +92,13 @@ class CRUDBankAccount:
     
     def get_total_balance_by_user(self, db: Session, user_id: uuid.UUID) -> float:
         """Get total balance across all bank accounts for a user."""
-        accounts = self.get_by_user_id(db, user_id)
-        total_balance = sum(account.balance or 0 for account in accounts)
-        return total_balance
+        return db.scalar(select(func.coalesce(func.sum(BankAccount.balance), 0)).where(BankAccount.user_id == user_id))
+    
+    def get_totals_by_user(self, db: Session, user_id: uuid.UUID, group_by: Sequence[str] = ()) -> Dict[str, Any]:
+        """Get the account count and total balance for a user, optionally broken down by columns, in one query."""
+        return grouped_totals(
+            db, BankAccount, user_id=user_id, group_by=group_by, totals={"total_balance": BankAccount.balance}
+        )
     
     def get_accounts_by_bank(self, db: Session, bank_name: str) -> List[BankAccount]:
         """Get all accounts for a specific bank."""
@@ -94,3 +110,4 @@ class CRUDBankAccount:
 
 
 bank_account = CRUDBankAccount()
+async_bank_account = AsyncSessionAdapter(bank_account)
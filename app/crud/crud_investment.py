@@ -1,12 +1,28 @@
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, select, func, update, delete
 from app.database.models.investment import Investment
-from datetime import datetime
+from app.crud.crud_pagination import Page, paginate
+from app.crud.crud_filter import FilterCompiler, EQ, SEARCH, RANGE
+from app.crud.crud_aggregate import grouped_totals
+from app.core.datetime_utils import parse_date
+from datetime import datetime, date
 import uuid
+from app.database.async_adapter import AsyncSessionAdapter
 
 
 class CRUDInvestment:
+    # Filterable columns and operators, each backed by an index (see app.database.migrations)
+    filter_compiler = FilterCompiler(Investment, {
+        "user_id": EQ,
+        "investment_id": EQ,
+        "institution": SEARCH,
+        "investment_type": EQ,
+        "current_value": RANGE,
+        "start_date": RANGE,
+        "maturity_date": RANGE,
+    })
+
     def get(self, db: Session, investment_id: uuid.UUID) -> Optional[Investment]:
         """Get investment by ID."""
         return db.query(Investment).filter(Investment.id == investment_id).first()
@@ -31,30 +47,29 @@ class CRUDInvestment:
         self, 
         db: Session, 
         *, 
-        skip: int = 0, 
+        cursor: Optional[str] = None, 
         limit: int = 100,
         filters: Optional[Dict[str, Any]] = None
-    ) -> List[Investment]:
-        """Get multiple investments with optional filtering."""
-        query = db.query(Investment)
-        
-        if filters:
-            for field, value in filters.items():
-                if hasattr(Investment, field) and value is not None:
-                    if isinstance(value, str):
-                        query = query.filter(getattr(Investment, field).ilike(f"%{value}%"))
-                    else:
-                        query = query.filter(getattr(Investment, field) == value)
-        
-        return query.offset(skip).limit(limit).all()
+    ) -> Page[Investment]:
+        """Get multiple investments with optional filtering, one keyset page at a time."""
+        stmt = select(Investment).where(*self.filter_compiler.compile(filters or {}))
+        return paginate(db, stmt, Investment, cursor=cursor, limit=limit)
     
     def create(self, db: Session, *, obj_in: Dict[str, Any]) -> Investment:
-        """Create a new investment."""
-        db_obj = Investment(**obj_in)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Create a new investment with INSERT ... RETURNING.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.scalars(insert(Investment).returning(Investment), [obj_in]).one()
+    
+    def create_many(self, db: Session, *, objs_in: List[Dict[str, Any]]) -> List[uuid.UUID]:
+        """Create many investments with a multi-row INSERT ... RETURNING.
+
+        Does not commit, so the caller can write several tables in one transaction.
+        """
+        if not objs_in:
+            return []
+        return list(db.scalars(insert(Investment).returning(Investment.id), objs_in))
     
     def update(
         self, 
@@ -63,24 +78,24 @@ class CRUDInvestment:
         db_obj: Investment, 
         obj_in: Dict[str, Any]
     ) -> Investment:
-        """Update investment."""
-        for field, value in obj_in.items():
-            if hasattr(db_obj, field):
-                setattr(db_obj, field, value)
-        
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Update investment columns with UPDATE ... RETURNING, refreshing ``db_obj`` in place.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        changes = {field: value for field, value in obj_in.items() if field in Investment.__table__.c}
+        if not changes:
+            return db_obj
+        return db.scalars(
+            update(Investment).where(Investment.id == db_obj.id).values(**changes).returning(Investment),
+            execution_options={"populate_existing": True},
+        ).one()
     
     def delete(self, db: Session, *, investment_id: uuid.UUID) -> bool:
-        """Delete investment."""
-        obj = db.query(Investment).get(investment_id)
-        if obj:
-            db.delete(obj)
-            db.commit()
-            return True
-        return False
+        """Delete investment with DELETE ... RETURNING, False if it does not exist.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.execute(delete(Investment).where(Investment.id == investment_id).returning(Investment.id)).first() is not None
     
     def is_exists(self, db: Session, investment_id: uuid.UUID) -> bool:
         """Check if investment exists."""
@@ -88,16 +103,45 @@ class CRUDInvestment:
     
     def get_total_investment_value_by_user(self, db: Session, user_id: uuid.UUID) -> float:
         """Get total current value of investments for a user."""
-        investments = self.get_by_user_id(db, user_id)
-        total_value = sum(investment.current_value or 0 for investment in investments)
-        return total_value
+        return db.scalar(select(func.coalesce(func.sum(Investment.current_value), 0)).where(Investment.user_id == user_id))
+    
+    def get_totals_by_user(self, db: Session, user_id: uuid.UUID, group_by: Sequence[str] = ()) -> Dict[str, Any]:
+        """Get the investment count, value and amount invested for a user, optionally broken down by columns, in one query."""
+        return grouped_totals(
+            db,
+            Investment,
+            user_id=user_id,
+            group_by=group_by,
+            totals={"total_value": Investment.current_value, "total_invested": Investment.amount_invested},
+        )
+    
+    def get_analytics_by_user(self, db: Session, user_id: uuid.UUID) -> Dict[str, Any]:
+        """Get investment counts, totals and average return rate for a user in one query."""
+        has_return = and_(Investment.amount_invested > 0, Investment.current_value.is_not(None), Investment.current_value != 0)
+        row = db.execute(
+            select(
+                func.count().label("total_investments"),
+                func.count().filter(Investment.maturity_date < date.today()).label("matured_investments"),
+                func.count().filter(
+                    and_(Investment.amount_invested != 0, Investment.current_value > Investment.amount_invested)
+                ).label("profitable_investments"),
+                func.coalesce(func.sum(Investment.current_value), 0).label("total_value"),
+                func.coalesce(func.sum(Investment.amount_invested), 0).label("total_invested"),
+                func.coalesce(
+                    func.avg((Investment.current_value - Investment.amount_invested) / Investment.amount_invested * 100).filter(has_return), 0
+                ).label("average_return_rate"),
+            ).where(Investment.user_id == user_id)
+        ).one()
+        return dict(row._mapping)
     
     def get_matured_investments(self, db: Session) -> List[Investment]:
-        """Get all matured investments."""
-        current_date = datetime.now()
+        """Get all matured investments.
+
+        Range scan over the index on ``maturity_date``.
+        """
         return db.query(Investment).filter(
             and_(
-                Investment.maturity_date < current_date,
+                Investment.maturity_date < date.today(),
                 Investment.current_value > 0
             )
         ).all()
@@ -111,14 +155,14 @@ class CRUDInvestment:
     def get_investments_by_date_range(
         self, 
         db: Session, 
-        start_date: datetime, 
-        end_date: datetime
+        start_date: Union[date, datetime], 
+        end_date: Union[date, datetime]
     ) -> List[Investment]:
-        """Get investments started within a date range."""
+        """Get investments started within a date range, both ends inclusive."""
         return db.query(Investment).filter(
             and_(
-                Investment.start_date >= start_date,
-                Investment.start_date <= end_date
+                Investment.start_date >= parse_date(start_date),
+                Investment.start_date <= parse_date(end_date)
             )
         ).all()
     
@@ -128,3 +172,4 @@ class CRUDInvestment:
 
 
 investment = CRUDInvestment()
+async_investment = AsyncSessionAdapter(investment)
@@ -1,19 +1,37 @@
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, select, func, update, delete, lambda_stmt
 from app.database.models.loan import Loan
-from datetime import datetime
+from app.crud.crud_pagination import Page, paginate
+from app.crud.crud_filter import FilterCompiler, EQ, SEARCH, RANGE
+from app.crud.crud_aggregate import grouped_totals
+from datetime import datetime, date
 import uuid
+from app.database.async_adapter import AsyncSessionAdapter
 
 
 class CRUDLoan:
+    # Filterable columns and operators, each backed by an index (see app.database.migrations)
+    filter_compiler = FilterCompiler(Loan, {
+        "user_id": EQ,
+        "loan_id": EQ,
+        "lender": SEARCH,
+        "loan_type": EQ,
+        "status": EQ,
+        "interest_rate": RANGE,
+        "due_date": RANGE,
+    })
+
     def get(self, db: Session, loan_id: uuid.UUID) -> Optional[Loan]:
         """Get loan by ID."""
         return db.query(Loan).filter(Loan.id == loan_id).first()
     
     def get_by_user_id(self, db: Session, user_id: uuid.UUID) -> List[Loan]:
-        """Get all loans for a user."""
-        return db.query(Loan).filter(Loan.user_id == user_id).all()
+        """Get all loans for a user.
+
+        A lambda statement, built once and re-bound per call, since the agents run it on every chat turn.
+        """
+        return db.scalars(lambda_stmt(lambda: select(Loan).where(Loan.user_id == user_id))).all()
     
     def get_by_loan_id(self, db: Session, loan_id: str) -> Optional[Loan]:
         """Get loan by loan_id field."""
@@ -31,30 +49,29 @@ class CRUDLoan:
         self, 
         db: Session, 
         *, 
-        skip: int = 0, 
+        cursor: Optional[str] = None, 
         limit: int = 100,
         filters: Optional[Dict[str, Any]] = None
-    ) -> List[Loan]:
-        """Get multiple loans with optional filtering."""
-        query = db.query(Loan)
-        
-        if filters:
-            for field, value in filters.items():
-                if hasattr(Loan, field) and value is not None:
-                    if isinstance(value, str):
-                        query = query.filter(getattr(Loan, field).ilike(f"%{value}%"))
-                    else:
-                        query = query.filter(getattr(Loan, field) == value)
-        
-        return query.offset(skip).limit(limit).all()
+    ) -> Page[Loan]:
+        """Get multiple loans with optional filtering, one keyset page at a time."""
+        stmt = select(Loan).where(*self.filter_compiler.compile(filters or {}))
+        return paginate(db, stmt, Loan, cursor=cursor, limit=limit)
     
     def create(self, db: Session, *, obj_in: Dict[str, Any]) -> Loan:
-        """Create a new loan."""
-        db_obj = Loan(**obj_in)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Create a new loan with INSERT ... RETURNING.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.scalars(insert(Loan).returning(Loan), [obj_in]).one()
+    
+    def create_many(self, db: Session, *, objs_in: List[Dict[str, Any]]) -> List[uuid.UUID]:
+        """Create many loans with a multi-row INSERT ... RETURNING.
+
+        Does not commit, so the caller can write several tables in one transaction.
+        """
+        if not objs_in:
+            return []
+        return list(db.scalars(insert(Loan).returning(Loan.id), objs_in))
     
     def update(
         self, 
@@ -63,24 +80,24 @@ class CRUDLoan:
         db_obj: Loan, 
         obj_in: Dict[str, Any]
     ) -> Loan:
-        """Update loan."""
-        for field, value in obj_in.items():
-            if hasattr(db_obj, field):
-                setattr(db_obj, field, value)
-        
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Update loan columns with UPDATE ... RETURNING, refreshing ``db_obj`` in place.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        changes = {field: value for field, value in obj_in.items() if field in Loan.__table__.c}
+        if not changes:
+            return db_obj
+        return db.scalars(
+            update(Loan).where(Loan.id == db_obj.id).values(**changes).returning(Loan),
+            execution_options={"populate_existing": True},
+        ).one()
     
     def delete(self, db: Session, *, loan_id: uuid.UUID) -> bool:
-        """Delete loan."""
-        obj = db.query(Loan).get(loan_id)
-        if obj:
-            db.delete(obj)
-            db.commit()
-            return True
-        return False
+        """Delete loan with DELETE ... RETURNING, False if it does not exist.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.execute(delete(Loan).where(Loan.id == loan_id).returning(Loan.id)).first() is not None
     
     def is_exists(self, db: Session, loan_id: uuid.UUID) -> bool:
         """Check if loan exists."""
@@ -88,9 +105,28 @@ class CRUDLoan:
     
     def get_total_liability_by_user(self, db: Session, user_id: uuid.UUID) -> float:
         """Get total loan liability for a user."""
-        loans = self.get_by_user_id(db, user_id)
-        total_liability = sum(loan.current_balance or 0 for loan in loans)
-        return total_liability
+        return db.scalar(select(func.coalesce(func.sum(Loan.current_balance), 0)).where(Loan.user_id == user_id))
+    
+    def get_totals_by_user(self, db: Session, user_id: uuid.UUID, group_by: Sequence[str] = ()) -> Dict[str, Any]:
+        """Get the loan count and total liability for a user, optionally broken down by columns, in one query."""
+        return grouped_totals(
+            db, Loan, user_id=user_id, group_by=group_by, totals={"total_liability": Loan.current_balance}
+        )
+    
+    def get_analytics_by_user(self, db: Session, user_id: uuid.UUID) -> Dict[str, Any]:
+        """Get loan counts, EMI, liability and average interest rate for a user in one query."""
+        rated = and_(Loan.interest_rate.is_not(None), Loan.interest_rate != 0)
+        row = db.execute(
+            select(
+                func.count().label("total_loans"),
+                func.count().filter(func.lower(Loan.status) == "active").label("active_loans"),
+                func.count().filter(Loan.due_date < date.today()).label("overdue_loans"),
+                func.coalesce(func.sum(Loan.emi_amount), 0).label("total_emi"),
+                func.coalesce(func.avg(Loan.interest_rate).filter(rated), 0).label("average_interest_rate"),
+                func.coalesce(func.sum(Loan.current_balance), 0).label("total_liability"),
+            ).where(Loan.user_id == user_id)
+        ).one()
+        return dict(row._mapping)
     
     def get_active_loans_by_user(self, db: Session, user_id: uuid.UUID) -> List[Loan]:
         """Get all active loans for a user."""
@@ -102,11 +138,13 @@ class CRUDLoan:
         ).all()
     
     def get_overdue_loans(self, db: Session) -> List[Loan]:
-        """Get all overdue loans."""
-        current_date = datetime.now()
+        """Get all overdue loans.
+
+        Range scan over the partial index on ``due_date`` of active loans.
+        """
         return db.query(Loan).filter(
             and_(
-                Loan.due_date < current_date,
+                Loan.due_date < date.today(),
                 Loan.status == "active"
             )
         ).all()
@@ -135,3 +173,4 @@ class CRUDLoan:
 
 
 loan = CRUDLoan()
+async_loan = AsyncSessionAdapter(loan)
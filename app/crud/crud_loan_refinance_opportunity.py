@@ -0,0 +1,134 @@
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, select, delete, cast, func, Text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql import ColumnElement
+from app.database.models.loan import Loan
+from app.database.models.loan_refinance_opportunity import LoanRefinanceOpportunity
+from datetime import datetime
+import uuid
+from app.database.async_adapter import AsyncSessionAdapter
+
+# Upserted columns, everything but created_at
+UPSERT_COLUMNS = ("user_id", "modified_at", "loan_modified_at", "catalog_digest", "top_k", "best_net_savings", "options")
+
+
+def in_partition(column: Any, partition: int, partitions: int) -> List[ColumnElement]:
+    """Select one of ``partitions`` disjoint slices of the rows by a hash of their id, no condition for a single partition.
+
+    The low bits of an id are its shard number, so the whole id is hashed rather than taken modulo.
+    """
+    if partitions <= 1:
+        return []
+    # hashtext is signed, the mask keeps the modulo non-negative
+    return [func.hashtext(cast(column, Text)).op("&")(0x7FFFFFFF) % partitions == partition]
+
+
+class CRUDLoanRefinanceOpportunity:
+    def get_by_loan_ids(self, db: Session, loan_ids: Sequence[uuid.UUID]) -> List[LoanRefinanceOpportunity]:
+        """Get the opportunities of the given loans, those without one are left out."""
+        if not loan_ids:
+            return []
+        return db.scalars(select(LoanRefinanceOpportunity).where(LoanRefinanceOpportunity.id.in_(loan_ids))).all()
+
+    def get_stale_loans(
+        self,
+        db: Session,
+        *,
+        catalog_digest: str,
+        top_k: int,
+        scored_since: datetime,
+        after_id: Optional[uuid.UUID] = None,
+        page_size: int = 1000,
+        partition: int = 0,
+        partitions: int = 1,
+    ) -> Tuple[List[Loan], Optional[uuid.UUID]]:
+        """Get the active loans whose opportunity is missing or out of date, among the next ``page_size`` loans by id.
+
+        An opportunity is out of date when the loan was modified after it was
+        scored, the market offers changed (a different ``catalog_digest``), it
+        holds fewer than ``top_k`` options or it was scored before ``scored_since``.
+
+        The page of ids is read first, so each call reads at most ``page_size``
+        entries of the primary key index however few loans are out of date,
+        instead of scanning and sorting every remaining loan for a LIMIT.
+
+        Args:
+            db (Session): The database session.
+            catalog_digest (str): The digest of the current market offers.
+            top_k (int): The options kept per loan.
+            scored_since (datetime): Opportunities scored earlier are out of date.
+            after_id (Optional[uuid.UUID]): The last id of the previous page, None for the first page.
+            page_size (int): The loans looked at, out of date or not.
+            partition (int): The slice of the loans to read, see ``in_partition``.
+            partitions (int): The number of slices.
+
+        Returns:
+            Tuple[List[Loan], Optional[uuid.UUID]]: The out of date loans of the page, ordered by id, and the last id of the page, None past the last loan.
+        """
+        ids = db.scalars(
+            select(Loan.id).where(*([Loan.id > after_id] if after_id is not None else [])).order_by(Loan.id).limit(page_size)
+        ).all()
+        if not ids:
+            return [], None
+
+        opportunity = LoanRefinanceOpportunity
+        stmt = (
+            select(Loan)
+            .outerjoin(opportunity, opportunity.id == Loan.id)
+            .where(
+                Loan.id.between(ids[0], ids[-1]),
+                Loan.status == "active",
+                *in_partition(Loan.id, partition, partitions),
+                or_(
+                    opportunity.id.is_(None),
+                    opportunity.loan_modified_at != Loan.modified_at,
+                    opportunity.catalog_digest != catalog_digest,
+                    opportunity.top_k < top_k,
+                    opportunity.modified_at < scored_since,
+                ),
+            )
+            .order_by(Loan.id)
+        )
+        return db.scalars(stmt).all(), ids[-1]
+
+    def upsert_many(self, db: Session, rows: Sequence[Dict[str, Any]]) -> None:
+        """Insert or replace the opportunities of a chunk of loans.
+
+        Sent as an executemany, which SQLAlchemy batches into multi-row INSERTs
+        with a statement compiled once, unlike ``.values()`` with a list of rows.
+        A row never replaces one scored from a newer version of the loan, which
+        a concurrent run may have written in the meantime. Does not commit.
+        """
+        if not rows:
+            return
+        stmt = pg_insert(LoanRefinanceOpportunity)
+        excluded = stmt.excluded
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[LoanRefinanceOpportunity.id],
+                set_={column: excluded[column] for column in UPSERT_COLUMNS},
+                where=LoanRefinanceOpportunity.loan_modified_at <= excluded.loan_modified_at,
+            ),
+            list(rows),
+            # Otherwise the ORM splits the rows into one batch per run of NULL and non-NULL best_net_savings
+            execution_options={"render_nulls": True},
+        )
+
+    def delete_inactive(self, db: Session, partition: int = 0, partitions: int = 1) -> int:
+        """Delete the opportunities of loans that are no longer active; deleted loans cascade. Does not commit.
+
+        Returns:
+            int: The number of opportunities deleted.
+        """
+        opportunity = LoanRefinanceOpportunity
+        stmt = delete(opportunity).where(
+            opportunity.id == Loan.id,
+            or_(Loan.status.is_(None), Loan.status != "active"),
+            *in_partition(opportunity.id, partition, partitions),
+        )
+        return db.execute(stmt).rowcount
+
+
+loan_refinance_opportunity = CRUDLoanRefinanceOpportunity()
+async_loan_refinance_opportunity = AsyncSessionAdapter(loan_refinance_opportunity)
@@ -1,60 +1,146 @@
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Tuple, Union, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select, insert, update, delete, lambda_stmt, bindparam, literal, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.database.models.loan_request import LoanRequest
-from datetime import datetime
+from app.database.models.loan_request_key import KEY_ELEMENTS, LoanRequestKey
+from app.crud.crud_pagination import Page, paginate
+from app.crud.crud_filter import FilterCompiler, EQ, RANGE
+from app.core.uuid_utils import uuid7_datetime
+from datetime import datetime, timedelta
 import uuid
+from app.database.async_adapter import AsyncSessionAdapter
+
+# How far a row's created_at may be from the time in its UUIDv7 id; both are taken when the row is inserted
+ID_TIME_SLACK = timedelta(days=1)
+
+
+def created_near_id(loan_request_id: Any) -> List[Any]:
+    """Bound created_at by the time in a UUIDv7 id, so a lookup by id only scans the partition of its month.
+
+    Returns no condition for uuid4 ids, which are looked up in every partition.
+    """
+    try:
+        created = uuid7_datetime(loan_request_id if isinstance(loan_request_id, uuid.UUID) else uuid.UUID(str(loan_request_id)))
+    except ValueError:
+        return []
+    if created is None:
+        return []
+    return [LoanRequest.created_at >= created - ID_TIME_SLACK, LoanRequest.created_at < created + ID_TIME_SLACK]
 
 
 class CRUDLoanRequest:
+    # Filterable columns and operators, each backed by an index (see app.database.migrations).
+    # A created_at bound also limits the scan to the partitions of the months it covers.
+    filter_compiler = FilterCompiler(LoanRequest, {
+        "user_id": EQ,
+        "request_type": EQ,
+        "loan_type": EQ,
+        "status": EQ,
+        "created_at": RANGE,
+    })
+
     def get(self, db: Session, loan_request_id: uuid.UUID) -> Optional[LoanRequest]:
-        """Get loan request by ID."""
-        return db.query(LoanRequest).filter(LoanRequest.id == loan_request_id).first()
+        """Get loan request by ID, from the partition of the month in its id when it is a UUIDv7."""
+        return db.query(LoanRequest).filter(LoanRequest.id == loan_request_id, *created_near_id(loan_request_id)).first()
     
-    def get_by_user_id(self, db: Session, user_id: uuid.UUID) -> List[LoanRequest]:
-        """Get all loan requests for a user."""
-        return db.query(LoanRequest).filter(LoanRequest.user_id == user_id).all()
+    def get_by_user_id(self, db: Session, user_id: uuid.UUID, created_after: Optional[datetime] = None) -> List[LoanRequest]:
+        """Get all loan requests for a user, only from the partitions after ``created_after`` when given."""
+        query = db.query(LoanRequest).filter(LoanRequest.user_id == user_id)
+        if created_after is not None:
+            query = query.filter(LoanRequest.created_at >= created_after)
+        return query.all()
     
     def get_by_from_loan_id(self, db: Session, from_loan_id: str) -> Optional[LoanRequest]:  
         """Get loan request by from_loan_id field."""
         return db.query(LoanRequest).filter(LoanRequest.from_loan_id == from_loan_id).first()
     
     def get_by_to_loan_id(self, db: Session, to_loan_id: str) -> Optional[LoanRequest]:  
-        """Get loan request by to_loan_id field."""
-        return db.query(LoanRequest).filter(LoanRequest.to_loan_id == to_loan_id).first()
+        """Get loan request by to_loan_id field.
+
+        A lambda statement, built once and re-bound per call, since every saved loan request runs it.
+        """
+        stmt = lambda_stmt(lambda: select(LoanRequest).where(LoanRequest.to_loan_id == to_loan_id).limit(1))
+        return db.scalars(stmt).first()
     
-    def get_by_status(self, db: Session, status: str) -> List[LoanRequest]:
-        """Get all loan requests with a specific status."""
-        return db.query(LoanRequest).filter(LoanRequest.status == status).all()
+    def get_by_status(self, db: Session, status: str, created_after: Optional[datetime] = None) -> List[LoanRequest]:
+        """Get all loan requests with a specific status, only from the partitions after ``created_after`` when given.
+
+        Pending requests are read from the partial ``ix_loan_requests_pending_created_at_id``,
+        which only holds the pending rows of each month.
+        """
+        query = db.query(LoanRequest).filter(LoanRequest.status == status)
+        if created_after is not None:
+            query = query.filter(LoanRequest.created_at >= created_after)
+        return query.all()
     
     def get_multi(
         self, 
         db: Session, 
         *, 
-        skip: int = 0, 
+        cursor: Optional[str] = None, 
         limit: int = 100,
         filters: Optional[Dict[str, Any]] = None
-    ) -> List[LoanRequest]:
-        """Get multiple loan requests with optional filtering."""
-        query = db.query(LoanRequest)
-        
-        if filters:
-            for field, value in filters.items():
-                if hasattr(LoanRequest, field) and value is not None:
-                    if isinstance(value, str):
-                        query = query.filter(getattr(LoanRequest, field).ilike(f"%{value}%"))
-                    else:
-                        query = query.filter(getattr(LoanRequest, field) == value)
-        
-        return query.offset(skip).limit(limit).all()
+    ) -> Page[LoanRequest]:
+        """Get multiple loan requests with optional filtering, one keyset page at a time."""
+        stmt = select(LoanRequest).where(*self.filter_compiler.compile(filters or {}))
+        return paginate(db, stmt, LoanRequest, cursor=cursor, limit=limit)
     
     def create(self, db: Session, *, obj_in: Dict[str, Any]) -> LoanRequest:
-        """Create a new loan request."""
-        db_obj = LoanRequest(**obj_in)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Create a new loan request with INSERT ... RETURNING.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        return db.scalars(insert(LoanRequest).returning(LoanRequest), [obj_in]).one()
+
+    def create_once(self, db: Session, *, obj_in: Dict[str, Any]) -> Tuple[uuid.UUID, bool]:
+        """Create a loan request unless one with the same key exists, in a single statement.
+
+        Inserts the key with ``INSERT ... ON CONFLICT DO UPDATE`` (see
+        ``LoanRequestKey``) and, in the same statement, the loan request only if
+        the key is new. On a conflict the existing key is locked and returned,
+        also when a concurrent call inserted it after this statement started,
+        which a separate SELECT could not see yet; ``xmax = 0`` tells a new row
+        from an updated one.
+
+        Does not commit, the service operation commits its unit of work once.
+
+        Args:
+            db (Session): The database session.
+            obj_in (Dict[str, Any]): ``user_id``, ``request_type``, ``loan_type``, ``from_loan_id`` and ``to_loan_id``.
+
+        Returns:
+            Tuple[uuid.UUID, bool]: The id of the new or existing loan request, and whether it was created.
+
+        Raises:
+            IntegrityError: If the user does not exist.
+        """
+        key_insert = pg_insert(LoanRequestKey).values(
+            {column: bindparam(column, type_=LoanRequestKey.__table__.c[column].type) for column in ("user_id", "request_type", "from_loan_id", "to_loan_id")}
+        )
+        key = (
+            key_insert.on_conflict_do_update(index_elements=KEY_ELEMENTS, set_={"modified_at": key_insert.excluded.modified_at})
+            .returning(LoanRequestKey.id, LoanRequestKey.created_at, LoanRequestKey.modified_at, literal_column("xmax = 0").label("created"))
+            .cte("key")
+        )
+        columns = ("user_id", "request_type", "loan_type", "from_loan_id", "to_loan_id")
+        request_insert = (
+            insert(LoanRequest)
+            .from_select(
+                ["id", "created_at", "modified_at", "status", *columns],
+                select(
+                    # The status column's default, "pending"
+                    key.c.id, key.c.created_at, key.c.modified_at, literal(LoanRequest.__table__.c.status.default.arg),
+                    *(bindparam(column, type_=LoanRequest.__table__.c[column].type) for column in columns),
+                ).where(key.c.created),
+                # The key's defaults were already generated, they must not be generated a second time
+                include_defaults=False,
+            )
+            .returning(LoanRequest.id)
+            .cte("request")
+        )
+        row = db.execute(select(key.c.id, key.c.created).add_cte(request_insert), obj_in).one()
+        return row.id, row.created
     
     def update(
         self, 
@@ -63,24 +149,37 @@ class CRUDLoanRequest:
         db_obj: LoanRequest, 
         obj_in: Dict[str, Any]
     ) -> LoanRequest:
-        """Update loan request."""
-        for field, value in obj_in.items():
-            if hasattr(db_obj, field):
-                setattr(db_obj, field, value)
-        
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        """Update loan request columns with UPDATE ... RETURNING, refreshing ``db_obj`` in place.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        changes = {field: value for field, value in obj_in.items() if field in LoanRequest.__table__.c}
+        if not changes:
+            return db_obj
+        return db.scalars(
+            update(LoanRequest)
+            .where(LoanRequest.id == db_obj.id, LoanRequest.created_at == db_obj.created_at)
+            .values(**changes)
+            .returning(LoanRequest),
+            execution_options={"populate_existing": True},
+        ).one()
     
     def delete(self, db: Session, *, loan_request_id: uuid.UUID) -> bool:
-        """Delete loan request."""
-        obj = db.query(LoanRequest).get(loan_request_id)
-        if obj:
-            db.delete(obj)
-            db.commit()
-            return True
-        return False
+        """Delete loan request and its idempotency key in one statement, False if it does not exist.
+
+        The key shares the request's id, see ``create_once``; left behind, it would
+        answer the next identical request with the id of the deleted one.
+
+        Does not commit, the service operation commits its unit of work once.
+        """
+        request = (
+            delete(LoanRequest)
+            .where(LoanRequest.id == loan_request_id, *created_near_id(loan_request_id))
+            .returning(LoanRequest.id)
+            .cte("request")
+        )
+        key = delete(LoanRequestKey).where(LoanRequestKey.id.in_(select(request.c.id))).cte("key")
+        return db.execute(select(request.c.id).add_cte(key)).first() is not None
     
    
     def get_by_query(self, db: Session, queryFilter: str) -> List[LoanRequest]:
@@ -99,3 +198,4 @@ class CRUDLoanRequest:
 
 
 loan_request = CRUDLoanRequest()
+async_loan_request = AsyncSessionAdapter(loan_request)
@@ -1,7 +1,8 @@
 from app.database.models.market_loan import MarketLoan
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, lambda_stmt, select
 from typing import List, Optional
+from app.database.async_adapter import AsyncSessionAdapter
 
 class CRUDMarketLoan:
 
@@ -58,11 +59,25 @@ class CRUDMarketLoan:
         Returns:
             List[Loan]: List of loans matching the loan type, amount and tenure.
         """
+        # Runs on every loan search turn: the lambda statements are built once per
+        # process and later calls only re-bind the closure variables
+        loan_type_pattern = f"%{loan_type.lower()}%"
+        stmt = lambda_stmt(
+            lambda: select(MarketLoan).where(
+                func.lower(MarketLoan.loan_type).ilike(loan_type_pattern),
+                MarketLoan.min_loan_amount <= amount,
+                MarketLoan.max_loan_amount >= amount,
+                MarketLoan.roi_start <= interest_rate,
+                MarketLoan.roi_end >= interest_rate,
+                MarketLoan.tenure_upto >= tenure,
+            )
+        )
         if lender_name is not None:
-            return db.query(MarketLoan).filter(func.lower(MarketLoan.loan_type).ilike(f"%{loan_type.lower()}%"), MarketLoan.min_loan_amount <= amount, MarketLoan.max_loan_amount >= amount, MarketLoan.roi_start <= interest_rate, MarketLoan.roi_end >= interest_rate, MarketLoan.tenure_upto >= tenure, func.lower(MarketLoan.lender_name).ilike(f"%{lender_name.lower()}%")).order_by(MarketLoan.roi_start.asc()).limit(5).all()
-        else:
-            return db.query(MarketLoan).filter(func.lower(MarketLoan.loan_type).ilike(f"%{loan_type.lower()}%"), MarketLoan.min_loan_amount <= amount, MarketLoan.max_loan_amount >= amount, MarketLoan.roi_start <= interest_rate, MarketLoan.roi_end >= interest_rate, MarketLoan.tenure_upto >= tenure).order_by(MarketLoan.roi_start.asc()).limit(5).all()
-    
+            lender_name_pattern = f"%{lender_name.lower()}%"
+            stmt += lambda s: s.where(func.lower(MarketLoan.lender_name).ilike(lender_name_pattern))
+        stmt += lambda s: s.order_by(MarketLoan.roi_start.asc()).limit(5)
+        return db.scalars(stmt).all()
 
 
-market_loan = CRUDMarketLoan()
\ No newline at end of file
+market_loan = CRUDMarketLoan()
+async_market_loan = AsyncSessionAdapter(market_loan)
@@ -0,0 +1,145 @@
+"""Diff-based sync of a user's child rows (bank accounts, loans, investments)."""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Sequence, Type
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+from app.core.datetime_utils import utc_now_naive
+from app.database.base import Base
+import uuid
+
+
+@dataclass
+class RowDiff:
+    """The writes needed to turn the stored rows into the incoming rows."""
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    deletes: List[uuid.UUID] = field(default_factory=list)
+    unchanged: int = 0
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "inserted": len(self.inserts),
+            "updated": len(self.updates),
+            "deleted": len(self.deletes),
+            "unchanged": self.unchanged,
+        }
+
+
+def _row_key(row: Dict[str, Any], key: str, columns: Sequence[str]) -> Hashable:
+    """Natural key of a row, or its full content when the natural key is missing."""
+    if row.get(key):
+        return row[key]
+    return ("__content__",) + tuple(row.get(column) for column in columns)
+
+
+def diff_rows(
+    stored_rows: Sequence[Dict[str, Any]],
+    incoming_rows: Sequence[Dict[str, Any]],
+    key: str,
+    columns: Sequence[str],
+) -> RowDiff:
+    """Compare stored rows against incoming rows by natural key.
+
+    Args:
+        stored_rows (Sequence[Dict[str, Any]]): The stored rows, each with an ``id``.
+        incoming_rows (Sequence[Dict[str, Any]]): The incoming rows, without ids.
+        key (str): The natural key column, e.g. ``loan_id``.
+        columns (Sequence[str]): The columns to compare.
+
+    Returns:
+        RowDiff: New rows to insert, changed columns per stored id and stored ids to delete.
+    """
+    stored_by_key: Dict[Hashable, Dict[str, Any]] = {}
+    diff = RowDiff()
+    for row in stored_rows:
+        row_key = _row_key(row, key, columns)
+        if row_key in stored_by_key:
+            # Duplicate stored key, e.g. from an earlier double insert
+            diff.deletes.append(row["id"])
+        else:
+            stored_by_key[row_key] = row
+
+    seen = set()
+    for row in incoming_rows:
+        row_key = _row_key(row, key, columns)
+        if row_key in seen:
+            continue
+        seen.add(row_key)
+
+        stored = stored_by_key.get(row_key)
+        if stored is None:
+            diff.inserts.append(row)
+            continue
+        changes = {column: row.get(column) for column in columns if row.get(column) != stored.get(column)}
+        if changes:
+            diff.updates.append({"id": stored["id"], **changes})
+        else:
+            diff.unchanged += 1
+
+    diff.deletes.extend(stored["id"] for row_key, stored in stored_by_key.items() if row_key not in seen)
+    return diff
+
+
+def _bind_values(model: Type[Base], columns: Sequence[str], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert incoming values the way their column types will store them.
+
+    Stored rows come back as Python values of the column type, e.g. ``date`` for an
+    ``ISODate`` column, while snapshots carry ``"2025-07-15"``; comparing those
+    unconverted would report every row as changed.
+    """
+    decorated = {
+        column: model.__table__.c[column].type
+        for column in columns
+        if isinstance(model.__table__.c[column].type, TypeDecorator)
+    }
+    if not decorated:
+        return rows
+    return [
+        {**row, **{column: type_.process_bind_param(row[column], None) for column, type_ in decorated.items() if column in row}}
+        for row in rows
+    ]
+
+
+class CRUDSync:
+    def sync_user_rows(
+        self,
+        db: Session,
+        model: Type[Base],
+        *,
+        user_id: uuid.UUID,
+        key: str,
+        incoming_rows: List[Dict[str, Any]],
+    ) -> RowDiff:
+        """Write only the inserts, changed columns and deletions of a user's rows.
+
+        Does not commit, so the caller can sync several tables in one transaction.
+
+        Args:
+            db (Session): The database session.
+            model (Type[Base]): The child model, e.g. ``Loan``.
+            user_id (uuid.UUID): The owning user.
+            key (str): The natural key column, e.g. ``loan_id``.
+            incoming_rows (List[Dict[str, Any]]): The rows the user should end up with.
+
+        Returns:
+            RowDiff: The writes that were applied.
+        """
+        columns = sorted({column for row in incoming_rows for column in row if hasattr(model, column)} | {key})
+        incoming_rows = _bind_values(model, columns, incoming_rows)
+        stored_rows = db.execute(
+            select(model.id, *[getattr(model, column) for column in columns]).where(model.user_id == user_id)
+        ).mappings().all()
+
+        diff = diff_rows(stored_rows, incoming_rows, key, columns)
+        if diff.inserts:
+            db.execute(insert(model), [{**row, "user_id": user_id} for row in diff.inserts])
+        if diff.updates:
+            now = utc_now_naive()
+            db.execute(update(model), [{**row, "modified_at": now} for row in diff.updates])
+        if diff.deletes:
+            db.execute(delete(model).where(model.id.in_(diff.deletes)))
+        return diff
+
+
+sync = CRUDSync()
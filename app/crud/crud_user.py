@@ -1,12 +1,30 @@
 """CRUD operations for user model"""
 from app.database.models.user import User 
 from sqlalchemy.orm import Session 
-from sqlalchemy import text
-from typing import Optional, Union, Dict, Any, List
+from sqlalchemy import text, select, func, literal, JSON, insert, update, delete, lambda_stmt
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by
+from sqlalchemy.orm import selectinload
+from app.database.models.bank_account import BankAccount
+from app.database.models.loan import Loan
+from app.database.models.investment import Investment
+from app.database.models.user_financial_summary import UserFinancialSummary, summary_backfill_sql
+from app.crud.crud_pagination import Page, paginate
+from app.crud.crud_filter import FilterCompiler, EQ, TEXT, SEARCH, RANGE
+from typing import Optional, Union, Dict, Any, List, Sequence, Set, Tuple
 from app.schemas.user_details import UserInfo
 import uuid
+from functools import lru_cache
+from app.database.async_adapter import AsyncSessionAdapter
 
 class CRUDUser:
+    # Filterable columns and operators, each backed by an index (see app.database.migrations)
+    filter_compiler = FilterCompiler(User, {
+        "full_name": SEARCH,
+        "email": TEXT,
+        "phone_number": EQ,
+        "cibil_score": RANGE,
+    })
+
     def get(self, db: Session, user_id: uuid.UUID) -> Optional[User]:
         """Get user by ID.
 
@@ -37,6 +55,22 @@ class CRUDUser:
         db_obj = db.query(User).filter(User.email == email, User.is_active == True, User.is_superuser == False).first()
         return db_obj
     
+    def get_existing_emails(self, db: Session, emails: Sequence[str]) -> Set[str]:
+        """Get which of the given emails already belong to a user, on every shard.
+
+        Args:
+        --- 
+            db (Session) : The database session.
+            emails (Sequence[str]) : The emails to look up.
+
+        Returns:
+        --- 
+            Set[str] : The emails taken.
+        """
+        if not emails:
+            return set()
+        return set(db.scalars(select(User.email).where(User.email.in_(list(emails)))).all())
+
     def get_by_phone(self, db: Session, phone_number: str) -> Optional[User]:
         """Get user by phone number.
         
@@ -49,35 +83,36 @@ class CRUDUser:
             User : The user object.
         
         """
-        db_obj = db.query(User).filter(User.phone_number == phone_number, User.is_active == True, User.is_superuser == False).first()
-        return db_obj
+        # Runs on every chat turn: a lambda statement is built once per process and
+        # only re-binds phone_number on later calls
+        stmt = lambda_stmt(
+            lambda: select(User)
+            .where(User.phone_number == phone_number, User.is_active == True, User.is_superuser == False)
+            .limit(1)
+        )
+        return db.scalars(stmt).first()
     
-    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> List[User]:
-        """Get multiple users with optional filtering.
+    def get_multi(self, db: Session, *, cursor: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> Page[User]:
+        """Get multiple users with optional filtering, one keyset page at a time.
         
         Args:
         --- 
             db (Session) : The database session.
-            skip (int) : The number of users to skip.
+            cursor (Optional[str]) : The ``next_cursor`` of the previous page, None for the first page.
             limit (int) : The number of users to return.
-            filters (Optional[Dict[str, Any]]) : The filters to apply to the query.
+            filters (Optional[Dict[str, Any]]) : ``field`` or ``field__operator`` filters, see ``FilterCompiler``.
 
         Returns:
         --- 
-            List[User] : The list of users.
+            Page[User] : The users of this page and the cursor of the next one.
         """
-        query = db.query(User)
-        if filters:
-            for field, value in filters.items():
-                if hasattr(User, field) and value is not None:
-                    if isinstance(value, str):
-                        query = query.filter(getattr(User, field).ilike(f"%{value}%"))
-                    else:
-                        query = query.filter(getattr(User, field) == value)
-        return query.offset(skip).limit(limit).all()
+        stmt = select(User).where(*self.filter_compiler.compile(filters or {}))
+        return paginate(db, stmt, User, cursor=cursor, limit=limit)
 
     def create(self, db: Session, *, obj_in : Union[UserInfo, Dict[str, Any]]) -> User:
-        """Create a new user.
+        """Create a new user with INSERT ... RETURNING.
+
+        Does not commit, the service operation commits its unit of work once.
 
         Args:
         --- 
@@ -102,15 +137,33 @@ class CRUDUser:
             }
         else:
             create_data = obj_in.dict()
-        db_obj = User(**create_data)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return db.scalars(insert(User).returning(User), [create_data]).one()
+    
+    def create_many(self, db: Session, *, objs_in: List[Dict[str, Any]]) -> List[Tuple[uuid.UUID, str]]:
+        """Create many users with a multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Users whose email or phone number already exists are skipped. Does not
+        commit, so the caller can write the users' related rows in the same transaction.
+
+        Args:
+        --- 
+            db (Session) : The database session.
+            objs_in (List[Dict[str, Any]]) : The user rows to create.
+
+        Returns:
+        --- 
+            List[Tuple[uuid.UUID, str]] : The (id, email) of every user actually created.
+        """
+        if not objs_in:
+            return []
+        stmt = pg_insert(User).on_conflict_do_nothing().returning(User.id, User.email)
+        return [(row.id, row.email) for row in db.execute(stmt, objs_in)]
     
     def update(self, db: Session, *, db_obj: User, obj_in : Union[Dict[str, Any]]) -> User:
-        """Update existing user.
-        
+        """Update existing user with UPDATE ... RETURNING, refreshing ``db_obj`` in place.
+
+        Does not commit, the service operation commits its unit of work once.
+
         Args:
         --- 
             db (Session) : The database session.
@@ -126,18 +179,20 @@ class CRUDUser:
         else:
             update_data = obj_in.dict(exclude_unset=True)
         
-        for field, value in update_data.items():
-            if hasattr(db_obj, field):
-                setattr(db_obj, field, value)
-        
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        changes = {field: value for field, value in update_data.items() if field in User.__table__.c}
+        if not changes:
+            return db_obj
+        return db.scalars(
+            update(User).where(User.id == db_obj.id).values(**changes).returning(User),
+            execution_options={"populate_existing": True},
+        ).one()
     
     def delete(self, db: Session, *, user_id: uuid.UUID) -> bool:
-        """Delete user.
-        
+        """Delete a user with one DELETE; the database cascades it to all of their related rows.
+
+        Superusers are never deleted. Does not commit, the service operation
+        commits its unit of work once.
+
         Args:
         --- 
             db (Session) : The database session.
@@ -147,12 +202,33 @@ class CRUDUser:
         --- 
             bool : True if the user is deleted, False otherwise.
         """
-        obj = db.query(User).get(user_id)
-        if obj:
-            db.delete(obj)
-            db.commit()
-            return True
-        return False
+        return bool(self.delete_many(db, user_ids=[user_id]))
+
+    def delete_many(self, db: Session, *, user_ids: Sequence[uuid.UUID]) -> List[uuid.UUID]:
+        """Delete many users with one DELETE ... RETURNING.
+
+        Bank accounts, loans, investments, switch and loan requests and the
+        financial summary go with them through their ON DELETE CASCADE foreign
+        keys, so the Python side does the same work however many rows a user
+        has. Superusers are never deleted. Does not commit.
+
+        Args:
+        --- 
+            db (Session) : The database session.
+            user_ids (Sequence[uuid.UUID]) : The IDs of the users to delete.
+
+        Returns:
+        --- 
+            List[uuid.UUID] : The IDs of the users actually deleted.
+        """
+        if not user_ids:
+            return []
+        stmt = (
+            delete(User)
+            .where(User.id.in_(user_ids), User.is_superuser == False)
+            .returning(User.id)
+        )
+        return list(db.scalars(stmt))
     
     def is_exists(self, db: Session, user_id: uuid.UUID) -> bool:
         """Checks if user exists.
@@ -189,6 +265,9 @@ class CRUDUser:
     
     def get_user_with_relationships(self, db: Session, user_id: int) -> Optional[User]:
         """Get user with all related data (bank accounts, loans, investments).
+
+        The relationships are loaded with ``selectinload``, one extra statement per
+        collection instead of a lazy load on first access.
         
         Args:
             db (Session): The database session.
@@ -197,12 +276,127 @@ class CRUDUser:
         Returns:
             User: The user object with relationships loaded.
         """
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            # Load relationships
-            _ = user.bank_accounts
-            _ = user.loans
-            _ = user.investments
+        return db.scalars(
+            select(User)
+            .where(User.id == user_id)
+            .options(selectinload(User.bank_accounts), selectinload(User.loans), selectinload(User.investments))
+        ).first()
+
+    def get_aggregate(self, db: Session, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """Get a user and all related data as a dict, in a single statement.
+
+        Args:
+            db (Session): The database session.
+            user_id (uuid.UUID): The ID of the user to get.
+
+        Returns:
+            Dict[str, Any]: The ``user``, ``bank_accounts``, ``loans`` and ``investments`` dicts, or None.
+        """
+        return self._get_aggregate(db, User.id == user_id)
+
+    def get_aggregate_by_phone(self, db: Session, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Get an active user and all related data by phone number, in a single statement.
+
+        Resolves phone number -> user -> bank accounts, loans and investments in one
+        round trip by aggregating each collection to JSON inside Postgres.
+
+        Args:
+            db (Session): The database session.
+            phone_number (str): The phone number of the user to get.
+
+        Returns:
+            Dict[str, Any]: The ``user``, ``bank_accounts``, ``loans`` and ``investments`` dicts, or None.
+        """
+        return self._get_aggregate(db, User.phone_number == phone_number, User.is_active == True, User.is_superuser == False)
+
+    def get_financial_summary(self, db: Session, user_id: uuid.UUID) -> Optional[Tuple[User, Optional[UserFinancialSummary]]]:
+        """Get a user and their financial summary row with a single primary key lookup.
+
+        Args:
+        --- 
+            db (Session) : The database session.
+            user_id (uuid.UUID) : The ID of the user.
+
+        Returns:
+        --- 
+            Tuple[User, Optional[UserFinancialSummary]] : The user and summary, None if the user does not exist.
+            The summary is None for a user that never had a bank account, loan or investment.
+        """
+        row = db.execute(
+            select(User, UserFinancialSummary)
+            .outerjoin(UserFinancialSummary, UserFinancialSummary.id == User.id)
+            .where(User.id == user_id)
+        ).first()
+        return tuple(row) if row else None
+
+    def update_financial_summary(self, db: Session, user_id: uuid.UUID) -> Optional[User]:
+        """Recompute a user's financial summary from their child rows and copy the totals onto the user.
+
+        The summary is kept current by triggers on every bank account, loan and
+        investment write, so this is only needed to reconcile it, e.g. after
+        editing rows with triggers disabled. Does not commit.
+
+        Args:
+        --- 
+            db (Session) : The database session.
+            user_id (uuid.UUID) : The ID of the user.
+
+        Returns:
+        --- 
+            User : The updated user, None if the user does not exist.
+        """
+        user = db.get(User, user_id, with_for_update=True)
+        if not user:
+            return None
+
+        db.execute(text(f"DELETE FROM {UserFinancialSummary.__tablename__} WHERE id = :user_id"), {"user_id": user_id})
+        db.execute(text(summary_backfill_sql("WHERE user_id = :user_id")), {"user_id": user_id})
+        summary = db.get(UserFinancialSummary, user_id, populate_existing=True)
+
+        user.total_assets = summary.total_assets if summary else 0
+        user.total_liabilities = summary.total_loan_liability if summary else 0
+        user.net_worth = summary.net_worth if summary else 0
+        db.flush()
         return user
 
-user = CRUDUser()
\ No newline at end of file
+    def _get_aggregate(self, db: Session, *criteria: Any) -> Optional[Dict[str, Any]]:
+        row = db.execute(
+            select(
+                _json_object(User).label("user"),
+                _json_children(BankAccount).label("bank_accounts"),
+                _json_children(Loan).label("loans"),
+                _json_children(Investment).label("investments"),
+            ).where(*criteria)
+        ).first()
+        if row is None:
+            return None
+        return dict(row._mapping)
+
+
+@lru_cache(maxsize=None)
+def _json_object(model: Any) -> Any:
+    """``json_build_object`` over the columns the model's ``to_dict`` exposes."""
+    # A transient instance is enough to read the keys, so the JSON matches to_dict()
+    keys = model().to_dict().keys()
+    args = []
+    for key in keys:
+        args.extend((literal(key), getattr(model, key)))
+    return func.json_build_object(*args, type_=JSON)
+
+
+@lru_cache(maxsize=None)
+def _json_children(model: Any) -> Any:
+    """Correlated subquery aggregating a user's child rows into a JSON array."""
+    return (
+        select(func.coalesce(
+            func.json_agg(aggregate_order_by(_json_object(model), model.created_at, model.id)),
+            text("'[]'::json"),
+            type_=JSON,
+        ))
+        .where(model.user_id == User.id)
+        .scalar_subquery()
+    )
+
+
+user = CRUDUser()
+async_user = AsyncSessionAdapter(user)
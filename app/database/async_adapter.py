@@ -0,0 +1,47 @@
+"""Async variants of the sync CRUD and service objects."""
+
+import functools
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+
+class AsyncSessionAdapter(Generic[T]):
+    """Expose every ``method(db: Session, ...)`` of a sync object as ``await method(db: AsyncSession, ...)``.
+
+    The wrapped method runs through ``AsyncSession.run_sync``, so its queries go
+    over the async driver and yield to the event loop while waiting on the
+    database, while the query logic itself stays defined once in the sync class.
+
+    Example:
+        async_loan = AsyncSessionAdapter(loan)
+        loans = await async_loan.get_by_user_id(db, user_id)
+    """
+
+    def __init__(self, sync_obj: T):
+        """Create a new AsyncSessionAdapter instance.
+
+        Args:
+        ---
+            sync_obj (T) : The CRUD or service object whose methods take a sync Session first.
+        """
+        self.sync = sync_obj
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.sync, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(db: AsyncSession, *args: Any, **kwargs: Any) -> Any:
+            return await db.run_sync(attr, *args, **kwargs)
+
+        # Cache the coroutine wrapper so later lookups skip __getattr__
+        setattr(self, name, method)
+        return method
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.sync!r})"
+
@@ -1,10 +1,22 @@
 from sqlalchemy import UUID, Column, DateTime
 from sqlalchemy.orm import DeclarativeBase
+from typing import Any
 import uuid
+from app.core.config import settings
 from app.core.datetime_utils import utc_now_naive
+from app.core.uuid_utils import uuid7
+from app.database.sharding import SHARD_ID, stamp_shard
+
+
+def new_id(context: Any) -> uuid.UUID:
+    """Primary key default: a time-ordered UUID when DB_TIME_ORDERED_IDS is set, stamped with the shard number when inserted through a shard engine."""
+    value = uuid7() if settings.DB_TIME_ORDERED_IDS else uuid.uuid4()
+    shard_id = context.execution_options.get(SHARD_ID)
+    return value if shard_id is None else stamp_shard(value, shard_id)
+
 
 class Base(DeclarativeBase):
     """Base class for all models."""
-    id = Column(UUID, primary_key=True, default=uuid.uuid4, nullable=False)
+    id = Column(UUID, primary_key=True, default=new_id, nullable=False)
     created_at = Column(DateTime, default=utc_now_naive, nullable=False)
     modified_at = Column(DateTime, default=utc_now_naive, onupdate=utc_now_naive, nullable=False)
\ No newline at end of file
@@ -1,8 +1,15 @@
 """Initialize the database with the first superuser."""
 from app.core.logger import logger
-from app.database.session import SessionLocal, create_tables, drop_tables
+from app.database.session import SessionLocal, create_tables, drop_tables, shard_engines
+from app.database.migrations import run_migrations
+from app.database.partitions import maintain_partitions
+from app.core.config import settings
 from app.database.models.user import User
+from app.database.models.market_loan import MarketLoan
+from app.services.market_loan_import_service import default_catalog_path, market_loan_import_service
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+import asyncio
 
 def init_db():
     """
@@ -19,6 +26,16 @@ def init_db():
         create_tables()
         logger.info("Database tables created successfully !")
 
+        # apply schema changes to existing tables
+        for shard in shard_engines:
+            applied = run_migrations(shard)
+            logger.info(f"Applied {len(applied)} database migrations {applied} on {shard.url.database}")
+
+        # create upcoming partitions and archive expired ones
+        for shard in shard_engines:
+            changed = maintain_partitions(shard)
+            logger.info(f"Created or archived {len(changed)} partitions {changed} on {shard.url.database}")
+
         # create superuser if it doesn't exist 
         db = SessionLocal()
 
@@ -40,6 +57,13 @@ def init_db():
                 db.add(superuser)
                 db.commit()
                 logger.info("Superuser created successfully !")
+
+            # load the bundled market loan catalog into an empty market_loans
+            if db.scalar(select(MarketLoan.id).limit(1)) is None:
+                logger.info("Importing the bundled market loan catalog...")
+                with open(default_catalog_path(), "rb") as file:
+                    result = market_loan_import_service.import_catalog(db, file, "json")
+                logger.info(f"Imported {result.inserted} market loans, {result.offers_invalid} offers rejected")
         finally:
             db.close()
 
@@ -48,6 +72,20 @@ def init_db():
         logger.error(f"Error initializing database: {e}")
         raise e
     
+async def run_partition_maintenance():
+    """
+    Keep partitions ahead of the clock and apply the retention policy, every DB_PARTITION_MAINTENANCE_INTERVAL_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.DB_PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+        for shard in shard_engines:
+            try:
+                changed = await asyncio.to_thread(maintain_partitions, shard)
+                if changed:
+                    logger.info(f"Created or archived partitions {changed} on {shard.url.database}")
+            except Exception as e:
+                logger.error(f"Error maintaining partitions on {shard.url.database}: {e}")
+
 def close_db(db: Session):
     """
     Close the database connection.
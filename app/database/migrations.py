@@ -0,0 +1,407 @@
+"""Versioned schema migrations applied on top of ``Base.metadata.create_all``.
+
+``create_all`` only creates missing tables, so anything added to an existing
+table (indexes, extensions, column changes) is shipped as a migration here.
+Migrations run in order, once per database, and are recorded in
+``schema_migrations``.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.datetime_utils import utc_now_naive
+from app.database.partitions import add_months, create_partitions, is_partitioned, list_partitions, month_start
+
+# Arbitrary key for pg_advisory_lock, so only one app instance migrates at a time
+MIGRATION_LOCK_ID = 7_318_402_215
+
+# Rows per UPDATE while backfilling a column, small enough to keep row locks short
+BACKFILL_BATCH_SIZE = 5000
+
+# A step is a SQL statement or a function for work that takes more than one statement
+Step = Union[str, Callable[[Connection], None]]
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A named list of SQL statements.
+
+    Attributes:
+        version (str): Unique, sortable name, e.g. ``0001_filter_indexes``.
+        statements (Sequence[Step]): Statements executed one by one in autocommit mode, so
+            ``CREATE INDEX CONCURRENTLY`` can build indexes without blocking writes.
+            Every statement must be idempotent (``IF NOT EXISTS``), since a migration
+            interrupted halfway is run again from the start. A callable step gets the
+            autocommit connection and must be idempotent in the same way.
+    """
+    version: str
+    statements: Sequence[Step]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version="0001_filter_indexes",
+        statements=(
+            # Trigram operator classes for substring ("contains") filters
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            # users
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_full_name_lower_prefix ON users (lower(full_name) varchar_pattern_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_full_name_lower_trgm ON users USING gin (lower(full_name) gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_lower_prefix ON users (lower(email) varchar_pattern_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_cibil_score ON users (cibil_score)",
+            # loans
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_lender ON loans (lender)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_lender_lower_prefix ON loans (lower(lender) varchar_pattern_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_lender_lower_trgm ON loans USING gin (lower(lender) gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_loan_id ON loans (loan_id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_loan_type ON loans (loan_type)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_status ON loans (status)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_interest_rate ON loans (interest_rate)",
+            # bank_accounts
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_bank_name ON bank_accounts (bank_name)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_bank_name_lower_prefix ON bank_accounts (lower(bank_name) varchar_pattern_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_bank_name_lower_trgm ON bank_accounts USING gin (lower(bank_name) gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_account_number ON bank_accounts (account_number)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_account_type ON bank_accounts (account_type)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_balance ON bank_accounts (balance)",
+            # investments
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_institution ON investments (institution)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_institution_lower_prefix ON investments (lower(institution) varchar_pattern_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_institution_lower_trgm ON investments USING gin (lower(institution) gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_investment_id ON investments (investment_id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_investment_type ON investments (investment_type)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_current_value ON investments (current_value)",
+            # loan_requests
+            # loan_requests, partitioned when created by create_all, see _create_index
+            lambda conn: _create_index(conn, "ix_loan_requests_status", "loan_requests", "(status)"),
+            lambda conn: _create_index(conn, "ix_loan_requests_request_type", "loan_requests", "(request_type)"),
+            lambda conn: _create_index(conn, "ix_loan_requests_loan_type", "loan_requests", "(loan_type)"),
+        ),
+    ),
+    Migration(
+        version="0002_access_path_indexes",
+        statements=(
+            # CRUDUser.get* only ever match active, non-superuser users
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_active_email ON users (email) WHERE is_active AND NOT is_superuser",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_active_phone_number ON users (phone_number) WHERE is_active AND NOT is_superuser",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_active_created_at_id ON users (created_at, id) WHERE is_active AND NOT is_superuser",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_superuser ON users (id) WHERE is_superuser",
+            # Per-user child lookups, aggregates, keyset pages and ON DELETE CASCADE from users
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_user_id_created_at_id ON loans (user_id, created_at, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bank_accounts_user_id_created_at_id ON bank_accounts (user_id, created_at, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_user_id_created_at_id ON investments (user_id, created_at, id)",
+            lambda conn: _create_index(conn, "ix_loan_requests_user_id_created_at_id", "loan_requests", "(user_id, created_at, id)"),
+            # CRUDLoan.get_active_loans_by_user and get_overdue_loans
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_active_user_id ON loans (user_id) WHERE status = 'active'",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_active_due_date ON loans (due_date) WHERE status = 'active'",
+            # CRUDLoanRequest.get_by_to_loan_id and get_by_from_loan_id
+            lambda conn: _create_index(conn, "ix_loan_requests_to_loan_id", "loan_requests", "(to_loan_id)"),
+            lambda conn: _create_index(conn, "ix_loan_requests_from_loan_id", "loan_requests", "(from_loan_id)"),
+            # CRUDMarketLoan range search: substring match on loan type and lender, cheapest rate first
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_market_loans_loan_type_lower_trgm ON market_loans USING gin (lower(loan_type) gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_market_loans_lender_name_lower_trgm ON market_loans USING gin (lower(lender_name) gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_market_loans_roi_start ON market_loans (roi_start)",
+        ),
+    ),
+    Migration(
+        version="0003_date_columns",
+        statements=(
+            # Same rules as app.core.datetime_utils.parse_date: the leading YYYY-MM-DD, NULL if empty or invalid
+            """
+            CREATE OR REPLACE FUNCTION migration_parse_date(value TEXT) RETURNS DATE LANGUAGE plpgsql IMMUTABLE AS $$
+            BEGIN
+                IF value IS NULL OR btrim(value) = '' THEN
+                    RETURN NULL;
+                END IF;
+                RETURN to_date(left(btrim(value), 10), 'YYYY-MM-DD');
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END;
+            $$
+            """,
+            lambda conn: _convert_to_date(conn, "loans", "open_date"),
+            lambda conn: _convert_to_date(conn, "loans", "due_date"),
+            lambda conn: _convert_to_date(conn, "investments", "start_date"),
+            lambda conn: _convert_to_date(conn, "investments", "maturity_date"),
+            "DROP FUNCTION IF EXISTS migration_parse_date(TEXT)",
+            # Dropping the string columns dropped their indexes, including 0002's ix_loans_active_due_date
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_active_due_date ON loans (due_date) WHERE status = 'active'",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_due_date ON loans (due_date)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_maturity_date ON investments (maturity_date)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_investments_start_date ON investments (start_date)",
+        ),
+    ),
+    Migration(
+        version="0004_cascade_indexes",
+        statements=(
+            # ON DELETE CASCADE from users looks up each child table by user_id; the
+            # others are covered by their (user_id, created_at, id) indexes from 0002
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_switch_requests_user_id ON switch_requests (user_id)",
+        ),
+    ),
+    Migration(
+        version="0005_partition_loan_requests",
+        statements=(
+            lambda conn: _partition_by_month(conn, "loan_requests"),
+            # CRUDLoanRequest.get_by_status("pending") and pending keyset pages: one small index per month
+            lambda conn: _create_index(conn, "ix_loan_requests_pending_created_at_id", "loan_requests", "(created_at, id) WHERE status = 'pending'"),
+        ),
+    ),
+    Migration(
+        version="0006_loan_request_keys",
+        statements=(
+            # create_all added loan_request_keys; key the requests made before it
+            lambda conn: _backfill_loan_request_keys(conn),
+        ),
+    ),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply every migration not yet recorded in ``schema_migrations``.
+
+    Args:
+        engine (Engine): The engine of the database to migrate.
+
+    Returns:
+        List[str]: The versions applied by this call.
+    """
+    applied_now = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+        ))
+        conn.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        try:
+            applied = set(conn.scalars(text("SELECT version FROM schema_migrations")))
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+                logger.info(f"Applying migration {migration.version}")
+                _drop_invalid_indexes(conn, migration)
+                for statement in migration.statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(text(statement))
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+                    {"version": migration.version, "applied_at": utc_now_naive()},
+                )
+                applied_now.append(migration.version)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    return applied_now
+
+
+def _drop_invalid_indexes(conn, migration: Migration) -> None:
+    """Drop indexes of this migration left invalid by an interrupted ``CREATE INDEX CONCURRENTLY``.
+
+    ``IF NOT EXISTS`` would otherwise skip them and leave an index the planner never uses.
+    """
+    names = [
+        match.group(1)
+        for statement in migration.statements
+        if isinstance(statement, str) and (match := re.search(r"CREATE (?:UNIQUE )?INDEX CONCURRENTLY IF NOT EXISTS (\w+)", statement))
+    ]
+    if not names:
+        return
+    invalid = conn.scalars(
+        text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+        ),
+        {"names": names},
+    ).all()
+    for name in invalid:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted migration")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def _convert_to_date(conn: Connection, table: str, column: str) -> None:
+    """Convert a string column holding ISO dates to DATE without a table rewrite under lock.
+
+    ``ALTER COLUMN ... TYPE DATE`` would rewrite the table under an ACCESS
+    EXCLUSIVE lock for its whole duration. Instead the dates are copied into a
+    new column in short batches while a trigger keeps it in step with writes
+    from instances still running the previous code, then the columns are
+    swapped in one quick transaction. Every phase can be re-run.
+    """
+    data_type = conn.scalar(
+        text("SELECT data_type FROM information_schema.columns WHERE table_name = :table AND column_name = :column"),
+        {"table": table, "column": column},
+    )
+    if data_type is None or data_type == "date":
+        return
+    staging = f"{column}_as_date"
+    function = f"{table}_{column}_sync_date"
+    logger.info(f"Converting {table}.{column} to DATE")
+
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {staging} DATE"))
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.{staging} := migration_parse_date(NEW.{column});
+            RETURN NEW;
+        END;
+        $$;
+        DROP TRIGGER IF EXISTS {function} ON {table};
+        CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OF {column} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {function}();
+    """))
+
+    # Walk the primary key so each batch is an index range, not a rescan of the table
+    last_id = None
+    while True:
+        ids = conn.scalars(
+            text(f"""
+                WITH batch AS (
+                    SELECT id FROM {table}
+                    WHERE (CAST(:last_id AS UUID) IS NULL OR id > CAST(:last_id AS UUID))
+                    ORDER BY id LIMIT :batch_size
+                )
+                UPDATE {table} t SET {staging} = migration_parse_date(t.{column})
+                FROM batch WHERE t.id = batch.id
+                RETURNING t.id
+            """),
+            {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not ids:
+            break
+        last_id = max(ids)
+
+    # The swap needs a brief ACCESS EXCLUSIVE lock; give up rather than queue behind long transactions
+    with conn.engine.begin() as swap:
+        swap.execute(text("SET LOCAL lock_timeout = '5s'"))
+        swap.execute(text(f"DROP TRIGGER IF EXISTS {function} ON {table}"))
+        swap.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+        swap.execute(text(f"ALTER TABLE {table} RENAME COLUMN {staging} TO {column}"))
+    conn.execute(text(f"DROP FUNCTION IF EXISTS {function}()"))
+
+
+def _drop_invalid_index(conn: Connection, name: str) -> None:
+    """Drop one index left invalid by an interrupted ``CREATE INDEX CONCURRENTLY``, see ``_drop_invalid_indexes``."""
+    invalid = conn.scalar(
+        text("SELECT NOT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(:name)"),
+        {"name": name},
+    )
+    if invalid:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted migration")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def _create_index(conn: Connection, name: str, table: str, definition: str) -> None:
+    """``CREATE INDEX CONCURRENTLY IF NOT EXISTS`` that also works on partitioned tables.
+
+    Postgres cannot build an index on a partitioned table concurrently. Instead
+    the index is declared on the parent alone, built concurrently on each
+    partition, and every partition's index is attached to it; the parent index
+    becomes valid once all of them are. Partitions created later get the index
+    automatically.
+
+    Args:
+        conn (Connection): The autocommit connection.
+        name (str): The index name.
+        table (str): The table.
+        definition (str): The indexed columns or expressions and an optional WHERE clause, e.g. ``"(status)"``.
+    """
+    if not is_partitioned(conn, table):
+        _drop_invalid_index(conn, name)
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}"))
+        return
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}"))
+    for partition in list_partitions(conn, table):
+        attached = conn.scalar(
+            text(
+                "SELECT 1 FROM pg_inherits i JOIN pg_index x ON x.indexrelid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:name) AND x.indrelid = to_regclass(:partition)"
+            ),
+            {"name": name, "partition": partition.name},
+        )
+        if attached:
+            continue
+        # e.g. ix_loan_requests_status_p202501 on loan_requests_p202501
+        child = f"{name}_{partition.name.removeprefix(f'{table}_')}"
+        _drop_invalid_index(conn, child)
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition.name} {definition}"))
+        conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+
+def _partition_by_month(conn: Connection, table: str) -> None:
+    """Turn a table into one range-partitioned by month on ``created_at``, without copying its rows.
+
+    The existing table becomes the partition of every row created up to the
+    end of next month, and new months get partitions of their own, see
+    ``app.database.partitions``. Rows are never copied: a validated CHECK
+    constraint proves the existing rows fit the partition's range and a
+    ``UNIQUE (id, created_at)`` constraint stands in for the new primary key,
+    both prepared without blocking writes, so the final swap only renames and
+    attaches under a brief ACCESS EXCLUSIVE lock. Existing indexes are copied
+    to the new table and matched to the old ones instead of being rebuilt.
+    Every phase can be re-run.
+    """
+    if is_partitioned(conn, table) or conn.scalar(text("SELECT to_regclass(:table)"), {"table": table}) is None:
+        return
+    legacy = f"{table}_legacy"
+    logger.info(f"Partitioning {table} by month")
+    # Two months out, so rows inserted until the swap commits still fit
+    bound = add_months(month_start(utc_now_naive()), 2)
+
+    conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {legacy}_bound"))
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {legacy}_bound CHECK (created_at < '{bound.isoformat()}') NOT VALID"))
+    # Scans the table under a lock that lets reads and writes through
+    conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {legacy}_bound"))
+    _drop_invalid_index(conn, f"{legacy}_id_created_at_key")
+    if conn.scalar(text("SELECT to_regclass(:name)"), {"name": f"{legacy}_id_created_at_key"}) is None:
+        conn.execute(text(f"CREATE UNIQUE INDEX CONCURRENTLY {legacy}_id_created_at_key ON {table} (id, created_at)"))
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {legacy}_id_created_at_key UNIQUE USING INDEX {legacy}_id_created_at_key"))
+
+    # The swap needs a brief ACCESS EXCLUSIVE lock; give up rather than queue behind long transactions
+    with conn.engine.begin() as swap:
+        swap.execute(text("SET LOCAL lock_timeout = '5s'"))
+        swap.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        indexes = swap.execute(
+            text(
+                "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = to_regclass(:legacy) AND NOT i.indisprimary AND c.relname <> :key"
+            ),
+            {"legacy": legacy, "key": f"{legacy}_id_created_at_key"},
+        ).all()
+        foreign_keys = swap.execute(
+            text("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(:legacy) AND contype = 'f'"),
+            {"legacy": legacy},
+        ).all()
+        swap.execute(text(f"ALTER INDEX {table}_pkey RENAME TO {legacy}_pkey"))
+        swap.execute(text(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"))
+        swap.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)"))
+        for name, definition in foreign_keys:
+            # Matched to the old table's validated constraint on attach, not checked again
+            swap.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+        for name, definition in indexes:
+            # Instant on the parent without partitions; attaching the old table reuses the renamed index
+            swap.execute(text(f"ALTER INDEX {name} RENAME TO {name}_legacy"))
+            swap.execute(text(definition.replace(f" ON public.{legacy} ", f" ON {table} ", 1)))
+        swap.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{bound.isoformat()}')"))
+        swap.execute(text(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_bound"))
+        create_partitions(swap, table, months_ahead=settings.DB_PARTITION_MONTHS_AHEAD)
+
+
+def _backfill_loan_request_keys(conn: Connection) -> None:
+    """Create the idempotency key of every existing loan request, see ``LoanRequestKey``.
+
+    Goes one partition at a time, oldest first, so where the history holds
+    duplicates the first request keeps the key. Keys that already exist are
+    skipped, so the step can be re-run.
+    """
+    partitions = [partition.name for partition in list_partitions(conn, "loan_requests")] or ["loan_requests"]
+    for partition in partitions:
+        conn.execute(text(f"""
+            INSERT INTO loan_request_keys (id, created_at, modified_at, user_id, request_type, from_loan_id, to_loan_id)
+            SELECT id, created_at, modified_at, user_id, request_type, from_loan_id, to_loan_id
+            FROM {partition} ORDER BY created_at, id
+            ON CONFLICT DO NOTHING
+        """))
@@ -5,6 +5,9 @@ from .investment import Investment
 from .market_loan import MarketLoan
 from .swith_request import SwitchRequest
 from .loan_request import LoanRequest
+from .loan_request_key import LoanRequestKey
+from .user_financial_summary import UserFinancialSummary
+from .loan_refinance_opportunity import LoanRefinanceOpportunity
 __all__ = [
     "User",
     "BankAccount",
@@ -12,5 +15,8 @@ __all__ = [
     "Investment",
     "MarketLoan",
     "SwitchRequest",
-    "LoanRequest"
+    "LoanRequest",
+    "LoanRequestKey",
+    "UserFinancialSummary",
+    "LoanRefinanceOpportunity"
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, ForeignKey, UUID, Float
+from sqlalchemy import Integer, String, ForeignKey, UUID, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.base import Base
 from typing import TYPE_CHECKING
@@ -9,6 +9,8 @@ if TYPE_CHECKING:
 
 class BankAccount(Base):
     __tablename__ = "bank_accounts"
+    # Keyset pagination order, see app.crud.crud_pagination
+    __table_args__ = (Index("ix_bank_accounts_created_at_id", "created_at", "id"),)
 
     user_id : Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     bank_name : Mapped[str] = mapped_column(String(500), nullable=True)
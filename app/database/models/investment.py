@@ -1,7 +1,8 @@
-from sqlalchemy import Integer, String, ForeignKey, Float, DateTime, UUID
+from sqlalchemy import Integer, String, ForeignKey, Float, DateTime, UUID, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.base import Base
-from datetime import datetime   
+from app.database.types import ISODate
+from datetime import date, datetime   
 from typing import TYPE_CHECKING
 import uuid
 
@@ -10,6 +11,8 @@ if TYPE_CHECKING:
 
 class Investment(Base):
     __tablename__ = "investments"
+    # Keyset pagination order, see app.crud.crud_pagination
+    __table_args__ = (Index("ix_investments_created_at_id", "created_at", "id"),)
 
     user_id : Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     investment_id : Mapped[str] = mapped_column(String(500), nullable=True)
@@ -17,8 +20,8 @@ class Investment(Base):
     institution : Mapped[str] = mapped_column(String(500), nullable=True)
     amount_invested : Mapped[float] = mapped_column(Float, nullable=True)
     current_value : Mapped[float] = mapped_column(Float, nullable=True)
-    start_date : Mapped[str] = mapped_column(String(500), nullable=True)
-    maturity_date : Mapped[str] = mapped_column(String(500), nullable=True)
+    start_date : Mapped[date] = mapped_column(ISODate, nullable=True)
+    maturity_date : Mapped[date] = mapped_column(ISODate, nullable=True)
     
     # Relationship
     user : Mapped["User"] = relationship("User", back_populates="investments")
@@ -32,6 +35,6 @@ class Investment(Base):
             "institution": self.institution,
             "amount_invested": self.amount_invested,
             "current_value": self.current_value,
-            "start_date": self.start_date,
-            "maturity_date": self.maturity_date
+            "start_date": self.start_date.isoformat() if self.start_date else None,
+            "maturity_date": self.maturity_date.isoformat() if self.maturity_date else None
         }
\ No newline at end of file
@@ -1,9 +1,10 @@
 
 
-from sqlalchemy import Integer, String, ForeignKey, Float, DateTime, UUID
+from sqlalchemy import Integer, String, ForeignKey, Float, DateTime, UUID, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.base import Base
-from datetime import datetime
+from app.database.types import ISODate
+from datetime import date, datetime
 from typing import TYPE_CHECKING
 import uuid
 
@@ -12,6 +13,8 @@ if TYPE_CHECKING:
 
 class Loan(Base):
     __tablename__ = "loans"
+    # Keyset pagination order, see app.crud.crud_pagination
+    __table_args__ = (Index("ix_loans_created_at_id", "created_at", "id"),)
 
     user_id : Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     loan_id : Mapped[str] = mapped_column(String(500), nullable=True)
@@ -23,8 +26,8 @@ class Loan(Base):
     tenure_months : Mapped[int] = mapped_column(Integer, nullable=True)
     emi_amount : Mapped[float] = mapped_column(Float, nullable=True)
     status : Mapped[str] = mapped_column(String(500), nullable=True)
-    open_date : Mapped[str] = mapped_column(String(500), nullable=True)
-    due_date : Mapped[str] = mapped_column(String(500), nullable=True)
+    open_date : Mapped[date] = mapped_column(ISODate, nullable=True)
+    due_date : Mapped[date] = mapped_column(ISODate, nullable=True)
     account_number : Mapped[str] = mapped_column(String(500), nullable=True)
     collateral_value : Mapped[float] = mapped_column(Float, nullable=True)
     prepayment_penalty : Mapped[float] = mapped_column(Float, nullable=True)
@@ -45,8 +48,8 @@ class Loan(Base):
             "tenure_months": self.tenure_months,
             "emi_amount": self.emi_amount,
             "status": self.status,
-            "open_date": self.open_date,
-            "due_date": self.due_date,
+            "open_date": self.open_date.isoformat() if self.open_date else None,
+            "due_date": self.due_date.isoformat() if self.due_date else None,
             "account_number": self.account_number,
             "collateral_value": self.collateral_value,
             "prepayment_penalty": self.prepayment_penalty,
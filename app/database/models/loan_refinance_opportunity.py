@@ -0,0 +1,40 @@
+from sqlalchemy import Integer, String, Float, DateTime, JSON, UUID, Column, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.base import Base
+from datetime import datetime
+import uuid
+
+
+class LoanRefinanceOpportunity(Base):
+    """The best market offers to refinance one active loan with, precomputed in batch.
+
+    The row shares its primary key with the loan and is written by
+    ``app.services.refinance_precompute_service``. It is current while
+    ``loan_modified_at`` is the loan's ``modified_at``, ``catalog_digest`` the
+    digest of the active market offers and the row was scored this month;
+    otherwise the next run scores the loan again.
+    """
+    __tablename__ = "loan_refinance_opportunities"
+    # The dashboard lists a user's opportunities, or the largest savings first
+    __table_args__ = (
+        Index("ix_loan_refinance_opportunities_user_id", "user_id"),
+        Index("ix_loan_refinance_opportunities_best_net_savings", "best_net_savings"),
+    )
+
+    id = Column(UUID, ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    user_id : Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    loan_modified_at : Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    catalog_digest : Mapped[str] = mapped_column(String(64), nullable=False)
+    top_k : Mapped[int] = mapped_column(Integer, nullable=False)
+    # The net savings of the first option, NULL when no offer saves money
+    best_net_savings : Mapped[float] = mapped_column(Float, nullable=True)
+    options : Mapped[list] = mapped_column(JSON, nullable=False)
+
+    def to_dict(self):
+        return {
+            "loan_id": str(self.id),
+            "user_id": str(self.user_id),
+            "best_net_savings": self.best_net_savings,
+            "options": self.options,
+            "computed_at": self.modified_at.isoformat() if self.modified_at else None,
+        }
@@ -1,5 +1,6 @@
-from sqlalchemy import Integer, String, ForeignKey, UUID, Float
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, UUID, Float, Index, PrimaryKeyConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.core.datetime_utils import utc_now_naive
 from app.database.base import Base
 from typing import TYPE_CHECKING
 from typing import Dict, Any
@@ -10,6 +11,16 @@ if TYPE_CHECKING:
 
 class LoanRequest(Base):
     __tablename__ = "loan_requests"
+    __table_args__ = (
+        # Partitioned by month on created_at (see app.database.partitions), and a
+        # partitioned table's unique constraints must include the partition key
+        PrimaryKeyConstraint("id", "created_at", name="loan_requests_pkey"),
+        # Keyset pagination order, see app.crud.crud_pagination
+        Index("ix_loan_requests_created_at_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # Base.created_at, as part of the primary key
+    created_at = Column(DateTime, default=utc_now_naive, nullable=False, primary_key=True)
     user_id : Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     request_type : Mapped[str] = mapped_column(String(500), nullable=False)
     loan_type : Mapped[str] = mapped_column(String(500), nullable=False)
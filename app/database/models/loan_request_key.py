@@ -0,0 +1,32 @@
+from sqlalchemy import String, ForeignKey, UUID, Index, func, literal_column
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.base import Base
+import uuid
+
+# Stands in for a missing from_loan_id in the key, since NULLs never conflict in a unique index
+NO_LOAN_ID = uuid.UUID(int=0)
+
+class LoanRequestKey(Base):
+    """The idempotency key of a loan request: at most one request per user, request type, from loan and to loan.
+
+    A unique index on the partitioned ``loan_requests`` would have to include
+    ``created_at``, so it could not catch a repeated request, which gets a new
+    ``created_at``. The key lives in this unpartitioned table instead, with the
+    ``id`` and ``created_at`` of its loan request, see ``CRUDLoanRequest.create_once``.
+    """
+    __tablename__ = "loan_request_keys"
+    user_id : Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    request_type : Mapped[str] = mapped_column(String(500), nullable=False)
+    from_loan_id : Mapped[uuid.UUID] = mapped_column(UUID, nullable=True)
+    to_loan_id : Mapped[uuid.UUID] = mapped_column(UUID, nullable=False)
+
+
+# The ON CONFLICT target; also serves ON DELETE CASCADE from users
+KEY_ELEMENTS = [
+    LoanRequestKey.user_id,
+    LoanRequestKey.request_type,
+    # A literal, not a parameter, so ON CONFLICT matches it to the index expression
+    func.coalesce(LoanRequestKey.from_loan_id, literal_column(f"'{NO_LOAN_ID}'::uuid")),
+    LoanRequestKey.to_loan_id,
+]
+Index("ix_loan_request_keys_key", *KEY_ELEMENTS, unique=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Boolean, Float
+from sqlalchemy import Integer, String, Boolean, Float, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.database.base import Base
 from typing import TYPE_CHECKING
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
     
 class User(Base):
     __tablename__ = "users"
+    # Keyset pagination order, see app.crud.crud_pagination
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     full_name : Mapped[str] = mapped_column(String(500), nullable=True)
     email : Mapped[str] = mapped_column(String(500), nullable=False, unique=True, index=True)
@@ -26,12 +28,13 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False)
     
-    # Relationships
-    bank_accounts : Mapped[list["BankAccount"]] = relationship("BankAccount", back_populates="user", cascade="all, delete-orphan")
-    loans : Mapped[list["Loan"]] = relationship("Loan", back_populates="user", cascade="all, delete-orphan")
-    investments : Mapped[list["Investment"]] = relationship("Investment", back_populates="user", cascade="all, delete-orphan")
-    switch_requests : Mapped[list["SwitchRequest"]] = relationship("SwitchRequest", back_populates="user", cascade="all, delete-orphan")
-    loan_requests : Mapped[list["LoanRequest"]] = relationship("LoanRequest", back_populates="user", cascade="all, delete-orphan")
+    # Relationships. Deleting a user is left to the ON DELETE CASCADE foreign keys
+    # (passive_deletes), so the children are never loaded just to be deleted.
+    bank_accounts : Mapped[list["BankAccount"]] = relationship("BankAccount", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    loans : Mapped[list["Loan"]] = relationship("Loan", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    investments : Mapped[list["Investment"]] = relationship("Investment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    switch_requests : Mapped[list["SwitchRequest"]] = relationship("SwitchRequest", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    loan_requests : Mapped[list["LoanRequest"]] = relationship("LoanRequest", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -0,0 +1,184 @@
+from sqlalchemy import Integer, Float, ForeignKey, UUID, Computed, Column, DDL, event
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.base import Base
+from app.database.models.bank_account import BankAccount
+from app.database.models.loan import Loan
+from app.database.models.investment import Investment
+from typing import Dict
+
+
+class UserFinancialSummary(Base):
+    """Per-user totals over bank accounts, loans and investments.
+
+    The row shares its primary key with the user and is maintained by statement
+    level triggers on the child tables, so it changes in the same transaction as
+    every child write, whichever code path made it.
+    """
+    __tablename__ = "user_financial_summaries"
+
+    id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    total_bank_balance : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    bank_accounts_count : Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_investment_value : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    total_amount_invested : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    investments_count : Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_loan_liability : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    total_emi : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    loans_count : Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    active_loans_count : Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Running sums behind the simple and balance-weighted average interest rates
+    interest_rate_sum : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    rated_loans_count : Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rate_weighted_balance : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    rated_loan_balance : Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    total_assets : Mapped[float] = mapped_column(
+        Float, Computed("total_bank_balance + total_investment_value", persisted=True)
+    )
+    net_worth : Mapped[float] = mapped_column(
+        Float, Computed("total_bank_balance + total_investment_value - total_loan_liability", persisted=True)
+    )
+    average_interest_rate : Mapped[float] = mapped_column(
+        Float, Computed("CASE WHEN rated_loans_count > 0 THEN interest_rate_sum / rated_loans_count ELSE 0 END", persisted=True)
+    )
+    weighted_average_interest_rate : Mapped[float] = mapped_column(
+        Float, Computed("CASE WHEN rated_loan_balance > 0 THEN rate_weighted_balance / rated_loan_balance ELSE 0 END", persisted=True)
+    )
+
+    def to_dict(self):
+        return {
+            "user_id": str(self.id),
+            "total_bank_balance": self.total_bank_balance,
+            "total_loan_liability": self.total_loan_liability,
+            "total_investment_value": self.total_investment_value,
+            "total_amount_invested": self.total_amount_invested,
+            "total_emi": self.total_emi,
+            "total_assets": self.total_assets,
+            "net_worth": self.net_worth,
+            "bank_accounts_count": self.bank_accounts_count,
+            "loans_count": self.loans_count,
+            "active_loans_count": self.active_loans_count,
+            "investments_count": self.investments_count,
+            "average_interest_rate": self.average_interest_rate,
+            "weighted_average_interest_rate": self.weighted_average_interest_rate,
+        }
+
+
+# What one child row contributes to each summary column. The trigger adds the
+# contribution of inserted rows and subtracts it for deleted rows; an UPDATE is both.
+SUMMARY_CONTRIBUTIONS: Dict[str, Dict[str, str]] = {
+    BankAccount.__tablename__: {
+        "total_bank_balance": "coalesce(balance, 0)",
+        "bank_accounts_count": "1",
+    },
+    Investment.__tablename__: {
+        "total_investment_value": "coalesce(current_value, 0)",
+        "total_amount_invested": "coalesce(amount_invested, 0)",
+        "investments_count": "1",
+    },
+    Loan.__tablename__: {
+        "total_loan_liability": "coalesce(current_balance, 0)",
+        "total_emi": "coalesce(emi_amount, 0)",
+        "loans_count": "1",
+        "active_loans_count": "CASE WHEN lower(status) = 'active' THEN 1 ELSE 0 END",
+        "interest_rate_sum": "coalesce(interest_rate, 0)",
+        "rated_loans_count": "CASE WHEN coalesce(interest_rate, 0) <> 0 THEN 1 ELSE 0 END",
+        "rate_weighted_balance": "coalesce(interest_rate, 0) * coalesce(current_balance, 0)",
+        "rated_loan_balance": "CASE WHEN coalesce(interest_rate, 0) <> 0 THEN coalesce(current_balance, 0) ELSE 0 END",
+    },
+}
+
+
+def _delta_source(table: str, operation: str) -> str:
+    """SELECT of signed per-row contributions out of the trigger's transition tables."""
+    contributions = SUMMARY_CONTRIBUTIONS[table]
+    new_rows = "SELECT user_id, " + ", ".join(f"{expr} AS {column}" for column, expr in contributions.items()) + " FROM new_rows"
+    old_rows = "SELECT user_id, " + ", ".join(f"-({expr}) AS {column}" for column, expr in contributions.items()) + " FROM old_rows"
+    if operation == "INSERT":
+        return new_rows
+    if operation == "DELETE":
+        return old_rows
+    return f"{new_rows} UNION ALL {old_rows}"
+
+
+def _apply_delta_sql(table: str, operation: str) -> str:
+    """Upsert the summed deltas of one statement into the users' summary rows."""
+    columns = list(SUMMARY_CONTRIBUTIONS[table])
+    summary = UserFinancialSummary.__tablename__
+    return f"""
+        INSERT INTO {summary} AS s (id, created_at, modified_at, {", ".join(columns)})
+        SELECT d.user_id, timezone('utc', now()), timezone('utc', now()), {", ".join(f"sum(d.{c})" for c in columns)}
+        FROM ({_delta_source(table, operation)}) AS d
+        -- Rows deleted by ON DELETE CASCADE from users must not recreate the summary
+        WHERE EXISTS (SELECT 1 FROM users u WHERE u.id = d.user_id)
+        GROUP BY d.user_id
+        HAVING {" OR ".join(f"sum(d.{c}) <> 0" for c in columns)}
+        ORDER BY d.user_id
+        ON CONFLICT (id) DO UPDATE SET
+            {", ".join(f"{c} = s.{c} + EXCLUDED.{c}" for c in columns)},
+            modified_at = EXCLUDED.modified_at;
+    """
+
+
+def summary_trigger_ddl(table: str) -> str:
+    """The trigger function and its INSERT, UPDATE and DELETE statement triggers for a child table."""
+    function = f"{table}_apply_financial_summary"
+    branches = "\n".join(
+        f"    {'IF' if i == 0 else 'ELSIF'} TG_OP = '{operation}' THEN {_apply_delta_sql(table, operation)}"
+        for i, operation in enumerate(("INSERT", "UPDATE", "DELETE"))
+    )
+    triggers = "\n".join(
+        f"""
+        DROP TRIGGER IF EXISTS {table}_financial_summary_{operation.lower()} ON {table};
+        CREATE TRIGGER {table}_financial_summary_{operation.lower()}
+            AFTER {operation} ON {table}
+            REFERENCING {transitions}
+            FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+        """
+        for operation, transitions in (
+            ("INSERT", "NEW TABLE AS new_rows"),
+            ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+            ("DELETE", "OLD TABLE AS old_rows"),
+        )
+    )
+    return f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+{branches}
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+        {triggers}
+    """
+
+
+def summary_backfill_sql(where: str = "") -> str:
+    """Recompute summary rows from scratch out of the child tables.
+
+    Args:
+        where (str): Optional filter on ``user_id`` applied to every child table, e.g. ``WHERE user_id = :user_id``.
+    """
+    summary = UserFinancialSummary.__tablename__
+    columns = [column for contributions in SUMMARY_CONTRIBUTIONS.values() for column in contributions]
+    rows = " UNION ALL ".join(
+        "SELECT user_id, "
+        + ", ".join(contributions.get(column, "0") for column in columns)
+        + f" FROM {table} {where}"
+        for table, contributions in SUMMARY_CONTRIBUTIONS.items()
+    )
+    return f"""
+        INSERT INTO {summary} AS s (id, created_at, modified_at, {", ".join(columns)})
+        SELECT d.user_id, timezone('utc', now()), timezone('utc', now()), {", ".join(f"sum(d.{c})" for c in columns)}
+        FROM ({rows}) AS d (user_id, {", ".join(columns)})
+        GROUP BY d.user_id
+        ON CONFLICT (id) DO UPDATE SET
+            {", ".join(f"{c} = EXCLUDED.{c}" for c in columns)},
+            modified_at = EXCLUDED.modified_at;
+    """
+
+
+# Create the child tables first so their triggers can be installed right after the summary table
+for _model in (BankAccount, Investment, Loan):
+    UserFinancialSummary.__table__.add_is_dependent_on(_model.__table__)
+    event.listen(UserFinancialSummary.__table__, "after_create", DDL(summary_trigger_ddl(_model.__tablename__)))
+event.listen(UserFinancialSummary.__table__, "after_create", DDL(summary_backfill_sql()))
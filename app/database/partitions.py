@@ -0,0 +1,200 @@
+"""Monthly range partitions of append-heavy tables, and their retention.
+
+A partitioned table is split by ``created_at`` into one partition per calendar
+month, named ``<table>_pYYYYMM``. Queries bounded on ``created_at`` only scan
+the partitions of the months they cover, and old months leave the table by
+detaching a partition instead of deleting rows one by one. There is no default
+partition, so inserts need the partition of their month to exist:
+``maintain_partitions`` creates ``DB_PARTITION_MONTHS_AHEAD`` months ahead and
+must run at least that often (see ``app.database.init_db``).
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from app.core.config import settings
+from app.core.datetime_utils import utc_now_naive
+from app.core.logger import logger
+
+# Tables range-partitioned by month on created_at, and the unpartitioned tables
+# whose rows share the created_at of one of their rows and expire with it
+PARTITIONED_TABLES: Dict[str, Sequence[str]] = {
+    "loan_requests": ("loan_request_keys",),
+}
+# Schema detached partitions are moved to, out of the application's search path
+ARCHIVE_SCHEMA = "archive"
+# Arbitrary key for pg_advisory_lock, so only one app instance maintains partitions at a time
+PARTITION_LOCK_ID = 7_318_402_216
+
+
+@dataclass(frozen=True)
+class Partition:
+    """An attached partition of a partitioned table.
+
+    Attributes:
+        name (str): The partition's table name.
+        upper (Optional[datetime]): The exclusive upper bound of its ``created_at`` range, None for MAXVALUE.
+        detach_pending (bool): Whether a ``DETACH PARTITION ... CONCURRENTLY`` was interrupted and needs finalizing.
+    """
+    name: str
+    upper: Optional[datetime]
+    detach_pending: bool
+
+
+def month_start(value: datetime) -> datetime:
+    """The first instant of the month of ``value``."""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Move a month start by a number of months, forwards or backwards."""
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    return value.replace(year=year, month=month + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    """The name of the partition holding one month of a table."""
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    """Whether a table exists and is partitioned."""
+    return conn.scalar(
+        text("SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(:table)"),
+        {"table": table},
+    ) is True
+
+
+def list_partitions(conn: Connection, table: str) -> List[Partition]:
+    """The partitions attached to a table, oldest first."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), i.inhdetachpending "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    ).all()
+    partitions = []
+    for name, bound, detach_pending in rows:
+        # e.g. FOR VALUES FROM ('2025-01-01 00:00:00') TO ('2025-02-01 00:00:00'), or FROM (MINVALUE) TO (...)
+        match = re.search(r"TO \('([^']+)'\)", bound or "")
+        partitions.append(Partition(name, datetime.fromisoformat(match.group(1)) if match else None, detach_pending))
+    return sorted(partitions, key=lambda partition: (partition.upper is None, partition.upper or datetime.min))
+
+
+def create_partitions(conn: Connection, table: str, months_ahead: int) -> List[str]:
+    """Create the monthly partitions of a table from the current month to ``months_ahead`` months ahead.
+
+    Months already covered by a partition, e.g. the one holding the rows from
+    before the table was partitioned, are skipped.
+
+    Args:
+        conn (Connection): An autocommit connection.
+        table (str): The partitioned table.
+        months_ahead (int): The number of months after the current one to create.
+
+    Returns:
+        List[str]: The partitions created.
+    """
+    current = month_start(utc_now_naive())
+    covered = [partition.upper for partition in list_partitions(conn, table) if partition.upper is not None]
+    month = max([current, *covered])
+    created = []
+    while month <= add_months(current, months_ahead):
+        name = partition_name(table, month)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def archive_partitions(
+    conn: Connection, table: str, retain_months: int, tablespace: Optional[str] = None, dependents: Sequence[str] = ()
+) -> List[str]:
+    """Detach the partitions older than ``retain_months`` months and move them to the archive schema.
+
+    ``DETACH PARTITION ... CONCURRENTLY`` only waits for the queries already
+    running on the table instead of blocking new ones. An archived month stays
+    queryable as ``archive.<partition>`` and keeps its foreign key, so deleting
+    a user still deletes their archived requests. A detach interrupted halfway
+    is finalized on the next run.
+
+    Args:
+        conn (Connection): An autocommit connection.
+        table (str): The partitioned table.
+        retain_months (int): The number of months before the current one to keep attached, 0 to keep every month.
+        tablespace (Optional[str]): The tablespace archived partitions and their indexes are moved to, e.g. on cheaper disks.
+        dependents (Sequence[str]): Tables whose rows created before an archived month ends are deleted with it.
+
+    Returns:
+        List[str]: The partitions archived.
+    """
+    if retain_months <= 0:
+        return []
+    cutoff = add_months(month_start(utc_now_naive()), -retain_months)
+    archived = []
+    for partition in list_partitions(conn, table):
+        if partition.upper is None or partition.upper > cutoff:
+            continue
+        for dependent in dependents:
+            conn.execute(text(f"DELETE FROM {dependent} WHERE created_at < :upper"), {"upper": partition.upper})
+        try:
+            conn.execute(text("SET lock_timeout = '5s'"))
+            mode = "FINALIZE" if partition.detach_pending else "CONCURRENTLY"
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name} {mode}"))
+        except DBAPIError as e:
+            logger.warning(f"Could not detach partition {partition.name}, retrying on the next run: {e}")
+            continue
+        finally:
+            conn.execute(text("RESET lock_timeout"))
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        conn.execute(text(f"ALTER TABLE {partition.name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        if tablespace:
+            # Rewrites the partition, which nothing but archive queries reads any more
+            conn.execute(text(f"ALTER TABLE {ARCHIVE_SCHEMA}.{partition.name} SET TABLESPACE {tablespace}"))
+            indexes = conn.scalars(
+                text("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = to_regclass(:table)"),
+                {"table": f"{ARCHIVE_SCHEMA}.{partition.name}"},
+            ).all()
+            for index in indexes:
+                conn.execute(text(f"ALTER INDEX {index} SET TABLESPACE {tablespace}"))
+        archived.append(partition.name)
+    return archived
+
+
+def maintain_partitions(engine: Engine, archive: bool = True) -> List[str]:
+    """Create upcoming partitions and archive expired ones on every partitioned table of a database.
+
+    Skips the run when another app instance holds the maintenance lock.
+
+    Args:
+        engine (Engine): The engine of the database.
+        archive (bool): Whether to apply the retention policy as well.
+
+    Returns:
+        List[str]: The partitions created and archived.
+    """
+    changed = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.scalar(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID}):
+            return changed
+        try:
+            for table, dependents in PARTITIONED_TABLES.items():
+                # Not partitioned yet: migration 0005 converts it
+                if not is_partitioned(conn, table):
+                    continue
+                changed += create_partitions(conn, table, settings.DB_PARTITION_MONTHS_AHEAD)
+                if archive:
+                    changed += archive_partitions(
+                        conn, table, settings.DB_PARTITION_RETENTION_MONTHS, settings.DB_ARCHIVE_TABLESPACE, dependents
+                    )
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    return changed
@@ -0,0 +1,108 @@
+"""Connection pool configuration and live pool statistics."""
+
+import threading
+import time
+from typing import Any, Dict, Union
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+from app.core.config import settings
+
+
+class _CheckoutTimingMixin:
+    """Pool mixin that records how long callers wait to check out a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self._checkouts += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+
+    def wait_stats(self) -> Dict[str, Any]:
+        """Return the accumulated checkout wait statistics."""
+        with self._stats_lock:
+            return {
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "total_wait_seconds": round(self._total_wait, 6),
+                "avg_wait_seconds": round(self._total_wait / self._checkouts, 6) if self._checkouts else 0.0,
+                "max_wait_seconds": round(self._max_wait, 6),
+            }
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool with checkout wait statistics, used by sync engines."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait statistics, used by async engines."""
+
+
+def pool_kwargs(is_async: bool = False) -> Dict[str, Any]:
+    """Build the ``create_engine`` pool arguments from settings.
+
+    Args:
+        is_async (bool): Whether the arguments are for ``create_async_engine``.
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for ``create_engine``.
+    """
+    mode = settings.DB_POOL_MODE.lower()
+    if mode == "static":
+        return {"poolclass": StaticPool, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if mode == "null":
+        return {"poolclass": NullPool, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if mode != "queue":
+        raise ValueError(f"Unsupported DB_POOL_MODE: {settings.DB_POOL_MODE}")
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_pool_stats(engine: Union[Engine, AsyncEngine]) -> Dict[str, Any]:
+    """Get live statistics for an engine's connection pool.
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): The engine whose pool should be inspected.
+
+    Returns:
+        Dict[str, Any]: Pool size, checked in/out connections, overflow and wait times.
+    """
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, _CheckoutTimingMixin):
+        stats.update(pool.wait_stats())
+    return stats
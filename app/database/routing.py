@@ -0,0 +1,101 @@
+"""Read-replica routing for database sessions."""
+
+import random
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Sequence
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Session.info key that pins every statement of a session to the primary
+USE_PRIMARY = "use_primary"
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to a replica and everything else to the primary.
+
+    A session reads from one replica, picked at random when it first reads, so
+    its reads never go back in time by switching to a replica that lags more.
+    Flushes, ``INSERT``/``UPDATE``/``DELETE``, ``SELECT ... FOR UPDATE``, raw
+    SQL and explicit ``connection()`` calls run on the primary, and the first of
+    them pins the session to the primary for the rest of its life, so a session
+    always reads its own writes. Without replicas every statement runs on the
+    primary.
+    """
+
+    def __init__(self, *args: Any, primary: Engine, replicas: Sequence[Engine] = (), **kwargs: Any):
+        """Create a new RoutingSession instance.
+
+        Args:
+        ---
+            primary (Engine) : The engine of the primary database.
+            replicas (Sequence[Engine]) : The engines of the read replicas.
+        """
+        kwargs["bind"] = primary
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        if not self.replicas or self.info.get(USE_PRIMARY):
+            return self.primary
+        if self._flushing or not _is_plain_select(clause):
+            self.info[USE_PRIMARY] = True
+            return self.primary
+        if self._replica is None:
+            self._replica = random.choice(self.replicas)
+        return self._replica
+
+
+def _is_plain_select(clause: Any) -> bool:
+    """Whether a statement only reads, i.e. a SELECT without a row lock. Lambda statements report their inner SELECT."""
+    return bool(getattr(clause, "is_select", False)) and getattr(clause, "_for_update_arg", None) is None
+
+
+class RecentWrites:
+    """Keys written in the last ``ttl`` seconds, whose reads must not go to a lagging replica.
+
+    A write commits on the primary, but a replica applies it a little later. The
+    service that writes records the keys it touched, e.g. a user's phone number,
+    and readers of those keys use the primary until the window, which should
+    exceed the replication lag, has passed. The window is per process.
+    """
+
+    def __init__(self, ttl: float):
+        """Create a new RecentWrites instance.
+
+        Args:
+        ---
+            ttl (float) : The seconds a written key stays pinned to the primary.
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Insertion ordered, and every key has the same ttl, so the oldest deadline is always first
+        self._deadlines: Dict[Hashable, float] = {}
+
+    def add(self, *keys: Hashable) -> None:
+        """Pin keys to the primary for the next ``ttl`` seconds."""
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            for key in keys:
+                if key is None:
+                    continue
+                self._deadlines.pop(key, None)
+                self._deadlines[key] = now + self.ttl
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return key in self._deadlines
+
+    def _expire(self, now: float) -> None:
+        while self._deadlines:
+            key, deadline = next(iter(self._deadlines.items()))
+            if deadline > now:
+                return
+            del self._deadlines[key]
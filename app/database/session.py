@@ -2,21 +2,118 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool 
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional
 from app.core.config import settings
 from app.database.base import Base
-from app.database.models import user, bank_account, loan, investment, market_loan, swith_request
+from app.database.pool import pool_kwargs, get_pool_stats
+from app.database.statement_stats import StatementStats
+from app.database.routing import RecentWrites, RoutingSession
+from app.database.sharding import ShardRouter, ShardSession
+from app.database.partitions import maintain_partitions
+from app.database.models import user, bank_account, loan, investment, market_loan, swith_request, user_financial_summary
 from app.core.logger import logger
 # Create database engine 
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URL,
-    poolclass=StaticPool,
-    pool_pre_ping=True,
+    **pool_kwargs(),
     # echo=settings.DEBUG, # Log SQL queries in debug mode
 )
 
-# Create session factory 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory. CRUD methods never commit; each service operation
+# commits its unit of work once, and the objects it returns stay loaded after
+# that commit instead of being reloaded with another SELECT.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Create async database engine, used by the FastAPI endpoints and ADK tools
+async_engine = create_async_engine(
+    settings.SQLALCHEMY_ASYNC_DATABASE_URL,
+    **pool_kwargs(is_async=True),
+    # asyncpg prepares every statement server-side; keep the most used ones per
+    # connection so repeated lookups skip parsing and planning
+    connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+)
+
+# Shard engines, the primary is shard 0 and POSTGRES_SHARDS adds the others
+shard_engines = [engine, *(create_engine(url, **pool_kwargs()) for url in settings.SQLALCHEMY_SHARD_DATABASE_URLS)]
+async_shard_engines = [
+    async_engine,
+    *(
+        create_async_engine(
+            url,
+            **pool_kwargs(is_async=True),
+            connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+        )
+        for url in settings.SQLALCHEMY_ASYNC_SHARD_DATABASE_URLS
+    ),
+]
+shard_router = ShardRouter(len(shard_engines))
+sharded = shard_router.shard_count > 1
+
+# Read replica engines, one per POSTGRES_REPLICA_HOSTS entry, used by the read sessions below
+replica_engines = [] if sharded else [create_engine(url, **pool_kwargs()) for url in settings.SQLALCHEMY_REPLICA_DATABASE_URLS]
+async_replica_engines = [] if sharded else [
+    create_async_engine(
+        url,
+        **pool_kwargs(is_async=True),
+        connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+    )
+    for url in settings.SQLALCHEMY_ASYNC_REPLICA_DATABASE_URLS
+]
+
+# Per-statement execution times of all engines, see get_db_statement_stats
+statement_stats = StatementStats()
+if settings.DB_STATEMENT_TIMING:
+    for _engine in [*shard_engines, *replica_engines]:
+        statement_stats.attach(_engine)
+    for _async_engine in [*async_shard_engines, *async_replica_engines]:
+        statement_stats.attach(_async_engine.sync_engine)
+
+# Create async session factory. Objects stay loaded after commit so they can be
+# serialized outside of the session without triggering lazy IO.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+if sharded:
+    # Every factory routes each statement to the shards of the users it touches.
+    # The shard engines carry their shard number, which new ids are stamped with.
+    SessionLocal = ReadSessionLocal = sessionmaker(
+        class_=ShardSession,
+        router=shard_router,
+        shards=[shard.execution_options(shard_id=i) for i, shard in enumerate(shard_engines)],
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    AsyncSessionLocal = AsyncReadSessionLocal = async_sessionmaker(
+        sync_session_class=ShardSession,
+        router=shard_router,
+        shards=[shard.sync_engine.execution_options(shard_id=i) for i, shard in enumerate(async_shard_engines)],
+        autoflush=False,
+        expire_on_commit=False,
+    )
+else:
+    # Read session factories: plain SELECTs go to a replica, any write moves the
+    # session to the primary for good. Without replicas they behave like the
+    # factories above. Used by GET endpoints and the read-only ADK tools.
+    ReadSessionLocal = sessionmaker(
+        class_=RoutingSession,
+        primary=engine,
+        replicas=replica_engines,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        sync_session_class=RoutingSession,
+        primary=async_engine.sync_engine,
+        replicas=[replica.sync_engine for replica in async_replica_engines],
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+# Users written in the last DB_REPLICA_LAG_SECONDS, keyed by both phone number and
+# user id (uuid.UUID), whose reads stay on the primary until the replicas have caught up
+recent_writes = RecentWrites(ttl=settings.DB_REPLICA_LAG_SECONDS if replica_engines else 0)
 
 def get_db() -> Session:
     """
@@ -31,14 +128,84 @@ def get_db() -> Session:
     finally:
         db.close()
     
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get async database session.
+
+    Yields:
+        AsyncSession: Async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get an async database session that reads from a replica.
+
+    Yields:
+        AsyncSession: Async database session
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+def async_read_session(key: Optional[Hashable] = None) -> AsyncSession:
+    """
+    Get an async session for reading data about ``key``, e.g. a user's phone number or
+    ``uuid.UUID`` id.
+
+    Reads of a key written within the last DB_REPLICA_LAG_SECONDS go to the
+    primary, so a user sees their own data right after it was stored.
+
+    Args:
+        key (Optional[Hashable]): The key the session reads, None if it reads no user data.
+
+    Returns:
+        AsyncSession: Async database session
+    """
+    if key is not None and key in recent_writes:
+        return AsyncSessionLocal()
+    return AsyncReadSessionLocal()
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    """
+    Get live statistics of the database connection pools.
+
+    Returns:
+        Dict[str, Any]: Checked out connections, overflow and checkout wait times per engine, shard and replica.
+    """
+    return {
+        "sync": get_pool_stats(engine),
+        "async": get_pool_stats(async_engine),
+        "sync_shards": [get_pool_stats(shard) for shard in shard_engines[1:]],
+        "async_shards": [get_pool_stats(shard) for shard in async_shard_engines[1:]],
+        "sync_replicas": [get_pool_stats(replica) for replica in replica_engines],
+        "async_replicas": [get_pool_stats(replica) for replica in async_replica_engines],
+    }
+
+def get_db_statement_stats(top: int = 20) -> List[Dict[str, Any]]:
+    """
+    Get the statements with the highest total execution time.
+
+    Args:
+        top (int): The number of statements to return.
+
+    Returns:
+        List[Dict[str, Any]]: Calls, compiled cache hits and execution times per statement.
+    """
+    return statement_stats.snapshot(top)
+
 def create_tables():
     """
-    Create all tables in the database. 
+    Create all tables in the database and every shard.
     """
-    Base.metadata.create_all(bind=engine)
+    for shard in shard_engines:
+        Base.metadata.create_all(bind=shard)
+        # A new partitioned table has no partitions to insert into yet
+        maintain_partitions(shard, archive=False)
 
 def drop_tables():
     """
-    Drop all the tables in the database.
+    Drop all the tables in the database and every shard.
     """
-    Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+    for shard in shard_engines:
+        Base.metadata.drop_all(bind=shard)
\ No newline at end of file
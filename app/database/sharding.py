@@ -0,0 +1,248 @@
+"""Horizontal sharding of user-owned tables across several Postgres databases."""
+
+import hashlib
+import random
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, TypeVar
+
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnElement
+from app.core.exception import ShardRoutingException
+
+T = TypeVar("T")
+
+# Execution option carried by the shard engines, and the Session.info key of a pinned session
+SHARD_ID = "shard_id"
+# Every id generated on a shard carries the shard number in its low bits, see stamp_shard
+SHARD_BITS = 16
+SHARD_MASK = (1 << SHARD_BITS) - 1
+# Marks the bits above the shard number, so an id that was never stamped is not read as one
+SHARD_TAG = 0x5D1D
+STAMP_MASK = (1 << 2 * SHARD_BITS) - 1
+# Tables copied in full to every shard: read from any one of them, written to all
+GLOBAL_TABLES = frozenset({"market_loans"})
+
+
+def stamp_shard(value: uuid.UUID, shard_id: int) -> uuid.UUID:
+    """Replace the low 32, random bits of a UUID with ``SHARD_TAG`` and a shard number, keeping its version and variant.
+
+    Without the tag, a uuid4 created before sharding whose random low bits
+    happen to be below the shard count would be routed to that one shard. A
+    random id now passes for a stamped one with a chance of
+    ``shard_count / 2**32``.
+    """
+    return uuid.UUID(int=(value.int & ~STAMP_MASK) | (SHARD_TAG << SHARD_BITS) | shard_id)
+
+
+class ShardRouter:
+    """Map users to shards.
+
+    A user lives on the shard its phone number hashes to, and every row created
+    on a shard gets an id stamped with that shard number, so a user id, a loan
+    id or any other id leads back to its shard without a directory lookup. All
+    of a user's rows reference the user's id, so they live on the same shard.
+
+    Changing the number of shards moves users to other shards, which needs a
+    rebalancing copy. Ids created before sharding was enabled carry no
+    ``SHARD_TAG``, so they are looked up on every shard.
+    """
+
+    def __init__(self, shard_count: int):
+        """Create a new ShardRouter instance.
+
+        Args:
+        ---
+            shard_count (int) : The number of databases.
+        """
+        if not 1 <= shard_count <= SHARD_MASK + 1:
+            raise ValueError(f"shard_count must be between 1 and {SHARD_MASK + 1}")
+        self.shard_count = shard_count
+
+    def shard_for_phone(self, phone_number: str) -> int:
+        """The shard of the user with this phone number."""
+        digest = hashlib.blake2b(phone_number.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shard_count
+
+    def shard_for_id(self, value: Any) -> Optional[int]:
+        """The shard a row id was created on, None if it is not stamped or carries no valid shard number."""
+        try:
+            value = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        except (TypeError, ValueError, AttributeError):
+            return None
+        if (value.int >> SHARD_BITS) & SHARD_MASK != SHARD_TAG:
+            return None
+        shard_id = value.int & SHARD_MASK
+        return shard_id if shard_id < self.shard_count else None
+
+    def group_by_phone(self, items: Iterable[T], phone_number: Callable[[T], str]) -> Dict[int, List[T]]:
+        """Split items, e.g. user snapshots, by the shard of their phone number."""
+        groups: Dict[int, List[T]] = {}
+        for item in items:
+            groups.setdefault(self.shard_for_phone(phone_number(item)), []).append(item)
+        return groups
+
+
+class ShardSession(ShardedSession):
+    """Session that routes every statement to the shards holding the rows it touches.
+
+    The shard is taken, in order, from a pinned shard (see ``pinned_shard``),
+    the ``user_id``, ``phone_number`` or stamped ``id`` values of inserted rows
+    and statement parameters, then ``=`` and ``IN`` conditions on those columns
+    in the top-level WHERE clause. A read that names no user runs on every
+    shard and the results are concatenated, without a global ORDER BY or
+    LIMIT. ``market_loans`` reads go to a random shard and its writes to all
+    shards. An INSERT must resolve to exactly one shard, so rows of several
+    users have to be grouped with ``ShardRouter.group_by_phone`` first.
+    """
+
+    def __init__(self, *args: Any, router: ShardRouter, shards: Sequence[Engine], **kwargs: Any):
+        """Create a new ShardSession instance.
+
+        Args:
+        ---
+            router (ShardRouter) : Maps users and ids to shards.
+            shards (Sequence[Engine]) : The engine of each shard, in shard number order.
+        """
+        kwargs.pop("bind", None)
+        self.router = router
+        # Runs ahead of ShardedSession's own handler, which would not pin the shard for an INSERT
+        event.listen(self, "do_orm_execute", _execute_insert_on_shard, retval=True)
+        super().__init__(
+            *args,
+            shard_chooser=self._choose_shard,
+            identity_chooser=self._choose_identity_shards,
+            execute_chooser=self._choose_execute_shards,
+            shards=dict(enumerate(shards)),
+            **kwargs,
+        )
+
+    @property
+    def connection_callable(self) -> Any:
+        # ORM bulk INSERTs refuse per-instance routing, which a pinned session does not need
+        return None if self.info.get(SHARD_ID) is not None else super().connection_callable
+
+    @property
+    def _all_shards(self) -> List[int]:
+        return list(range(self.router.shard_count))
+
+    def _choose_shard(self, mapper: Any, instance: Any, clause: Any = None, **kwargs: Any) -> int:
+        """The shard an instance is flushed to, or a connection without a statement is opened on."""
+        if self.info.get(SHARD_ID) is not None:
+            return self.info[SHARD_ID]
+        if instance is not None:
+            keys = {column: getattr(instance, column, None) for column in ("id", "user_id", "phone_number")}
+            shards = self._shards_for_values(mapper.local_table.name, [keys])
+            if shards and len(shards) == 1:
+                return shards.pop()
+        raise ShardRoutingException(f"Cannot choose a shard for {instance if instance is not None else clause}, pin the session to a shard")
+
+    def _choose_identity_shards(self, mapper: Any, primary_key: Sequence[Any], **kwargs: Any) -> List[int]:
+        """The shards to look up a primary key on."""
+        if self.info.get(SHARD_ID) is not None:
+            return [self.info[SHARD_ID]]
+        shard_id = self.router.shard_for_id(primary_key[0])
+        return [shard_id] if shard_id is not None else self._all_shards
+
+    def _choose_execute_shards(self, orm_context: ORMExecuteState) -> List[int]:
+        """The shards to run a statement on."""
+        if self.info.get(SHARD_ID) is not None:
+            return [self.info[SHARD_ID]]
+        statement = getattr(orm_context.statement, "_resolved", orm_context.statement)
+        is_read = orm_context.is_select or getattr(statement, "is_select", False)
+        tables = {element.name for element in visitors.iterate(statement) if isinstance(element, Table)}
+        if tables and tables <= GLOBAL_TABLES:
+            return [random.randrange(self.router.shard_count)] if is_read else self._all_shards
+
+        table = next(iter(tables)) if len(tables) == 1 else ""
+        parameters = orm_context.parameters
+        rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+        shards = self._shards_for_values(table, rows) if rows else None
+        if shards is None:
+            shards = self._shards_for_criteria(statement)
+
+        if orm_context.is_insert:
+            if not shards or len(shards) > 1:
+                raise ShardRoutingException("An INSERT must write the rows of one shard, group them by shard first")
+        return sorted(shards) if shards else self._all_shards
+
+    def _shards_for_values(self, table: str, rows: Sequence[Dict[str, Any]]) -> Optional[Set[int]]:
+        """The shards of rows or parameter sets, None unless every one of them names its shard."""
+        shards = set()
+        for row in rows:
+            shard_id = None
+            if row.get("user_id") is not None:
+                shard_id = self.router.shard_for_id(row["user_id"])
+            elif row.get("id") is not None:
+                shard_id = self.router.shard_for_id(row["id"])
+            elif table == "users" and row.get("phone_number"):
+                shard_id = self.router.shard_for_phone(row["phone_number"])
+            if shard_id is None:
+                return None
+            shards.add(shard_id)
+        return shards
+
+    def _shards_for_criteria(self, statement: Any) -> Optional[Set[int]]:
+        """The shards named by ``user_id``, ``id`` or ``users.phone_number`` conditions ANDed into the WHERE clause."""
+        whereclause = getattr(statement, "whereclause", None)
+        if whereclause is None:
+            return None
+        conditions = (
+            whereclause.clauses
+            if isinstance(whereclause, BooleanClauseList) and whereclause.operator is operators.and_
+            else [whereclause]
+        )
+        for condition in conditions:
+            shards = self._shards_for_condition(condition)
+            if shards is not None:
+                return shards
+        return None
+
+    def _shards_for_condition(self, condition: ColumnElement) -> Optional[Set[int]]:
+        if not isinstance(condition, BinaryExpression) or condition.operator not in (operators.eq, operators.in_op):
+            return None
+        column, value = condition.left, condition.right
+        if not isinstance(value, BindParameter) or not hasattr(column, "table"):
+            return None
+        values = value.effective_value
+        values = list(values) if condition.operator is operators.in_op and values is not None else [values]
+        if column.key in ("user_id", "id"):
+            shards = {self.router.shard_for_id(v) for v in values}
+        elif column.key == "phone_number" and getattr(column.table, "name", None) == "users":
+            shards = {self.router.shard_for_phone(v) for v in values if v is not None}
+        else:
+            return None
+        return None if not shards or None in shards else shards
+
+
+def _execute_insert_on_shard(orm_context: ORMExecuteState) -> Any:
+    """Run an INSERT with the session pinned to the one shard its rows belong to."""
+    session = orm_context.session
+    if not orm_context.is_insert or session.info.get(SHARD_ID) is not None:
+        return None
+    shard_id, = session._choose_execute_shards(orm_context)
+    with pinned_shard(session, shard_id):
+        return orm_context.invoke_statement()
+
+
+@contextmanager
+def pinned_shard(db: Session, shard_id: int) -> Iterator[Session]:
+    """Run every statement of a block on one shard, e.g. the batch writes of one shard's users.
+
+    Args:
+        db (Session): The database session. A session that is not sharded is yielded as is.
+        shard_id (int): The shard to use.
+    """
+    previous = db.info.get(SHARD_ID)
+    db.info[SHARD_ID] = shard_id
+    try:
+        yield db
+    finally:
+        if previous is None:
+            db.info.pop(SHARD_ID, None)
+        else:
+            db.info[SHARD_ID] = previous
@@ -0,0 +1,90 @@
+"""Per-statement execution timing for the database engines."""
+
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT
+
+# Statements beyond this many distinct SQL strings are counted under OTHER_STATEMENTS
+MAX_STATEMENTS = 500
+OTHER_STATEMENTS = "<other statements>"
+
+
+class StatementStats:
+    """Record how often each SQL statement runs and how long the driver takes to execute it.
+
+    Timing starts right before the DB-API ``execute`` and stops when it returns,
+    so it covers the round trip plus server-side parse, plan and execution, but
+    not SQLAlchemy's own statement compilation, which is reported separately as
+    compiled cache hits. On asyncpg, a statement served from the connection's
+    prepared statement cache skips the parse and planning steps.
+    """
+
+    def __init__(self, max_statements: int = MAX_STATEMENTS):
+        """Create a new StatementStats instance.
+
+        Args:
+        ---
+            max_statements (int) : The number of distinct statements tracked individually.
+        """
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def attach(self, engine: Engine) -> None:
+        """Start recording the statements executed by a sync engine (``AsyncEngine.sync_engine`` for async)."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if context is not None:
+            context._statement_stats_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        start = getattr(context, "_statement_stats_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            key = statement if statement in self._stats or len(self._stats) < self.max_statements else OTHER_STATEMENTS
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"calls": 0, "compiled_cache_hits": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            stats["calls"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            if getattr(context, "cache_hit", None) is CACHE_HIT:
+                stats["compiled_cache_hits"] += 1
+
+    def snapshot(self, top: int = 20) -> List[Dict[str, Any]]:
+        """Get the statements with the highest total execution time.
+
+        Args:
+        ---
+            top (int) : The number of statements to return.
+
+        Returns:
+        ---
+            List[Dict[str, Any]] : Per statement: SQL, calls, compiled cache hits, total, mean and max milliseconds.
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:top]
+            return [
+                {
+                    "statement": statement,
+                    "calls": stats["calls"],
+                    "compiled_cache_hits": stats["compiled_cache_hits"],
+                    "total_ms": round(stats["total_seconds"] * 1000, 3),
+                    "mean_ms": round(stats["total_seconds"] * 1000 / stats["calls"], 3),
+                    "max_ms": round(stats["max_seconds"] * 1000, 3),
+                }
+                for statement, stats in items
+            ]
+
+    def reset(self) -> None:
+        """Forget every recorded statement."""
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,20 @@
+"""Column types shared by the models."""
+from typing import Any, Optional
+from datetime import date
+from sqlalchemy import Date
+from sqlalchemy.types import TypeDecorator
+from app.core.datetime_utils import parse_date
+
+
+class ISODate(TypeDecorator):
+    """A DATE column that also accepts datetimes and ``YYYY-MM-DD`` strings.
+
+    Snapshots from Fi MCP and the agents carry dates as strings (``""`` when
+    unknown), so values are parsed on the way in and empty or unparseable ones
+    are stored as NULL. Reads return ``datetime.date``.
+    """
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[date]:
+        return parse_date(value)
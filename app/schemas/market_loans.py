@@ -1,4 +1,8 @@
-from pydantic import BaseModel, Field
+import re
+from datetime import date, datetime
+from typing import Annotated, Any, List, Optional
+from pydantic import BaseModel, BeforeValidator, Field, model_validator
+from app.core.datetime_utils import parse_date
 
 class MarketLoan(BaseModel):
     lender_name: str = Field(default="", description="Name of the lender")
@@ -15,4 +19,137 @@ class MarketLoan(BaseModel):
     offer_valid_till: str = Field(default="", description="Offer valid till")
     eligibility_criteria: str = Field(default="", description="Eligibility criteria of the loan")
     terms_and_conditions: str = Field(default="", description="Terms and conditions of the loan")
-    
\ No newline at end of file
+    
+
+# Catalog imports. Provider files are hand-made or exported by aggregators, so
+# the same field arrives as 2, "2%", "Upto 2.5 %" or "Nil", amounts as
+# "₹5 Lakh" and tenures as "Upto 7 Years" or "84 months".
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?)\s*(?:(crores?|cr|lakhs?|lacs?|l|k)(?![a-z]))?")
+_MULTIPLIERS = {"crore": 1e7, "crores": 1e7, "cr": 1e7, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "l": 1e5, "k": 1e3}
+_ZERO = {"nil", "none", "zero", "free", "no", "waived", "0"}
+_NOT_GIVEN = {"", "-", "na", "n/a", "not specified", "not applicable", "null"}
+_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y")
+_TAG_SEPARATORS = re.compile(r"\s*[|;]\s*")
+
+
+def _text(value: Any) -> Optional[str]:
+    """A string with its whitespace collapsed, None when not given."""
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    return None if value.lower() in _NOT_GIVEN else value
+
+
+def _numbers(value: Any) -> List[float]:
+    """Every amount in a value, e.g. ``[50000.0, 4000000.0]`` for ``"₹50,000 - ₹40 Lakh"``."""
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    if isinstance(value, (int, float)):
+        return [float(value)]
+    text = _text(value)
+    if text is None:
+        return []
+    text = text.lower().replace(",", "")
+    if text in _ZERO:
+        return [0.0]
+    numbers = [float(number) * _MULTIPLIERS.get(unit or "", 1) for number, unit in _NUMBER.findall(text)]
+    if not numbers:
+        raise ValueError(f"no number in {value!r}")
+    return numbers
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """The first amount in a value, None when not given."""
+    numbers = _numbers(value)
+    return numbers[0] if numbers else None
+
+
+def parse_fee(value: Any) -> Optional[float]:
+    """The highest percentage in a fee, e.g. 2.0 for ``"0.5% - 2%"`` or ``"Up to 2%"``, 0.0 for ``"Nil"``."""
+    numbers = _numbers(value)
+    return max(numbers) if numbers else None
+
+
+def parse_tenure_years(value: Any) -> Optional[int]:
+    """The longest tenure in whole years, e.g. 7 for ``"Upto 7 Years"``, ``"84 months"`` or ``"84 mths"`` and 7 for 90 months.
+
+    Partial years are dropped, since the loan search matches ``tenure_upto >= tenure`` in years.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    numbers = _numbers(value)
+    if not numbers:
+        return None
+    months = re.search(r"(?<![a-z])m(?:onths?|ths?|os?)?\b", str(value).lower()) is not None
+    return int(max(numbers) // 12) if months else int(max(numbers))
+
+
+def parse_offer_date(value: Any) -> Optional[str]:
+    """An ISO ``YYYY-MM-DD`` date from an ISO, ``DD/MM/YYYY`` or spelled-out date, None when not given."""
+    if isinstance(value, (date, datetime)):
+        return parse_date(value).isoformat()
+    text = _text(value)
+    if text is None or text.lower() in ("ongoing", "till further notice"):
+        return None
+    parsed = parse_date(text)
+    if parsed is not None:
+        return parsed.isoformat()
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date {value!r}")
+
+
+def parse_flag(value: Any) -> bool:
+    """Whether an offer is active, True when not given."""
+    if isinstance(value, bool):
+        return value
+    text = _text(value)
+    return text is None or text.lower() in ("true", "yes", "y", "1", "active")
+
+
+def parse_tags(value: Any) -> List[str]:
+    """Tags from a list, or from a ``|`` or ``;`` separated string as in CSV files."""
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else _TAG_SEPARATORS.split(str(value))
+    return [tag for tag in (_text(item) for item in values) if tag]
+
+
+# Constraints on the value inside Optional, None has no length or sign
+_Text = Annotated[Optional[Annotated[str, Field(max_length=500)]], BeforeValidator(_text)]
+_NonNegative = Annotated[float, Field(ge=0)]
+
+
+class MarketLoanOffer(BaseModel):
+    """One offer of a provider catalog, normalized to the ``market_loans`` columns.
+
+    An offer is identified by its lender, loan type and amount range, case-insensitive.
+    """
+    lender_name: Annotated[str, BeforeValidator(_text), Field(max_length=500, description="Name of the lender")]
+    loan_type: Annotated[str, BeforeValidator(_text), Field(max_length=500, description="Type of the loan")]
+    roi_start: Annotated[float, BeforeValidator(parse_amount), Field(ge=0, description="Lowest interest rate, in percent")]
+    roi_end: Annotated[Optional[_NonNegative], BeforeValidator(parse_amount), Field(default=None, description="Highest interest rate, roi_start when not given or 0")]
+    min_loan_amount: Annotated[float, BeforeValidator(parse_amount), Field(ge=0, description="Minimum loan amount")]
+    max_loan_amount: Annotated[float, BeforeValidator(parse_amount), Field(ge=0, description="Maximum loan amount")]
+    tenure_upto: Annotated[int, BeforeValidator(parse_tenure_years), Field(gt=0, description="Longest tenure in years")]
+    loan_tags: Annotated[List[str], BeforeValidator(parse_tags), Field(default_factory=list, description="Tags of the loan")]
+    status: Annotated[bool, BeforeValidator(parse_flag), Field(default=True, description="Whether the offer is active")]
+    processing_fee: Annotated[Optional[_NonNegative], BeforeValidator(parse_fee), Field(default=None, description="Processing fee, in percent")]
+    prepayment_penalty: Annotated[Optional[_NonNegative], BeforeValidator(parse_fee), Field(default=None, description="Prepayment penalty, in percent")]
+    offer_valid_till: Annotated[Optional[str], BeforeValidator(parse_offer_date), Field(default=None, description="Last day of the offer, YYYY-MM-DD")]
+    eligibility_criteria: _Text = None
+    terms_and_conditions: _Text = None
+
+    @model_validator(mode="after")
+    def check_ranges(self) -> "MarketLoanOffer":
+        # Offers quoting only a starting rate come with no or a zero roi_end
+        if not self.roi_end:
+            self.roi_end = self.roi_start
+        if self.roi_start > self.roi_end:
+            raise ValueError("roi_start is above roi_end")
+        if self.min_loan_amount > self.max_loan_amount:
+            raise ValueError("min_loan_amount is above max_loan_amount")
+        return self
@@ -0,0 +1,256 @@
+"""Month-by-month amortization schedules of a loan, with prepayment and rate reset scenarios.
+
+``amortize`` is a generator: it yields one ``ScheduleRow`` per EMI and keeps
+only the running balance, rate and EMI, so a caller that needs the first year
+of a 30-year home loan computes 12 rows, not 360. ``Schedule`` wraps it and
+keeps the rows produced so far, so a cached schedule is computed at most once
+however many times, and however far, it is read.
+
+Conventions, shared with ``refinance_engine``:
+
+* rates are yearly percentages, compounded monthly; month 1 is the next EMI
+* a prepayment is paid after that month's EMI, and at most the balance left
+* with ``reduce="tenure"``, the bank default, a prepayment keeps the EMI and
+  the loan closes earlier; with ``reduce="emi"`` the EMI is recomputed over
+  the months left
+* a rate reset applies from its month's interest on; it keeps the EMI with
+  ``reduce="tenure"``, raised if needed to still close by the last month of
+  the original tenure, and recomputes it with ``reduce="emi"``
+* the last month of the original tenure pays whatever balance is left
+"""
+import hashlib
+import json
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.refinance_engine import emi
+
+REDUCE_TENURE = "tenure"
+REDUCE_EMI = "emi"
+# A balance below half a paisa is repaid
+_PAID_OFF = 0.005
+
+
+def _instalment(balance: float, annual_rate: float, months: int) -> float:
+    return float(emi(balance, annual_rate, max(months, 1)))
+
+
+@dataclass(frozen=True)
+class Prepayment:
+    """A lump sum paid on top of the EMI, once or every ``every`` months.
+
+    Attributes:
+        amount (float): The amount prepaid each time.
+        month (int): The first month it is paid in.
+        every (Optional[int]): The months between two payments, None for a single lump sum.
+        until (Optional[int]): The last month a recurring prepayment may be paid in, None for the whole loan.
+    """
+    amount: float
+    month: int
+    every: Optional[int] = None
+    until: Optional[int] = None
+
+    def due(self, month: int) -> bool:
+        if month == self.month:
+            return True
+        if not self.every or month < self.month or (self.until is not None and month > self.until):
+            return False
+        return (month - self.month) % self.every == 0
+
+
+@dataclass(frozen=True)
+class RateReset:
+    """A new interest rate, from ``month`` on.
+
+    Attributes:
+        month (int): The first month charged at the new rate.
+        annual_rate (float): The new rate, in percent.
+    """
+    month: int
+    annual_rate: float
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """What happens to a loan besides its EMIs. The default scenario is the loan as it is.
+
+    Attributes:
+        prepayments (Tuple[Prepayment, ...]): The lump-sum and recurring prepayments.
+        rate_resets (Tuple[RateReset, ...]): The rate changes, e.g. of a floating rate loan.
+        reduce (str): ``REDUCE_TENURE`` or ``REDUCE_EMI``, what a prepayment or rate reset changes.
+    """
+    prepayments: Tuple[Prepayment, ...] = ()
+    rate_resets: Tuple[RateReset, ...] = ()
+    reduce: str = REDUCE_TENURE
+
+    def __post_init__(self):
+        if self.reduce not in (REDUCE_TENURE, REDUCE_EMI):
+            raise ValueError(f"reduce must be {REDUCE_TENURE!r} or {REDUCE_EMI!r}, not {self.reduce!r}")
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Scenario":
+        """A scenario from its JSON form, e.g. a request body; None is the default scenario."""
+        data = data or {}
+        return cls(
+            prepayments=tuple(Prepayment(**prepayment) for prepayment in data.get("prepayments") or ()),
+            rate_resets=tuple(RateReset(**reset) for reset in data.get("rate_resets") or ()),
+            reduce=data.get("reduce") or REDUCE_TENURE,
+        )
+
+    def digest(self) -> str:
+        """A hash of the scenario, equal for scenarios listing the same prepayments and resets in any order."""
+        canonical = {
+            "prepayments": sorted(json.dumps(asdict(prepayment), sort_keys=True) for prepayment in self.prepayments),
+            "rate_resets": sorted(json.dumps(asdict(reset), sort_keys=True) for reset in self.rate_resets),
+            "reduce": self.reduce,
+        }
+        return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class ScheduleRow:
+    """One month of a schedule.
+
+    Attributes:
+        month (int): The month, 1 for the next EMI.
+        annual_rate (float): The rate charged this month, in percent.
+        opening_balance (float): The balance before the EMI.
+        emi (float): The EMI paid, interest plus principal.
+        interest (float): The interest part of the EMI.
+        principal (float): The principal part of the EMI.
+        prepayment (float): The amount prepaid after the EMI.
+        closing_balance (float): The balance after the EMI and the prepayment.
+    """
+    month: int
+    annual_rate: float
+    opening_balance: float
+    emi: float
+    interest: float
+    principal: float
+    prepayment: float
+    closing_balance: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The row with its amounts rounded to paise."""
+        return {
+            name: round(value, 2) if isinstance(value, float) and name != "annual_rate" else value
+            for name, value in asdict(self).items()
+        }
+
+
+def amortize(balance: float, annual_rate: float, months: int, current_emi: Optional[float] = None, scenario: Scenario = Scenario()) -> Iterator[ScheduleRow]:
+    """Yield the schedule of a loan one month at a time, until it is repaid.
+
+    Args:
+    ---
+        balance (float) : The outstanding balance.
+        annual_rate (float) : The interest rate, in percent.
+        months (int) : The EMIs left, the last one pays off the balance.
+        current_emi (Optional[float]) : The EMI, computed from the balance, rate and months if None.
+        scenario (Scenario) : The prepayments and rate resets.
+
+    Returns:
+    ---
+        Iterator[ScheduleRow] : The months, at most ``months`` of them.
+    """
+    balance, months = float(balance), int(months)
+    payment = current_emi or _instalment(balance, annual_rate, months)
+    resets = {reset.month: reset.annual_rate for reset in scenario.rate_resets}
+    for month in range(1, months + 1):
+        if balance < _PAID_OFF:
+            return
+        if month in resets:
+            annual_rate = resets[month]
+            fitted = _instalment(balance, annual_rate, months - month + 1)
+            payment = fitted if scenario.reduce == REDUCE_EMI else max(payment, fitted)
+
+        interest = balance * annual_rate / 1200
+        # Less than the interest only for a stated EMI too small for its rate, the balance then grows
+        principal = balance if month == months else min(payment - interest, balance)
+        closing = balance - principal
+        prepayment = min(sum((p.amount for p in scenario.prepayments if p.due(month)), 0.0), closing)
+        closing -= prepayment
+        yield ScheduleRow(
+            month=month,
+            annual_rate=annual_rate,
+            opening_balance=balance,
+            emi=interest + principal,
+            interest=interest,
+            principal=principal,
+            prepayment=prepayment,
+            closing_balance=closing,
+        )
+
+        if prepayment > 0 and scenario.reduce == REDUCE_EMI and month < months:
+            payment = _instalment(closing, annual_rate, months - month)
+        balance = closing
+
+
+class Schedule:
+    """A lazily computed schedule that keeps its rows, safe to read from several threads at once.
+
+    Each iteration replays the rows computed so far and computes the next ones
+    only when it reads past them.
+    """
+
+    def __init__(self, rows: Iterator[ScheduleRow]):
+        self._source: Optional[Iterator[ScheduleRow]] = rows
+        self._rows: List[ScheduleRow] = []
+        self._lock = threading.Lock()
+
+    def _row(self, i: int) -> Optional[ScheduleRow]:
+        if i < len(self._rows):
+            return self._rows[i]
+        with self._lock:
+            while i >= len(self._rows) and self._source is not None:
+                row = next(self._source, None)
+                if row is None:
+                    self._source = None
+                else:
+                    self._rows.append(row)
+            return self._rows[i] if i < len(self._rows) else None
+
+    def __iter__(self) -> Iterator[ScheduleRow]:
+        i = 0
+        while (row := self._row(i)) is not None:
+            yield row
+            i += 1
+
+    @property
+    def computed(self) -> int:
+        """The rows computed so far."""
+        return len(self._rows)
+
+
+@dataclass
+class ScheduleSummary:
+    """The totals of a schedule.
+
+    Attributes:
+        months (int): The EMIs paid until the loan is repaid.
+        total_interest (float): The interest paid.
+        total_prepaid (float): The amount prepaid.
+        total_paid (float): The EMIs plus the prepayments.
+        last_emi (Optional[float]): The EMI of the last full month, the last one is usually smaller.
+    """
+    months: int = 0
+    total_interest: float = 0.0
+    total_prepaid: float = 0.0
+    total_paid: float = 0.0
+    last_emi: Optional[float] = field(default=None)
+
+    @classmethod
+    def of(cls, rows: Iterable[ScheduleRow]) -> "ScheduleSummary":
+        summary, emis = cls(), []
+        for row in rows:
+            summary.months = row.month
+            summary.total_interest += row.interest
+            summary.total_prepaid += row.prepayment
+            summary.total_paid += row.emi + row.prepayment
+            emis = emis[-1:] + [row.emi]
+        summary.last_emi = emis[0] if emis else None
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: round(value, 2) if isinstance(value, float) else value for name, value in asdict(self).items()}
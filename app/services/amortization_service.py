@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.crud.crud_loan import loan as crud_loan
+from app.core.config import settings
+from app.core.exception import IncompleteLoanTermsException
+from app.services.amortization_engine import Schedule, ScheduleSummary, Scenario, amortize
+from app.services.refinance_engine import LoanTerms
+from sqlalchemy.orm import Session
+from app.core.logger import logger
+from app.database.async_adapter import AsyncSessionAdapter
+import hashlib
+import json
+import math
+import threading
+import uuid
+
+
+class AmortizationService:
+    def __init__(self):
+        self.crud_loan = crud_loan
+        # Schedules by (loan terms, scenario) digest, least recently used first
+        self._schedules: "OrderedDict[str, Schedule]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def loan_state(self, loan: Any) -> Tuple[float, float, int, float]:
+        """The balance, rate, EMIs left and EMI a schedule of the loan starts from.
+
+        Raises:
+            IncompleteLoanTermsException: The loan lacks its balance, rate or tenure.
+        """
+        terms = LoanTerms.from_loans([loan])
+        state = (terms.balance[0], terms.annual_rate[0], terms.months[0], terms.emi[0])
+        if not all(math.isfinite(value) for value in state):
+            raise IncompleteLoanTermsException(f"Loan {loan.id} is missing its balance, interest rate or tenure")
+        balance, annual_rate, months, emi = (float(value) for value in state)
+        return balance, annual_rate, int(months), emi
+
+    def schedule(self, loan: Any, scenario: Optional[Scenario] = None) -> Schedule:
+        """The schedule of a loan under a scenario, shared by every loan in the same state.
+
+        Args:
+        ---
+            loan (Any) : The ``Loan`` row.
+            scenario (Optional[Scenario]) : The prepayments and rate resets, none if None.
+
+        Returns:
+        ---
+            Schedule : The schedule, its rows computed as they are read.
+        """
+        scenario = scenario or Scenario()
+        state = self.loan_state(loan)
+        key = hashlib.sha256(json.dumps([state, scenario.digest()]).encode()).hexdigest()
+        with self._lock:
+            schedule = self._schedules.get(key)
+            if schedule is not None:
+                self._schedules.move_to_end(key)
+                return schedule
+            schedule = self._schedules[key] = Schedule(amortize(*state, scenario=scenario))
+            if len(self._schedules) > settings.AMORTIZATION_SCHEDULE_CACHE_SIZE:
+                self._schedules.popitem(last=False)
+            return schedule
+
+    def get_schedule(self, db: Session, loan_id: uuid.UUID, scenario: Optional[Scenario] = None) -> Optional[Schedule]:
+        """Get the month-by-month schedule of a loan under a scenario.
+
+        Args:
+        ---
+            db (Session) : The database session the loan is read with.
+            loan_id (uuid.UUID) : The loan.
+            scenario (Optional[Scenario]) : The prepayments and rate resets, none if None.
+
+        Returns:
+        ---
+            Optional[Schedule] : The schedule, None if the loan does not exist.
+        """
+        try:
+            loan = self.crud_loan.get(db, loan_id)
+            if not loan:
+                return None
+            return self.schedule(loan, scenario)
+        except Exception as e:
+            logger.error(f"Error getting schedule of loan {loan_id}: {str(e)}")
+            raise e
+
+    def compare_scenario(self, db: Session, user_id: uuid.UUID, loan_id: uuid.UUID, scenario: Scenario) -> Optional[Dict[str, Any]]:
+        """Compare one of a user's loans under a scenario with the loan as it is.
+
+        Args:
+        ---
+            db (Session) : The database session the loan is read with.
+            user_id (uuid.UUID) : The user the loan must belong to.
+            loan_id (uuid.UUID) : The loan.
+            scenario (Scenario) : The prepayments and rate resets.
+
+        Returns:
+        ---
+            Optional[Dict[str, Any]] : The totals of both schedules and the interest and months saved, None if the user has no such loan.
+        """
+        try:
+            loan = self.crud_loan.get(db, loan_id)
+            if not loan or loan.user_id != user_id:
+                return None
+            current = ScheduleSummary.of(self.schedule(loan))
+            with_scenario = ScheduleSummary.of(self.schedule(loan, scenario))
+            return {
+                "loan_id": str(loan.id),
+                "current": current.to_dict(),
+                "scenario": with_scenario.to_dict(),
+                "interest_saved": round(current.total_interest - with_scenario.total_interest, 2),
+                "months_saved": current.months - with_scenario.months,
+            }
+        except Exception as e:
+            logger.error(f"Error comparing scenario for loan {loan_id}: {str(e)}")
+            raise e
+
+
+amortization_service = AmortizationService()
+async_amortization_service = AsyncSessionAdapter(amortization_service)
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.crud.crud_bank_account import bank_account as crud_bank_account
 from app.crud.crud_user import user as crud_user
 import logging
+from app.database.async_adapter import AsyncSessionAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +37,7 @@ class BankAccountService:
             
             # Create bank account
             bank_account = self.crud_bank_account.create(db, obj_in=bank_account_data)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, bank_account_data["user_id"])
+            db.commit()
             
             logger.info(f"Created bank account {bank_account.id} for user {bank_account_data['user_id']}")
             
@@ -65,6 +64,18 @@ class BankAccountService:
             logger.error(f"Error getting bank account {bank_account_id}: {str(e)}")
             raise e
     
+    def get_bank_accounts(self, db: Session, cursor: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get a page of bank accounts with optional filtering."""
+        try:
+            page = self.crud_bank_account.get_multi(db, cursor=cursor, limit=limit, filters=filters)
+            return {
+                "bank_accounts": [{"bank_account": bank_account} for bank_account in page.items],
+                "next_cursor": page.next_cursor
+            }
+        except Exception as e:
+            logger.error(f"Error getting bank accounts: {str(e)}")
+            raise e
+    
     def get_bank_accounts_by_user(self, db: Session, user_id: int) -> List[Dict[str, Any]]:
         """Get all bank accounts for a user."""
         try:
@@ -111,9 +122,7 @@ class BankAccountService:
                     }
             
             updated_account = self.crud_bank_account.update(db, db_obj=bank_account, obj_in=update_data)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, bank_account.user_id)
+            db.commit()
             
             return {
                 "success": True,
@@ -122,81 +131,48 @@ class BankAccountService:
             }
         except Exception as e:
             logger.error(f"Error updating bank account {bank_account_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def delete_bank_account(self, db: Session, bank_account_id: int) -> bool:
         """Delete bank account."""
         try:
-            bank_account = self.crud_bank_account.get(db, bank_account_id)
-            if not bank_account:
+            if not self.crud_bank_account.delete(db, bank_account_id=bank_account_id):
                 return False
-            
-            user_id = bank_account.user_id
-            self.crud_bank_account.delete(db, bank_account_id=bank_account_id)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, user_id)
+            db.commit()
             
             logger.info(f"Deleted bank account {bank_account_id}")
             return True
         except Exception as e:
             logger.error(f"Error deleting bank account {bank_account_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def get_total_balance_by_user(self, db: Session, user_id: int) -> Dict[str, Any]:
         """Get total balance across all bank accounts for a user."""
         try:
-            total_balance = self.crud_bank_account.get_total_balance_by_user(db, user_id)
-            bank_accounts = self.crud_bank_account.get_by_user_id(db, user_id)
+            totals = self.crud_bank_account.get_totals_by_user(db, user_id)
             
             return {
                 "user_id": user_id,
-                "total_balance": total_balance,
-                "account_count": len(bank_accounts),
-                "accounts": bank_accounts
+                "total_balance": totals["total_balance"],
+                "account_count": totals["count"]
             }
         except Exception as e:
             logger.error(f"Error getting total balance for user {user_id}: {str(e)}")
             raise e
     
     def get_bank_accounts_summary(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get comprehensive summary of user's bank accounts."""
+        """Get comprehensive summary of user's bank accounts, grouped by bank and account type."""
         try:
-            bank_accounts = self.crud_bank_account.get_by_user_id(db, user_id)
-            if not bank_accounts:
-                return {
-                    "user_id": user_id,
-                    "total_balance": 0,
-                    "account_count": 0,
-                    "accounts_by_bank": {},
-                    "accounts_by_type": {}
-                }
-            
-            total_balance = sum(account.balance or 0 for account in bank_accounts)
-            
-            # Group by bank
-            accounts_by_bank = {}
-            for account in bank_accounts:
-                bank_name = account.bank_name or "Unknown"
-                if bank_name not in accounts_by_bank:
-                    accounts_by_bank[bank_name] = []
-                accounts_by_bank[bank_name].append(account)
-            
-            # Group by account type
-            accounts_by_type = {}
-            for account in bank_accounts:
-                account_type = account.account_type or "Unknown"
-                if account_type not in accounts_by_type:
-                    accounts_by_type[account_type] = []
-                accounts_by_type[account_type].append(account)
+            totals = self.crud_bank_account.get_totals_by_user(db, user_id, group_by=("bank_name", "account_type"))
             
             return {
                 "user_id": user_id,
-                "total_balance": total_balance,
-                "account_count": len(bank_accounts),
-                "accounts_by_bank": accounts_by_bank,
-                "accounts_by_type": accounts_by_type,
-                "accounts": bank_accounts
+                "total_balance": totals["total_balance"],
+                "account_count": totals["count"],
+                "accounts_by_bank": totals["by_bank_name"],
+                "accounts_by_type": totals["by_account_type"]
             }
         except Exception as e:
             logger.error(f"Error getting bank accounts summary for user {user_id}: {str(e)}")
@@ -204,3 +180,4 @@ class BankAccountService:
 
 
 bank_account_service = BankAccountService()
+async_bank_account_service = AsyncSessionAdapter(bank_account_service)
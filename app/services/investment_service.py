@@ -2,8 +2,8 @@ from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from app.crud.crud_investment import investment as crud_investment
 from app.crud.crud_user import user as crud_user
-from datetime import datetime
 import logging
+from app.database.async_adapter import AsyncSessionAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -37,9 +37,7 @@ class InvestmentService:
             
             # Create investment
             investment = self.crud_investment.create(db, obj_in=investment_data)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, investment_data["user_id"])
+            db.commit()
             
             logger.info(f"Created investment {investment.id} for user {investment_data['user_id']}")
             
@@ -66,6 +64,18 @@ class InvestmentService:
             logger.error(f"Error getting investment {investment_id}: {str(e)}")
             raise e
     
+    def get_investments(self, db: Session, cursor: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get a page of investments with optional filtering."""
+        try:
+            page = self.crud_investment.get_multi(db, cursor=cursor, limit=limit, filters=filters)
+            return {
+                "investments": [{"investment": investment} for investment in page.items],
+                "next_cursor": page.next_cursor
+            }
+        except Exception as e:
+            logger.error(f"Error getting investments: {str(e)}")
+            raise e
+    
     def get_investments_by_user(self, db: Session, user_id: int) -> List[Dict[str, Any]]:
         """Get all investments for a user."""
         try:
@@ -139,9 +149,7 @@ class InvestmentService:
                     }
             
             updated_investment = self.crud_investment.update(db, db_obj=investment, obj_in=update_data)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, investment.user_id)
+            db.commit()
             
             return {
                 "success": True,
@@ -150,88 +158,54 @@ class InvestmentService:
             }
         except Exception as e:
             logger.error(f"Error updating investment {investment_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def delete_investment(self, db: Session, investment_id: int) -> bool:
         """Delete investment."""
         try:
-            investment = self.crud_investment.get(db, investment_id)
-            if not investment:
+            if not self.crud_investment.delete(db, investment_id=investment_id):
                 return False
-            
-            user_id = investment.user_id
-            self.crud_investment.delete(db, investment_id=investment_id)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, user_id)
+            db.commit()
             
             logger.info(f"Deleted investment {investment_id}")
             return True
         except Exception as e:
             logger.error(f"Error deleting investment {investment_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def get_total_investment_value_by_user(self, db: Session, user_id: int) -> Dict[str, Any]:
         """Get total current value of investments for a user."""
         try:
-            total_value = self.crud_investment.get_total_investment_value_by_user(db, user_id)
-            investments = self.crud_investment.get_by_user_id(db, user_id)
+            totals = self.crud_investment.get_totals_by_user(db, user_id)
             
             return {
                 "user_id": user_id,
-                "total_value": total_value,
-                "investment_count": len(investments),
-                "investments": investments
+                "total_value": totals["total_value"],
+                "investment_count": totals["count"]
             }
         except Exception as e:
             logger.error(f"Error getting total investment value for user {user_id}: {str(e)}")
             raise e
     
     def get_investments_summary(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get comprehensive summary of user's investments."""
+        """Get comprehensive summary of user's investments, grouped by institution and type."""
         try:
-            investments = self.crud_investment.get_by_user_id(db, user_id)
-            if not investments:
-                return {
-                    "user_id": user_id,
-                    "total_value": 0,
-                    "total_invested": 0,
-                    "total_profit": 0,
-                    "investment_count": 0,
-                    "investments_by_institution": {},
-                    "investments_by_type": {}
-                }
-            
-            total_value = sum(investment.current_value or 0 for investment in investments)
-            total_invested = sum(investment.amount_invested or 0 for investment in investments)
+            totals = self.crud_investment.get_totals_by_user(db, user_id, group_by=("institution", "investment_type"))
+            total_value = totals["total_value"]
+            total_invested = totals["total_invested"]
             total_profit = total_value - total_invested
             
-            # Group by institution
-            investments_by_institution = {}
-            for investment in investments:
-                institution = investment.institution or "Unknown"
-                if institution not in investments_by_institution:
-                    investments_by_institution[institution] = []
-                investments_by_institution[institution].append(investment)
-            
-            # Group by investment type
-            investments_by_type = {}
-            for investment in investments:
-                investment_type = investment.investment_type or "Unknown"
-                if investment_type not in investments_by_type:
-                    investments_by_type[investment_type] = []
-                investments_by_type[investment_type].append(investment)
-            
             return {
                 "user_id": user_id,
                 "total_value": total_value,
                 "total_invested": total_invested,
                 "total_profit": total_profit,
                 "profit_percentage": round((total_profit / total_invested * 100) if total_invested > 0 else 0, 2),
-                "investment_count": len(investments),
-                "investments_by_institution": investments_by_institution,
-                "investments_by_type": investments_by_type,
-                "investments": investments
+                "investment_count": totals["count"],
+                "investments_by_institution": totals["by_institution"],
+                "investments_by_type": totals["by_investment_type"]
             }
         except Exception as e:
             logger.error(f"Error getting investments summary for user {user_id}: {str(e)}")
@@ -240,46 +214,21 @@ class InvestmentService:
     def get_investment_analytics(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
         """Get investment analytics for a user."""
         try:
-            investments = self.crud_investment.get_by_user_id(db, user_id)
-            if not investments:
-                return {
-                    "user_id": user_id,
-                    "total_investments": 0,
-                    "matured_investments": 0,
-                    "profitable_investments": 0,
-                    "total_value": 0,
-                    "total_invested": 0,
-                    "total_profit": 0,
-                    "average_return_rate": 0
-                }
-            
-            matured_investments = [inv for inv in investments if inv.maturity_date and inv.maturity_date < datetime.now()]
-            profitable_investments = [inv for inv in investments if inv.current_value and inv.amount_invested and inv.current_value > inv.amount_invested]
-            
-            total_value = sum(inv.current_value or 0 for inv in investments)
-            total_invested = sum(inv.amount_invested or 0 for inv in investments)
+            analytics = self.crud_investment.get_analytics_by_user(db, user_id)
+            total_value = analytics["total_value"]
+            total_invested = analytics["total_invested"]
             total_profit = total_value - total_invested
             
-            # Calculate average return rate
-            return_rates = []
-            for inv in investments:
-                if inv.amount_invested and inv.amount_invested > 0 and inv.current_value:
-                    rate = ((inv.current_value - inv.amount_invested) / inv.amount_invested) * 100
-                    return_rates.append(rate)
-            
-            average_return_rate = sum(return_rates) / len(return_rates) if return_rates else 0
-            
             return {
                 "user_id": user_id,
-                "total_investments": len(investments),
-                "matured_investments": len(matured_investments),
-                "profitable_investments": len(profitable_investments),
+                "total_investments": analytics["total_investments"],
+                "matured_investments": analytics["matured_investments"],
+                "profitable_investments": analytics["profitable_investments"],
                 "total_value": total_value,
                 "total_invested": total_invested,
                 "total_profit": total_profit,
                 "profit_percentage": round((total_profit / total_invested * 100) if total_invested > 0 else 0, 2),
-                "average_return_rate": round(average_return_rate, 2),
-                "investments": investments
+                "average_return_rate": round(analytics["average_return_rate"], 2)
             }
         except Exception as e:
             logger.error(f"Error getting investment analytics for user {user_id}: {str(e)}")
@@ -287,3 +236,4 @@ class InvestmentService:
 
 
 investment_service = InvestmentService()
+async_investment_service = AsyncSessionAdapter(investment_service)
@@ -1,34 +1,37 @@
 from app.crud.crud_loan_request import loan_request
-from app.crud.crud_user import user
 import uuid
 from app.core.logger import logger
 from typing import Dict, Any, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.database.async_adapter import AsyncSessionAdapter
+
+# Postgres' names for the user_id foreign keys of loan_requests and loan_request_keys
+USER_FOREIGN_KEYS = frozenset({"loan_requests_user_id_fkey", "loan_request_keys_user_id_fkey"})
+
+
+def _constraint_name(error: IntegrityError) -> Optional[str]:
+    """The constraint an INSERT violated, from psycopg2's diagnostics or the asyncpg error behind the adapted one."""
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return diag.constraint_name
+    return getattr(error.orig.__cause__, "constraint_name", None)
+
 
 class LoanRequestService:
     def __init__(self):
         self.crud_loan_request = loan_request
-        self.crud_user = user
 
     def create_loan_request(self, db: Session, user_id: uuid.UUID, request_type: str, loan_type: str, from_loan_id: Optional[uuid.UUID], to_loan_id: uuid.UUID) -> Dict[str, Any]:
+        """Create a loan request once per user, request type and pair of loans.
+
+        A single INSERT ... ON CONFLICT (see ``CRUDLoanRequest.create_once``)
+        both checks and writes, so a repeated or concurrent call returns the
+        request created first instead of a duplicate. A missing user fails the
+        statement's foreign key instead of being looked up beforehand; any
+        other integrity error is raised.
+        """
         logger.info(f"Creating loan request for user {user_id}...")
-        # Validate user exists
-        user = self.crud_user.get(db, user_id)
-        if not user:
-            return {
-                "success": False,
-                "message": "User not found"
-            }
-        
-        # Validate loan exists 
-        existing_loan_request = self.crud_loan_request.get_by_to_loan_id(db, to_loan_id)
-        if existing_loan_request:
-            return {
-                "success": False,
-                "message": "To loan already exists",
-                "loan_request_id": str(existing_loan_request.id)
-            }
-        
         loan_request_data = {
             "user_id": user_id,
             "request_type": request_type,
@@ -37,13 +40,44 @@ class LoanRequestService:
             "to_loan_id": to_loan_id
         }
 
-        # store loan request
-        new_loan_request = self.crud_loan_request.create(db, obj_in=loan_request_data)
+        # store loan request, unless the same request exists
+        try:
+            loan_request_id, created = self.crud_loan_request.create_once(db, obj_in=loan_request_data)
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if _constraint_name(e) not in USER_FOREIGN_KEYS:
+                logger.error(f"Error creating loan request for user {user_id}: {str(e)}")
+                raise e
+            return {
+                "success": False,
+                "message": "User not found"
+            }
+        if not created:
+            return {
+                "success": False,
+                "message": "Loan request already exists",
+                "loan_request_id": str(loan_request_id)
+            }
         logger.info(f"Loan request created successfully for user {user_id}")
         return {
             "success": True,
             "message": "Loan request created successfully",
-            "loan_request_id": str(new_loan_request.id)
+            "loan_request_id": str(loan_request_id)
         }
+
+    def get_loan_requests(self, db: Session, cursor: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get a page of loan requests with optional filtering."""
+        try:
+            page = self.crud_loan_request.get_multi(db, cursor=cursor, limit=limit, filters=filters)
+            return {
+                "loan_requests": [loan_request.model_dump() for loan_request in page.items],
+                "next_cursor": page.next_cursor
+            }
+        except Exception as e:
+            logger.error(f"Error getting loan requests: {str(e)}")
+            raise e
         
-loan_request_service = LoanRequestService()
\ No newline at end of file
+
+loan_request_service = LoanRequestService()
+async_loan_request_service = AsyncSessionAdapter(loan_request_service)
@@ -1,9 +1,9 @@
 from typing import List, Optional, Dict, Any
 from app.crud.crud_loan import loan as crud_loan
 from app.crud.crud_user import user as crud_user
-from datetime import datetime
 from sqlalchemy.orm import Session
 from app.core.logger import logger
+from app.database.async_adapter import AsyncSessionAdapter
 
 
 class LoanService:
@@ -33,9 +33,7 @@ class LoanService:
             
             # Create loan
             loan = self.crud_loan.create(db, obj_in=loan_data)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, loan_data["user_id"])
+            db.commit()
             
             logger.info(f"Created loan {loan.id} for user {loan_data['user_id']}")
             
@@ -62,6 +60,18 @@ class LoanService:
             logger.error(f"Error getting loan {loan_id}: {str(e)}")
             raise e
     
+    def get_loans(self, db: Session, cursor: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get a page of loans with optional filtering."""
+        try:
+            page = self.crud_loan.get_multi(db, cursor=cursor, limit=limit, filters=filters)
+            return {
+                "loans": [{"loan": loan} for loan in page.items],
+                "next_cursor": page.next_cursor
+            }
+        except Exception as e:
+            logger.error(f"Error getting loans: {str(e)}")
+            raise e
+    
     def get_loans_by_user(self, db: Session, user_id: int) -> List[Dict[str, Any]]:
         """Get all loans for a user."""
         try:
@@ -133,9 +143,7 @@ class LoanService:
                     }
             
             updated_loan = self.crud_loan.update(db, db_obj=loan, obj_in=update_data)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, loan.user_id)
+            db.commit()
             
             return {
                 "success": True,
@@ -144,91 +152,49 @@ class LoanService:
             }
         except Exception as e:
             logger.error(f"Error updating loan {loan_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def delete_loan(self, db: Session, loan_id: int) -> bool:
         """Delete loan."""
         try:
-            loan = self.crud_loan.get(db, loan_id)
-            if not loan:
+            if not self.crud_loan.delete(db, loan_id=loan_id):
                 return False
-            
-            user_id = loan.user_id
-            self.crud_loan.delete(db, loan_id=loan_id)
-            
-            # Update user's financial summary
-            self.crud_user.update_financial_summary(db, user_id)
+            db.commit()
             
             logger.info(f"Deleted loan {loan_id}")
             return True
         except Exception as e:
             logger.error(f"Error deleting loan {loan_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def get_total_liability_by_user(self, db: Session, user_id: int) -> Dict[str, Any]:
         """Get total loan liability for a user."""
         try:
-            total_liability = self.crud_loan.get_total_liability_by_user(db, user_id)
-            loans = self.crud_loan.get_by_user_id(db, user_id)
+            totals = self.crud_loan.get_totals_by_user(db, user_id)
             
             return {
                 "user_id": user_id,
-                "total_liability": total_liability,
-                "loan_count": len(loans),
-                "loans": loans
+                "total_liability": totals["total_liability"],
+                "loan_count": totals["count"]
             }
         except Exception as e:
             logger.error(f"Error getting total liability for user {user_id}: {str(e)}")
             raise e
     
     def get_loans_summary(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get comprehensive summary of user's loans."""
+        """Get comprehensive summary of user's loans, grouped by lender, type and status."""
         try:
-            loans = self.crud_loan.get_by_user_id(db, user_id)
-            if not loans:
-                return {
-                    "user_id": user_id,
-                    "total_liability": 0,
-                    "loan_count": 0,
-                    "loans_by_lender": {},
-                    "loans_by_type": {},
-                    "loans_by_status": {}
-                }
-            
-            total_liability = sum(loan.current_balance or 0 for loan in loans)
-            
-            # Group by lender
-            loans_by_lender = {}
-            for loan in loans:
-                lender = loan.lender or "Unknown"
-                if lender not in loans_by_lender:
-                    loans_by_lender[lender] = []
-                loans_by_lender[lender].append(loan)
-            
-            # Group by loan type
-            loans_by_type = {}
-            for loan in loans:
-                loan_type = loan.loan_type or "Unknown"
-                if loan_type not in loans_by_type:
-                    loans_by_type[loan_type] = []
-                loans_by_type[loan_type].append(loan)
-            
-            # Group by status
-            loans_by_status = {}
-            for loan in loans:
-                status = loan.status or "Unknown"
-                if status not in loans_by_status:
-                    loans_by_status[status] = []
-                loans_by_status[status].append(loan)
+            totals = self.crud_loan.get_totals_by_user(db, user_id, group_by=("lender", "loan_type", "status"))
             
             return {
                 "user_id": user_id,
-                "total_liability": total_liability,
-                "loan_count": len(loans),
-                "loans_by_lender": loans_by_lender,
-                "loans_by_type": loans_by_type,
-                "loans_by_status": loans_by_status,
-                "loans": loans
+                "total_liability": totals["total_liability"],
+                "loan_count": totals["count"],
+                "loans_by_lender": totals["by_lender"],
+                "loans_by_type": totals["by_loan_type"],
+                "loans_by_status": totals["by_status"]
             }
         except Exception as e:
             logger.error(f"Error getting loans summary for user {user_id}: {str(e)}")
@@ -237,41 +203,14 @@ class LoanService:
     def get_loan_analytics(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
         """Get loan analytics for a user."""
         try:
-            loans = self.crud_loan.get_by_user_id(db, user_id)
-            if not loans:
-                return {
-                    "user_id": user_id,
-                    "total_loans": 0,
-                    "active_loans": 0,
-                    "overdue_loans": 0,
-                    "total_emi": 0,
-                    "average_interest_rate": 0,
-                    "total_liability": 0
-                }
-            
-            active_loans = [loan for loan in loans if loan.status == "active"]
-            overdue_loans = [loan for loan in loans if loan.due_date and loan.due_date < datetime.now()]
-            
-            total_emi = sum(loan.emi_amount or 0 for loan in loans)
-            total_liability = sum(loan.current_balance or 0 for loan in loans)
-            
-            # Calculate average interest rate
-            interest_rates = [loan.interest_rate for loan in loans if loan.interest_rate]
-            average_interest_rate = sum(interest_rates) / len(interest_rates) if interest_rates else 0
+            analytics = self.crud_loan.get_analytics_by_user(db, user_id)
+            analytics["average_interest_rate"] = round(analytics["average_interest_rate"], 2)
             
-            return {
-                "user_id": user_id,
-                "total_loans": len(loans),
-                "active_loans": len(active_loans),
-                "overdue_loans": len(overdue_loans),
-                "total_emi": total_emi,
-                "average_interest_rate": round(average_interest_rate, 2),
-                "total_liability": total_liability,
-                "loans": loans
-            }
+            return {"user_id": user_id, **analytics}
         except Exception as e:
             logger.error(f"Error getting loan analytics for user {user_id}: {str(e)}")
             raise e
 
 
 loan_service = LoanService()
+async_loan_service = AsyncSessionAdapter(loan_service)
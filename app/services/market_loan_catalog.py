@@ -0,0 +1,311 @@
+"""In-memory, indexed copy of the ``market_loans`` catalog for the loan search tool.
+
+``market_loans`` is small and changes rarely, but every new-loan and
+refinance turn searches it. The catalog loads the whole table once and answers
+``search`` from memory, with the semantics of
+``CRUDMarketLoan.get_by_loan_type_and_amount_and_interest_rate_and_tenure``.
+
+Every range predicate is answered by a bitmask over the loans, which are
+numbered cheapest ``roi_start`` first: a set bit means the loan passes. ANDing
+the masks of the loan type, amount, rate and tenure predicates leaves the
+matches, and the lowest set bits are the cheapest ones.
+
+A snapshot is rebuilt, from the primary, after a session commits a write to
+``market_loans`` in this process, and otherwise every
+``MARKET_LOAN_CATALOG_TTL_SECONDS``, when a cheap fingerprint query tells
+whether another process changed the table.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import uuid
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.database.models.market_loan import MarketLoan
+from app.database.session import ReadSessionLocal, SessionLocal
+
+# Session.info key of a session that wrote market_loans in its current transaction
+MARKET_LOANS_WRITTEN = "market_loans_written"
+# Sorted positions between two precomputed masks of a _Threshold
+_CHECKPOINT_EVERY = 64
+# Loan type queries whose mask is kept per snapshot
+_TYPE_MASK_CACHE_SIZE = 256
+# Rebuilds a search tries before it gives up caching a snapshot invalidated while it was read
+_REBUILD_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class CatalogLoan:
+    """A read-only copy of one ``market_loans`` row, with the attributes of ``MarketLoan``."""
+    id: uuid.UUID
+    lender_name: Optional[str]
+    loan_type: Optional[str]
+    roi_start: Optional[float]
+    roi_end: Optional[float]
+    min_loan_amount: Optional[float]
+    max_loan_amount: Optional[float]
+    tenure_upto: Optional[int]
+    loan_tags: Optional[List[str]]
+    status: Optional[bool]
+    processing_fee: Optional[float]
+    prepayment_penalty: Optional[float]
+    offer_valid_till: Optional[str]
+    eligibility_criteria: Optional[str]
+    terms_and_conditions: Optional[str]
+
+    @classmethod
+    def from_model(cls, market_loan: MarketLoan) -> "CatalogLoan":
+        return cls(**{f.name: getattr(market_loan, f.name) for f in fields(cls)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: str(self.id) if f.name == "id" else getattr(self, f.name) for f in fields(self)}
+
+
+class _Threshold:
+    """Bitmasks of the loans whose key is at most, or at least, a value.
+
+    Keeps the loans sorted by key and the mask of every ``_CHECKPOINT_EVERY``-th
+    prefix, so a lookup is a bisect plus at most that many ORs, in O(n log n) memory.
+    """
+
+    def __init__(self, keys: Sequence[float]):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in order]
+        self.bits = [1 << i for i in order]
+        self.all = (1 << len(keys)) - 1
+        self.checkpoints = [0]
+        for start in range(0, len(order), _CHECKPOINT_EVERY):
+            mask = self.checkpoints[-1]
+            for bit in self.bits[start:start + _CHECKPOINT_EVERY]:
+                mask |= bit
+            self.checkpoints.append(mask)
+
+    def _prefix(self, count: int) -> int:
+        """The mask of the ``count`` loans with the smallest keys."""
+        checkpoint = count // _CHECKPOINT_EVERY
+        mask = self.checkpoints[checkpoint]
+        for bit in self.bits[checkpoint * _CHECKPOINT_EVERY:count]:
+            mask |= bit
+        return mask
+
+    def at_most(self, value: float) -> int:
+        return self._prefix(bisect_right(self.keys, value))
+
+    def at_least(self, value: float) -> int:
+        return self.all & ~self._prefix(bisect_left(self.keys, value))
+
+
+class MarketLoanCatalog:
+    """An immutable, indexed snapshot of the market loans.
+
+    Rows with a NULL loan type, amount range, rate range or tenure never match
+    the search in SQL, so they are left out of the index.
+    """
+
+    def __init__(self, loans: Sequence[CatalogLoan], version: int, fingerprint: Tuple[Any, ...]):
+        """Create a new MarketLoanCatalog instance.
+
+        Args:
+        ---
+            loans (Sequence[CatalogLoan]) : Every market loan.
+            version (int) : The build number of this snapshot, increasing in this process.
+            fingerprint (Tuple[Any, ...]) : The ``market_loans`` fingerprint the loans were read at.
+        """
+        self.version = version
+        self.fingerprint = fingerprint
+        searchable = [
+            loan for loan in loans
+            if None not in (loan.loan_type, loan.min_loan_amount, loan.max_loan_amount, loan.roi_start, loan.roi_end, loan.tenure_upto)
+        ]
+        # Bit i is the i-th cheapest loan, so the lowest set bits of a result are the cheapest
+        self.loans = sorted(searchable, key=lambda loan: (loan.roi_start, str(loan.id)))
+        self.size = len(loans)
+        self.min_amount = _Threshold([loan.min_loan_amount for loan in self.loans])
+        self.max_amount = _Threshold([loan.max_loan_amount for loan in self.loans])
+        self.roi_start = _Threshold([loan.roi_start for loan in self.loans])
+        self.roi_end = _Threshold([loan.roi_end for loan in self.loans])
+        self.tenure = _Threshold([loan.tenure_upto for loan in self.loans])
+        self.loan_types: Dict[str, int] = {}
+        for i, loan in enumerate(self.loans):
+            loan_type = loan.loan_type.lower()
+            self.loan_types[loan_type] = self.loan_types.get(loan_type, 0) | (1 << i)
+        self._type_masks: Dict[str, int] = {}
+
+    def _type_mask(self, loan_type: str) -> int:
+        """The loans whose lower-cased loan type contains ``loan_type``, like ``lower(loan_type) LIKE '%...%'``."""
+        query = loan_type.lower()
+        mask = self._type_masks.get(query)
+        if mask is None:
+            mask = 0
+            for name, bits in self.loan_types.items():
+                if query in name:
+                    mask |= bits
+            if len(self._type_masks) >= _TYPE_MASK_CACHE_SIZE:
+                self._type_masks.clear()
+            self._type_masks[query] = mask
+        return mask
+
+    def search(self, loan_type: str, amount: float, interest_rate: float, tenure: int, lender_name: Optional[str] = None, limit: int = 5) -> List[CatalogLoan]:
+        """The cheapest loans of a type that lend ``amount`` at ``interest_rate`` for at least ``tenure``.
+
+        Args:
+        ---
+            loan_type (str) : A substring of the loan type, case-insensitive.
+            amount (float) : The amount, within the loan's amount range.
+            interest_rate (float) : The interest rate, within the loan's rate range.
+            tenure (int) : The tenure, at most the loan's longest tenure.
+            lender_name (Optional[str]) : A substring of the lender name, case-insensitive.
+            limit (int) : The maximum number of loans.
+
+        Returns:
+        ---
+            List[CatalogLoan] : The matching loans, lowest ``roi_start`` first.
+        """
+        mask = self._type_mask(loan_type)
+        if mask:
+            mask &= self.min_amount.at_most(amount) & self.max_amount.at_least(amount)
+        if mask:
+            mask &= self.roi_start.at_most(interest_rate) & self.roi_end.at_least(interest_rate)
+        if mask:
+            mask &= self.tenure.at_least(tenure)
+        lender = lender_name.lower() if lender_name is not None else None
+        matches = []
+        while mask and len(matches) < limit:
+            lowest = mask & -mask
+            mask ^= lowest
+            loan = self.loans[lowest.bit_length() - 1]
+            if lender is None or (loan.lender_name is not None and lender in loan.lender_name.lower()):
+                matches.append(loan)
+        return matches
+
+
+class MarketLoanCatalogCache:
+    """The current ``MarketLoanCatalog`` snapshot, rebuilt when ``market_loans`` changes.
+
+    Searches never wait on the database while the snapshot is fresh. A stale
+    snapshot is rebuilt by the first caller, under a lock, while concurrent
+    callers wait for it.
+
+    Every ``invalidate`` bumps a generation. A rebuild keeps its snapshot only
+    if no invalidation arrived while it read the table, and otherwise reads
+    again, so a write committed during a rebuild is never hidden for the TTL.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], ttl: float, primary_session_factory: Optional[Callable[[], Session]] = None):
+        """Create a new MarketLoanCatalogCache instance.
+
+        Args:
+        ---
+            session_factory (Callable[[], Session]) : Opens the session the catalog is read with.
+            ttl (float) : The seconds after which the table is checked for changes made by other processes.
+            primary_session_factory (Optional[Callable[[], Session]]) : Opens the session the catalog is read with after
+                ``invalidate``, which must see this process's writes; ``session_factory`` if None.
+        """
+        self.session_factory = session_factory
+        self.primary_session_factory = primary_session_factory or session_factory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Guards the generation, which invalidate() bumps without waiting for a running rebuild
+        self._generation_lock = threading.Lock()
+        self._generation = 0
+        self._read_primary = False
+        self._catalog: Optional[MarketLoanCatalog] = None
+        self._checked_at = 0.0
+        self._version = 0
+
+    def invalidate(self) -> None:
+        """Rebuild the snapshot from the primary on the next search, after this process wrote ``market_loans``."""
+        with self._generation_lock:
+            self._generation += 1
+            self._read_primary = True
+            self._catalog = None
+
+    def current(self) -> Optional[MarketLoanCatalog]:
+        """The snapshot, None when it is missing or due for a check."""
+        catalog = self._catalog
+        if catalog is None or time.monotonic() - self._checked_at > self.ttl:
+            return None
+        return catalog
+
+    def get(self) -> MarketLoanCatalog:
+        """The fresh snapshot, rebuilt first if needed. Blocks on the database when it is stale."""
+        catalog = self.current()
+        if catalog is not None:
+            return catalog
+        with self._lock:
+            catalog = self.current()
+            if catalog is not None:
+                return catalog
+            for _ in range(_REBUILD_ATTEMPTS):
+                with self._generation_lock:
+                    generation, read_primary, catalog = self._generation, self._read_primary, self._catalog
+                catalog = self._build(self.primary_session_factory if read_primary else self.session_factory, catalog)
+                with self._generation_lock:
+                    if self._generation == generation:
+                        self._catalog = catalog
+                        self._checked_at = time.monotonic()
+                        self._read_primary = False
+                        return catalog
+            # Still invalidated faster than it can be read: serve the last read without keeping it
+            logger.warning(f"Market loan catalog invalidated during {_REBUILD_ATTEMPTS} rebuilds, not caching version {catalog.version}")
+            return catalog
+
+    def _build(self, session_factory: Callable[[], Session], catalog: Optional[MarketLoanCatalog]) -> MarketLoanCatalog:
+        """A snapshot of the table, ``catalog`` itself if the table has not changed since it was read."""
+        db = session_factory()
+        try:
+            fingerprint = tuple(db.execute(select(func.count(), func.max(MarketLoan.modified_at)).select_from(MarketLoan)).one())
+            if catalog is not None and catalog.fingerprint == fingerprint:
+                return catalog
+            loans = [CatalogLoan.from_model(market_loan) for market_loan in db.scalars(select(MarketLoan))]
+            self._version += 1
+            catalog = MarketLoanCatalog(loans, self._version, fingerprint)
+            logger.info(f"Built market loan catalog version {catalog.version} with {catalog.size} loans")
+            return catalog
+        finally:
+            db.close()
+
+    async def aget(self) -> MarketLoanCatalog:
+        """``get`` for the event loop: a fresh snapshot is returned at once, a rebuild runs in a worker thread."""
+        catalog = self.current()
+        if catalog is not None:
+            return catalog
+        return await asyncio.to_thread(self.get)
+
+
+market_loan_catalog = MarketLoanCatalogCache(ReadSessionLocal, ttl=settings.MARKET_LOAN_CATALOG_TTL_SECONDS, primary_session_factory=SessionLocal)
+
+
+def _writes_market_loans(session: Session) -> bool:
+    return any(isinstance(instance, MarketLoan) for instance in (*session.new, *session.dirty, *session.deleted))
+
+
+@event.listens_for(Session, "before_flush")
+def _track_flushed_writes(session: Session, flush_context: Any, instances: Any) -> None:
+    if _writes_market_loans(session):
+        session.info[MARKET_LOANS_WRITTEN] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(orm_context: ORMExecuteState) -> None:
+    if (orm_context.is_insert or orm_context.is_update or orm_context.is_delete) and orm_context.bind_mapper is not None:
+        if orm_context.bind_mapper.class_ is MarketLoan:
+            orm_context.session.info[MARKET_LOANS_WRITTEN] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(MARKET_LOANS_WRITTEN, False):
+        market_loan_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session: Session) -> None:
+    session.info.pop(MARKET_LOANS_WRITTEN, None)
@@ -0,0 +1,351 @@
+"""Import provider loan catalogs into ``market_loans``.
+
+A catalog file is read one offer at a time, so a catalog of any size needs
+the memory of one batch: each batch of ``MARKET_LOAN_IMPORT_BATCH_SIZE`` offers
+is normalized and validated with ``MarketLoanOffer`` and copied into a
+temporary staging table. The staged catalog is then applied to ``market_loans``
+as a diff in the same transaction: offers are matched on their lender, loan
+type and amount range, changed ones are updated in place and keep their ids,
+new ones are inserted and, unless ``prune`` is off, offers missing from the
+catalog are deleted. Readers never see a half-imported catalog.
+
+A catalog with no valid offer, or with offers that failed validation, is
+likely a bad export rather than a smaller catalog, so it does not prune
+unless ``force_prune`` is given: the search, refinance and precompute paths
+would otherwise lose every offer it failed to carry.
+
+Run from the command line with::
+
+    python -m app.services.market_loan_import_service app/data/loans_provider.json --dry-run
+"""
+import argparse
+import codecs
+import csv
+import io
+import json
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.datetime_utils import utc_now_naive
+from app.core.exception import CatalogFormatException
+from app.core.logger import logger
+from app.core.uuid_utils import uuid7
+from app.database.session import SessionLocal, shard_router
+from app.database.sharding import pinned_shard
+from app.schemas.market_loans import MarketLoanOffer
+from app.services.market_loan_catalog import market_loan_catalog
+
+FORMATS = ("json", "ndjson", "csv")
+# Bytes read from the catalog file at a time
+READ_SIZE = 1 << 16
+# Characters of a JSON item that still does not parse, before the file is rejected
+MAX_ITEM_SIZE = 1 << 20
+STAGING_TABLE = "market_loan_import"
+OFFER_COLUMNS = [name for name in MarketLoanOffer.model_fields]
+# An offer matches a stored market loan with the same lender, loan type and amount range
+_MATCH = (
+    "lower(m.lender_name) = lower(s.lender_name) AND lower(m.loan_type) = lower(s.loan_type) "
+    "AND m.min_loan_amount = s.min_loan_amount AND m.max_loan_amount = s.max_loan_amount"
+)
+
+
+@dataclass
+class ImportResult:
+    """The outcome of a catalog import.
+
+    Attributes:
+        offers_read (int): The offers in the file.
+        offers_invalid (int): The offers rejected by validation, see ``errors``.
+        offers_duplicate (int): The valid offers replaced by a later offer with the same key in the file.
+        inserted (int): The market loans created.
+        updated (int): The market loans whose columns changed.
+        deleted (int): The market loans missing from the catalog and deleted.
+        unchanged (int): The market loans already matching their offer.
+        dry_run (bool): Whether the changes were rolled back instead of committed.
+        prune_skipped (Optional[str]): Why the market loans missing from the catalog were kept although ``prune`` was on, None if they were not.
+        errors (List[Dict[str, Any]]): The first ``MARKET_LOAN_IMPORT_MAX_ERRORS`` rejected offers, by position in the file.
+    """
+    offers_read: int = 0
+    offers_invalid: int = 0
+    offers_duplicate: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    dry_run: bool = False
+    prune_skipped: Optional[str] = None
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def detect_format(filename: str) -> str:
+    """The catalog format of a file name, by extension: ``.json``, ``.ndjson``/``.jsonl`` or ``.csv``."""
+    suffix = Path(filename).suffix.lower()
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if suffix in (".json", ".csv"):
+        return suffix[1:]
+    raise CatalogFormatException(f"Unknown catalog format of {filename}, expected one of {', '.join(FORMATS)}")
+
+
+def _read_text(file: IO[bytes]) -> Iterator[str]:
+    """Decode a binary file chunk by chunk, dropping a UTF-8 byte order mark."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    while True:
+        chunk = file.read(READ_SIZE)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_json(file: IO[bytes]) -> Iterator[Any]:
+    """The items of a top-level JSON array, decoded one at a time from a buffer of about one item plus a chunk."""
+    decoder = json.JSONDecoder()
+    chunks = _read_text(file)
+    buffer, position, started = "", 0, False
+    while True:
+        # Skip whitespace, then the opening bracket or the commas between items
+        while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ",")):
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise CatalogFormatException("A JSON catalog must be an array of offers")
+                started, position = True, position + 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                item, end = None, None
+            # A number may have been cut short by the end of the buffer, so an item
+            # only counts once the comma or bracket after it has been read
+            after = end
+            while after is not None and after < len(buffer) and buffer[after].isspace():
+                after += 1
+            if after is not None and after < len(buffer) and buffer[after] in ",]":
+                yield item
+                position = after
+                continue
+            if len(buffer) - position > MAX_ITEM_SIZE:
+                raise CatalogFormatException(f"Invalid JSON catalog near {buffer[position:position + 80]!r}")
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        buffer, position = buffer[position:] + chunk, 0
+    if not started:
+        raise CatalogFormatException("A JSON catalog must be an array of offers")
+    raise CatalogFormatException(f"Invalid JSON catalog near {buffer[position:position + 80]!r}, or it ends before its closing bracket")
+
+
+def iter_ndjson(file: IO[bytes]) -> Iterator[Any]:
+    """One item per non-empty line; a line that is not JSON becomes the error it raised."""
+    for line in io.TextIOWrapper(file, encoding="utf-8-sig", newline=""):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield e
+
+
+def iter_csv(file: IO[bytes]) -> Iterator[Any]:
+    """One item per row, keyed by the header row; ``loan_tags`` are ``|`` or ``;`` separated."""
+    yield from csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+
+
+READERS = {"json": iter_json, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+class MarketLoanImportService:
+
+    def import_catalog(
+        self, db: Session, file: IO[bytes], format: str, prune: bool = True, dry_run: bool = False,
+        batch_size: Optional[int] = None, force_prune: bool = False,
+    ) -> ImportResult:
+        """Replace the market loans with the offers of a catalog file, in one transaction.
+
+        When the database is sharded ``market_loans`` is copied to every shard,
+        and every shard gets the same import, with the same new ids.
+
+        Args:
+            db (Session): The database session.
+            file (IO[bytes]): The catalog, opened in binary mode.
+            format (str): The catalog format, one of ``json``, ``ndjson`` or ``csv``.
+            prune (bool): Whether to delete the market loans missing from the catalog, off for partial catalogs.
+            dry_run (bool): Whether to roll the changes back and only report them.
+            batch_size (Optional[int]): The offers validated and staged at a time, MARKET_LOAN_IMPORT_BATCH_SIZE by default.
+            force_prune (bool): Whether to prune even when no offer is valid or some offers are invalid.
+
+        Returns:
+            ImportResult: The offer and market loan counts, and the rejected offers.
+
+        Raises:
+            CatalogFormatException: If the file is not a catalog of that format.
+        """
+        if format not in READERS:
+            raise CatalogFormatException(f"Unknown catalog format {format}, expected one of {', '.join(FORMATS)}")
+        batch_size = batch_size or settings.MARKET_LOAN_IMPORT_BATCH_SIZE
+        shard_ids = range(shard_router.shard_count)
+        result = ImportResult(dry_run=dry_run)
+        try:
+            for shard_id in shard_ids:
+                with pinned_shard(db, shard_id):
+                    self._create_staging_table(db)
+
+            batch: List[Tuple[int, Any]] = []
+            for position, item in enumerate(READERS[format](file), start=1):
+                batch.append((position, item))
+                if len(batch) >= batch_size:
+                    self._stage_batch(db, shard_ids, batch, result)
+                    batch = []
+            self._stage_batch(db, shard_ids, batch, result)
+
+            if prune and not force_prune:
+                if result.offers_read == result.offers_invalid:
+                    result.prune_skipped = "the catalog has no valid offer"
+                elif result.offers_invalid:
+                    result.prune_skipped = f"{result.offers_invalid} offers of the catalog are invalid"
+                if result.prune_skipped:
+                    logger.warning(f"Keeping the market loans missing from the catalog: {result.prune_skipped}, force the prune to delete them")
+                    prune = False
+
+            for shard_id in shard_ids:
+                with pinned_shard(db, shard_id):
+                    counts = self._apply_staged(db, prune)
+                # Every shard holds the same market loans, report the primary
+                if shard_id == 0:
+                    result.offers_duplicate, result.inserted, result.updated, result.deleted, result.unchanged = counts
+
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+                market_loan_catalog.invalidate()
+            logger.info(
+                f"Imported market loan catalog{' (dry run)' if dry_run else ''}: {result.offers_read} offers, "
+                f"{result.offers_invalid} invalid, {result.inserted} inserted, {result.updated} updated, {result.deleted} deleted"
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Error importing market loan catalog: {e}")
+            db.rollback()
+            raise e
+
+    def _create_staging_table(self, db: Session) -> None:
+        db.execute(text(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+            f"SELECT 0::bigint AS position, id, {', '.join(OFFER_COLUMNS)} FROM market_loans WITH NO DATA"
+        ))
+
+    def _stage_batch(self, db: Session, shard_ids: range, batch: List[Tuple[int, Any]], result: ImportResult) -> None:
+        """Validate a batch of offers and COPY the valid ones into the staging table of every shard."""
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        for position, item in batch:
+            result.offers_read += 1
+            try:
+                if isinstance(item, Exception):
+                    raise ValueError(f"not JSON: {item}")
+                if not isinstance(item, dict):
+                    raise ValueError("an offer must be an object")
+                offer = MarketLoanOffer.model_validate(item)
+            except (ValidationError, ValueError) as e:
+                result.offers_invalid += 1
+                if len(result.errors) < settings.MARKET_LOAN_IMPORT_MAX_ERRORS:
+                    errors = e.errors(include_url=False, include_input=False, include_context=False) if isinstance(e, ValidationError) else str(e)
+                    result.errors.append({"position": position, "errors": errors})
+                continue
+            # Unstamped, so the copies on every shard share the id
+            offer_id = uuid7() if settings.DB_TIME_ORDERED_IDS else uuid.uuid4()
+            values = offer.model_dump()
+            values["loan_tags"] = json.dumps(values["loan_tags"])
+            writer.writerow([position, offer_id, *(r"\N" if values[name] is None else values[name] for name in OFFER_COLUMNS)])
+        if not rows.tell():
+            return
+        # Bytes with an explicit encoding, whatever the connection's client_encoding
+        data = io.BytesIO(rows.getvalue().encode("utf-8"))
+        for shard_id in shard_ids:
+            with pinned_shard(db, shard_id):
+                data.seek(0)
+                cursor = db.connection().connection.driver_connection.cursor()
+                try:
+                    cursor.copy_expert(
+                        f"COPY {STAGING_TABLE} (position, id, {', '.join(OFFER_COLUMNS)}) "
+                        f"FROM STDIN WITH (FORMAT csv, NULL '\\N', ENCODING 'UTF8')",
+                        data,
+                    )
+                finally:
+                    cursor.close()
+
+    def _apply_staged(self, db: Session, prune: bool) -> Tuple[int, int, int, int, int]:
+        """Apply the staged offers to ``market_loans``: the duplicate, inserted, updated, deleted and unchanged counts."""
+        now = utc_now_naive()
+        # Temporary tables get no statistics from autovacuum; without them the joins below are planned for a tiny table
+        db.execute(text(f"ANALYZE {STAGING_TABLE}"))
+        duplicates = db.execute(text(
+            f"DELETE FROM {STAGING_TABLE} s USING {STAGING_TABLE} m WHERE {_MATCH} AND m.position > s.position"
+        )).rowcount
+        changed_columns = [name for name in OFFER_COLUMNS if name != "loan_tags"]
+        updated = db.execute(text(
+            f"UPDATE market_loans m SET {', '.join(f'{name} = s.{name}' for name in OFFER_COLUMNS)}, modified_at = :now "
+            f"FROM {STAGING_TABLE} s WHERE {_MATCH} "
+            # json has no equality operator; both sides are serialized by json.dumps
+            f"AND ({', '.join(f'm.{name}' for name in changed_columns)}, m.loan_tags::text) "
+            f"IS DISTINCT FROM ({', '.join(f's.{name}' for name in changed_columns)}, s.loan_tags::text)"
+        ), {"now": now}).rowcount
+        inserted = db.execute(text(
+            f"INSERT INTO market_loans (id, created_at, modified_at, {', '.join(OFFER_COLUMNS)}) "
+            f"SELECT s.id, :now, :now, {', '.join(f's.{name}' for name in OFFER_COLUMNS)} FROM {STAGING_TABLE} s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM market_loans m WHERE {_MATCH})"
+        ), {"now": now}).rowcount
+        deleted = db.execute(text(
+            f"DELETE FROM market_loans m WHERE NOT EXISTS (SELECT 1 FROM {STAGING_TABLE} s WHERE {_MATCH})"
+        )).rowcount if prune else 0
+        staged = db.execute(text(f"SELECT count(*) FROM {STAGING_TABLE}")).scalar_one()
+        return duplicates, inserted, updated, deleted, staged - inserted - updated
+
+
+# No async adapter: COPY needs the psycopg2 connection, callers on the event loop use a worker thread
+market_loan_import_service = MarketLoanImportService()
+
+
+def default_catalog_path() -> Path:
+    """The bundled catalog, ``settings.METADATA_FILE_PATH`` relative to the ``app`` package."""
+    return Path(__file__).resolve().parent.parent / settings.METADATA_FILE_PATH
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", type=Path, default=default_catalog_path())
+    parser.add_argument("--format", choices=FORMATS, help="by file extension if not given")
+    parser.add_argument("--keep-missing", action="store_true", help="keep market loans missing from the catalog")
+    parser.add_argument("--force-prune", action="store_true", help="delete missing market loans even if the catalog is empty or has invalid offers")
+    parser.add_argument("--dry-run", action="store_true", help="report the changes and roll them back")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as file:
+            result = market_loan_import_service.import_catalog(
+                db, file, args.format or detect_format(str(args.path)),
+                prune=not args.keep_missing, dry_run=args.dry_run, batch_size=args.batch_size, force_prune=args.force_prune,
+            )
+    finally:
+        db.close()
+    print(json.dumps(result.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
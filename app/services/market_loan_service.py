@@ -4,6 +4,7 @@ from app.core.logger import logger
 from typing import List, Optional
 from app.database.models.market_loan import MarketLoan
 from sqlalchemy.orm import Session
+from app.database.async_adapter import AsyncSessionAdapter
 
 class MarketLoanService:
     def __init__(self):
@@ -82,4 +83,5 @@ class MarketLoanService:
             logger.error(f"Error getting market loans by loan type, amount and tenure and interest rate: {e}")
             return []
     
-market_loan_service = MarketLoanService()
\ No newline at end of file
+market_loan_service = MarketLoanService()
+async_market_loan_service = AsyncSessionAdapter(market_loan_service)
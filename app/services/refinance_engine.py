@@ -0,0 +1,226 @@
+"""EMI and refinance savings for every pair of user loans and market offers, in NumPy.
+
+``refinance`` takes the terms of L loans and O offers and returns L x O arrays:
+the EMI of moving each loan's outstanding balance to each offer, the interest
+it would cost, the net savings after the offer's processing fee and the loan's
+foreclosure penalty, and the month the monthly savings pay those fees back.
+Every result is computed for the whole matrix at once, with no Python loop
+over loans or offers.
+
+Conventions, shared with the refinance agent instructions:
+
+* rates are yearly percentages, compounded monthly
+* ``processing_fee`` of an offer and ``prepayment_penalty`` of a loan are
+  percentages of the outstanding balance, paid upfront on switching
+* the new loan keeps the remaining tenure, capped at the offer's ``tenure_upto``
+* the offer's own ``prepayment_penalty`` only applies to prepaying the new
+  loan, so it is reported but not charged
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+# A break-even month of never: the monthly savings are not positive or never repay the fees
+NEVER = -1
+
+
+def _floats(values: Sequence[Any]) -> np.ndarray:
+    """A float64 array with NaN for missing values."""
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def emi(principal: Any, annual_rate: Any, months: Any) -> np.ndarray:
+    """The equated monthly instalment repaying ``principal`` over ``months`` at ``annual_rate`` percent.
+
+    Broadcasts its arguments, e.g. loans as a column against offer rates as a row.
+    """
+    principal, months = np.asarray(principal, dtype=np.float64), np.asarray(months, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 1200
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # P r / (1 - (1 + r)^-n), with expm1 and log1p to stay exact for small r
+        instalment = principal * monthly_rate / -np.expm1(-months * np.log1p(monthly_rate))
+        return np.where(monthly_rate == 0, principal / months, instalment)
+
+
+def remaining_months(balance: np.ndarray, annual_rate: np.ndarray, current_emi: np.ndarray, fallback_months: np.ndarray, tenure_months: np.ndarray) -> np.ndarray:
+    """The EMIs left to repay ``balance``, from the annuity formula, or ``fallback_months`` when the EMI is unknown or too small.
+
+    At most ``tenure_months``, the full tenure, which a rounded-down EMI would otherwise overshoot by a month.
+    """
+    monthly_rate = annual_rate / 1200
+    with np.errstate(divide="ignore", invalid="ignore"):
+        from_rate = np.ceil(np.log(current_emi / (current_emi - balance * monthly_rate)) / np.log1p(monthly_rate))
+        interest_free = np.ceil(balance / current_emi)
+    months = np.where(monthly_rate == 0, interest_free, from_rate)
+    usable = np.isfinite(months) & (months > 0)
+    return np.fmin(np.where(usable, months, fallback_months), tenure_months)
+
+
+@dataclass(frozen=True)
+class LoanTerms:
+    """The terms of L user loans, as arrays of shape (L,).
+
+    Attributes:
+        balance (np.ndarray): The outstanding balance.
+        annual_rate (np.ndarray): The interest rate, in percent.
+        months (np.ndarray): The EMIs left.
+        emi (np.ndarray): The current EMI.
+        foreclosure_penalty (np.ndarray): The penalty for closing the loan early, in percent of the balance.
+        loan_type (Sequence[Optional[str]]): The loan type, matched against the offers' loan types.
+    """
+    balance: np.ndarray
+    annual_rate: np.ndarray
+    months: np.ndarray
+    emi: np.ndarray
+    foreclosure_penalty: np.ndarray
+    loan_type: Sequence[Optional[str]]
+
+    @classmethod
+    def from_loans(cls, loans: Sequence[Any], today: Optional[date] = None) -> "LoanTerms":
+        """The terms of ``Loan`` rows or objects with the same attributes.
+
+        The EMIs left come from the balance, rate and EMI when they are known,
+        otherwise from ``tenure_months`` less the months since ``open_date``.
+        """
+        today = today or date.today()
+        balance = _floats([loan.current_balance for loan in loans])
+        annual_rate = _floats([loan.interest_rate for loan in loans])
+        elapsed = _floats([
+            (today.year - loan.open_date.year) * 12 + today.month - loan.open_date.month if loan.open_date else 0
+            for loan in loans
+        ])
+        tenure = _floats([loan.tenure_months for loan in loans])
+        stated_emi = _floats([loan.emi_amount or None for loan in loans])
+        months = remaining_months(balance, annual_rate, stated_emi, np.maximum(tenure - elapsed, 1), tenure)
+        return cls(
+            balance=balance,
+            annual_rate=annual_rate,
+            months=months,
+            emi=np.where(np.isnan(stated_emi), emi(balance, annual_rate, months), stated_emi),
+            foreclosure_penalty=np.nan_to_num(_floats([loan.prepayment_penalty for loan in loans])),
+            loan_type=[loan.loan_type for loan in loans],
+        )
+
+
+@dataclass(frozen=True)
+class OfferTerms:
+    """The terms of O market offers, as arrays of shape (O,).
+
+    Attributes:
+        annual_rate (np.ndarray): The lowest interest rate of the offer, ``roi_start``, in percent.
+        processing_fee (np.ndarray): The processing fee, in percent of the amount.
+        max_months (np.ndarray): The longest tenure, ``tenure_upto`` in months.
+        min_amount (np.ndarray): The smallest amount lent.
+        max_amount (np.ndarray): The largest amount lent.
+        loan_type (Sequence[Optional[str]]): The loan type.
+    """
+    annual_rate: np.ndarray
+    processing_fee: np.ndarray
+    max_months: np.ndarray
+    min_amount: np.ndarray
+    max_amount: np.ndarray
+    loan_type: Sequence[Optional[str]]
+
+    @classmethod
+    def from_offers(cls, offers: Sequence[Any]) -> "OfferTerms":
+        """The terms of ``MarketLoan`` rows, ``CatalogLoan`` copies or objects with the same attributes."""
+        return cls(
+            annual_rate=_floats([offer.roi_start for offer in offers]),
+            processing_fee=np.nan_to_num(_floats([offer.processing_fee for offer in offers])),
+            max_months=_floats([offer.tenure_upto for offer in offers]) * 12,
+            min_amount=np.nan_to_num(_floats([offer.min_loan_amount for offer in offers])),
+            max_amount=np.nan_to_num(_floats([offer.max_loan_amount for offer in offers]), nan=np.inf),
+            loan_type=[offer.loan_type for offer in offers],
+        )
+
+
+@dataclass(frozen=True)
+class RefinanceMatrix:
+    """Refinancing every loan with every offer, as arrays of shape (L, O).
+
+    Attributes:
+        eligible (np.ndarray): Whether the offer lends the loan's type and balance.
+        new_emi (np.ndarray): The EMI of the new loan.
+        new_months (np.ndarray): The tenure of the new loan: the EMIs left, capped at the offer's tenure.
+        monthly_savings (np.ndarray): The current EMI less the new EMI.
+        total_interest (np.ndarray): The interest paid over the new loan.
+        current_interest (np.ndarray): The interest left to pay on the current loan, shape (L, 1).
+        upfront_cost (np.ndarray): The processing fee plus the foreclosure penalty.
+        net_savings (np.ndarray): The payments left on the current loan, less the payments of the new loan and the upfront cost.
+        break_even_month (np.ndarray): The first month whose total savings cover the upfront cost, ``NEVER`` if none.
+    """
+    eligible: np.ndarray
+    new_emi: np.ndarray
+    new_months: np.ndarray
+    monthly_savings: np.ndarray
+    total_interest: np.ndarray
+    current_interest: np.ndarray
+    upfront_cost: np.ndarray
+    net_savings: np.ndarray
+    break_even_month: np.ndarray
+
+    def top(self, k: int) -> np.ndarray:
+        """The offer indexes of each loan's ``k`` largest positive net savings, best first, shape (L, k), -1 past the last."""
+        k = min(k, self.net_savings.shape[1])
+        if k == 0:
+            return np.empty((self.net_savings.shape[0], 0), dtype=np.intp)
+        savings = np.where(self.eligible & (self.net_savings > 0), self.net_savings, -np.inf)
+        # argpartition finds the k best in O(O) per loan, only those k are sorted
+        best = np.argpartition(-savings, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(savings, best, axis=1), axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        return np.where(np.isfinite(np.take_along_axis(savings, best, axis=1)), best, -1)
+
+
+def type_matches(loan_types: Sequence[Optional[str]], offer_types: Sequence[Optional[str]]) -> np.ndarray:
+    """Whether each offer's loan type contains each loan's, case-insensitive, shape (L, O). A loan without a type matches every offer."""
+    offer_types = [(offer_type or "").lower() for offer_type in offer_types]
+    rows = {}
+    for loan_type in set(loan_types):
+        query = (loan_type or "").lower().strip()
+        rows[loan_type] = np.array([query in offer_type for offer_type in offer_types], dtype=bool)
+    if not loan_types:
+        return np.zeros((0, len(offer_types)), dtype=bool)
+    return np.stack([rows[loan_type] for loan_type in loan_types]).reshape(len(loan_types), len(offer_types))
+
+
+def refinance(loans: LoanTerms, offers: OfferTerms) -> RefinanceMatrix:
+    """Refinance every loan with every offer.
+
+    Args:
+    ---
+        loans (LoanTerms) : The L loans.
+        offers (OfferTerms) : The O offers.
+
+    Returns:
+    ---
+        RefinanceMatrix : The new EMI, interest, savings and break-even month of each pair.
+    """
+    balance, months, current_emi = loans.balance[:, None], loans.months[:, None], loans.emi[:, None]
+    current_payments = current_emi * months
+    new_months = np.minimum(months, offers.max_months[None, :])
+    new_emi = emi(balance, offers.annual_rate[None, :], new_months)
+    new_payments = new_emi * new_months
+    upfront_cost = balance * (offers.processing_fee[None, :] + loans.foreclosure_penalty[:, None]) / 100
+    monthly_savings = current_emi - new_emi
+    with np.errstate(divide="ignore", invalid="ignore"):
+        break_even = np.maximum(np.ceil(upfront_cost / monthly_savings), 1)
+    pays_back = (monthly_savings > 0) & (break_even <= new_months)
+    eligible = (
+        type_matches(loans.loan_type, offers.loan_type)
+        & (offers.min_amount[None, :] <= balance) & (balance <= offers.max_amount[None, :])
+        & np.isfinite(new_emi) & np.isfinite(current_emi)
+    )
+    return RefinanceMatrix(
+        eligible=eligible,
+        new_emi=new_emi,
+        new_months=new_months,
+        monthly_savings=monthly_savings,
+        total_interest=new_payments - balance,
+        current_interest=np.maximum(current_payments - balance, 0),
+        upfront_cost=upfront_cost,
+        net_savings=current_payments - new_payments - upfront_cost,
+        break_even_month=np.where(pays_back, np.nan_to_num(break_even), NEVER).astype(np.int64),
+    )
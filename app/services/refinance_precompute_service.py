@@ -0,0 +1,195 @@
+"""Precompute the best refinance options of every active loan into ``loan_refinance_opportunities``.
+
+The loans are streamed by id, a page at a time, and the active ones whose
+opportunity is missing or out of date, about ``REFINANCE_PRECOMPUTE_CHUNK_SIZE``
+per page, are scored against every active market offer in one
+``refinance_engine`` batch. The best ``REFINANCE_PRECOMPUTE_TOP_K`` options per
+loan are upserted and committed page by page.
+A run therefore only scores loans modified since their last scoring, or every
+loan once the market offers changed, and an interrupted run resumes where it
+stopped. The refinance agent and the endpoints read the stored options.
+
+The loans are split into disjoint slices by a hash of their id and each slice
+of each shard is scored by one of ``REFINANCE_PRECOMPUTE_WORKERS`` processes.
+Run it from cron or a scheduler with::
+
+    python -m app.services.refinance_precompute_service --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.datetime_utils import utc_now_naive
+from app.core.logger import logger
+from app.crud.crud_loan_refinance_opportunity import loan_refinance_opportunity as crud_opportunity
+from app.database.session import SessionLocal, shard_router
+from app.database.sharding import pinned_shard
+from app.services.market_loan_catalog import MarketLoanCatalog, market_loan_catalog
+from app.services.refinance_service import refinance_service, scored_since
+
+
+@dataclass
+class PrecomputeResult:
+    """What one run, or one slice of it, did.
+
+    Attributes:
+        scored (int): The loans scored and written.
+        with_savings (int): The scored loans with at least one option that saves money.
+        removed (int): The opportunities deleted because their loan is no longer active.
+        pages (int): The pages with loans to score.
+    """
+    scored: int = 0
+    with_savings: int = 0
+    removed: int = 0
+    pages: int = 0
+
+    def add(self, other: "PrecomputeResult") -> None:
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class RefinancePrecomputeService:
+    def __init__(self):
+        self.crud_opportunity = crud_opportunity
+        self.refinance_service = refinance_service
+
+    def precompute(
+        self,
+        db: Session,
+        catalog: MarketLoanCatalog,
+        shard_ids: Optional[Sequence[int]] = None,
+        partition: int = 0,
+        partitions: int = 1,
+        chunk_size: Optional[int] = None,
+        top_k: Optional[int] = None,
+    ) -> PrecomputeResult:
+        """Score the out of date loans of one slice and store their best options.
+
+        Commits every page, so the work done survives an error in a later one.
+
+        Args:
+        ---
+            db (Session) : The database session.
+            catalog (MarketLoanCatalog) : The market loan snapshot to score against.
+            shard_ids (Optional[Sequence[int]]) : The shards to score, all if None.
+            partition (int) : The slice of the loans to score, see ``in_partition``.
+            partitions (int) : The number of slices.
+            chunk_size (Optional[int]) : The loans of the slice per page, ``REFINANCE_PRECOMPUTE_CHUNK_SIZE`` if None.
+            top_k (Optional[int]) : The options stored per loan, ``REFINANCE_PRECOMPUTE_TOP_K`` if None.
+
+        Returns:
+        ---
+            PrecomputeResult : The loans scored and opportunities removed.
+        """
+        chunk_size = chunk_size or settings.REFINANCE_PRECOMPUTE_CHUNK_SIZE
+        top_k = top_k or settings.REFINANCE_PRECOMPUTE_TOP_K
+        offer_set = self.refinance_service.offer_set(catalog)
+        since = scored_since()
+        result = PrecomputeResult()
+        for shard_id in shard_ids if shard_ids is not None else range(shard_router.shard_count):
+            with pinned_shard(db, shard_id):
+                try:
+                    result.removed += self.crud_opportunity.delete_inactive(db, partition, partitions)
+                    db.commit()
+
+                    after_id = None
+                    while True:
+                        loans, after_id = self.crud_opportunity.get_stale_loans(
+                            db, catalog_digest=offer_set.digest, top_k=top_k, scored_since=since,
+                            after_id=after_id, page_size=chunk_size * partitions, partition=partition, partitions=partitions,
+                        )
+                        if after_id is None:
+                            break
+                        if not loans:
+                            continue
+                        now = utc_now_naive()
+                        rows = [
+                            {
+                                "id": loan.id, "user_id": loan.user_id, "created_at": now, "modified_at": now,
+                                "loan_modified_at": loan.modified_at, "catalog_digest": offer_set.digest, "top_k": top_k,
+                                "best_net_savings": options[0]["net_savings"] if options else None, "options": options,
+                            }
+                            for loan, options in zip(loans, self.refinance_service.score(loans, offer_set, top_k))
+                        ]
+                        self.crud_opportunity.upsert_many(db, rows)
+                        db.commit()
+                        # Loans of earlier pages are not needed anymore
+                        db.expunge_all()
+
+                        result.pages += 1
+                        result.scored += len(rows)
+                        result.with_savings += sum(1 for row in rows if row["options"])
+                except Exception as e:
+                    logger.error(f"Error precomputing refinance options on shard {shard_id}, slice {partition}/{partitions}: {str(e)}")
+                    db.rollback()
+                    raise e
+        return result
+
+    def run(self, workers: Optional[int] = None, chunk_size: Optional[int] = None, top_k: Optional[int] = None) -> PrecomputeResult:
+        """Precompute every shard, split into ``workers`` slices scored in parallel by as many processes.
+
+        Args:
+        ---
+            workers (Optional[int]) : The worker processes, ``REFINANCE_PRECOMPUTE_WORKERS`` if None; 1 scores in this process.
+            chunk_size (Optional[int]) : The loans of a slice per page, ``REFINANCE_PRECOMPUTE_CHUNK_SIZE`` if None.
+            top_k (Optional[int]) : The options stored per loan, ``REFINANCE_PRECOMPUTE_TOP_K`` if None.
+
+        Returns:
+        ---
+            PrecomputeResult : The totals of every slice.
+        """
+        workers = workers or settings.REFINANCE_PRECOMPUTE_WORKERS
+        if workers <= 1:
+            return PrecomputeResult(**_precompute_slice(None, 0, 1, chunk_size, top_k))
+
+        result = PrecomputeResult()
+        # spawn, not fork: a forked worker would share the parent's pooled connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_precompute_slice, [shard_id], partition, workers, chunk_size, top_k)
+                for shard_id in range(shard_router.shard_count)
+                for partition in range(workers)
+            ]
+            for future in as_completed(futures):
+                result.add(PrecomputeResult(**future.result()))
+        logger.info(f"Precomputed refinance options: {result.to_dict()}")
+        return result
+
+
+def _precompute_slice(shard_ids: Optional[Sequence[int]], partition: int, partitions: int, chunk_size: Optional[int], top_k: Optional[int]) -> Dict[str, Any]:
+    """Score one slice in a worker process, with its own session and catalog snapshot."""
+    db = SessionLocal()
+    try:
+        catalog = market_loan_catalog.get()
+        return refinance_precompute_service.precompute(
+            db, catalog, shard_ids=shard_ids, partition=partition, partitions=partitions, chunk_size=chunk_size, top_k=top_k,
+        ).to_dict()
+    finally:
+        db.close()
+
+
+refinance_precompute_service = RefinancePrecomputeService()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, help="worker processes, REFINANCE_PRECOMPUTE_WORKERS if not given")
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--top-k", type=int)
+    args = parser.parse_args()
+
+    result = refinance_precompute_service.run(workers=args.workers, chunk_size=args.chunk_size, top_k=args.top_k)
+    print(json.dumps(result.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Sequence
+from app.crud.crud_loan import loan as crud_loan
+from app.crud.crud_loan_refinance_opportunity import loan_refinance_opportunity as crud_opportunity
+from app.core.datetime_utils import utc_now_naive
+from app.services.market_loan_catalog import CatalogLoan, MarketLoanCatalog
+from app.services.refinance_engine import LoanTerms, OfferTerms, RefinanceMatrix, refinance
+from sqlalchemy.orm import Session
+from app.core.logger import logger
+from app.database.async_adapter import AsyncSessionAdapter
+import hashlib
+import json
+import math
+import uuid
+
+# The offer attributes that change a loan's options, see OfferSet.digest
+SCORED_OFFER_FIELDS = ("id", "lender_name", "loan_type", "roi_start", "processing_fee", "prepayment_penalty", "tenure_upto", "min_loan_amount", "max_loan_amount")
+
+
+def _money(value: float) -> Optional[float]:
+    """Rounded to paise, None for the NaN of a loan with missing terms."""
+    return round(float(value), 2) if math.isfinite(value) else None
+
+
+def scored_since() -> datetime:
+    """The start of the current month: the remaining EMIs of a loan without a stated EMI count down every month."""
+    return utc_now_naive().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+@dataclass(frozen=True)
+class OfferSet:
+    """The active offers of one catalog snapshot, as rows and as arrays.
+
+    Attributes:
+        version (int): The catalog version the offers were taken from.
+        offers (List[CatalogLoan]): The offers, in the column order of the arrays.
+        terms (OfferTerms): The offers as arrays.
+        digest (str): A hash of the scored attributes of every offer, equal across processes and shards for the same offers.
+    """
+    version: int
+    offers: List[CatalogLoan]
+    terms: OfferTerms
+    digest: str
+
+    @classmethod
+    def from_catalog(cls, catalog: MarketLoanCatalog) -> "OfferSet":
+        offers = [offer for offer in catalog.loans if offer.status is not False]
+        scored = sorted(
+            [str(offer.id) if name == "id" else getattr(offer, name) for name in SCORED_OFFER_FIELDS]
+            for offer in offers
+        )
+        digest = hashlib.sha256(json.dumps(scored, separators=(",", ":")).encode()).hexdigest()
+        return cls(version=catalog.version, offers=offers, terms=OfferTerms.from_offers(offers), digest=digest)
+
+
+class RefinanceService:
+    def __init__(self):
+        self.crud_loan = crud_loan
+        self.crud_opportunity = crud_opportunity
+        # The offers of the last catalog snapshot, rebuilt when its version changes
+        self._offer_set: Optional[OfferSet] = None
+
+    def offer_set(self, catalog: MarketLoanCatalog) -> OfferSet:
+        """The active offers of a catalog snapshot, as rows and as arrays."""
+        offer_set = self._offer_set
+        if offer_set is None or offer_set.version != catalog.version:
+            offer_set = self._offer_set = OfferSet.from_catalog(catalog)
+        return offer_set
+
+    def get_refinance_options(self, db: Session, user_id: uuid.UUID, catalog: MarketLoanCatalog, loan_id: Optional[uuid.UUID] = None, top_k: int = 3) -> Dict[str, Any]:
+        """Get the market offers that save a user the most on each active loan.
+
+        Options precomputed by ``app.services.refinance_precompute_service`` are
+        used while they are current, the other loans are scored here.
+
+        Args:
+        ---
+            db (Session) : The database session the loans are read with.
+            user_id (uuid.UUID) : The user.
+            catalog (MarketLoanCatalog) : The market loan snapshot, from ``market_loan_catalog``.
+            loan_id (Optional[uuid.UUID]) : Only this loan, all active loans of the user if None.
+            top_k (int) : The maximum number of offers per loan.
+
+        Returns:
+        ---
+            Dict[str, Any] : Each loan with its remaining EMIs and interest, and its best offers by net savings.
+        """
+        try:
+            loans = self.crud_loan.get_active_loans_by_user(db, user_id)
+            if loan_id is not None:
+                loans = [loan for loan in loans if loan.id == loan_id]
+            offer_set = self.offer_set(catalog)
+
+            options = self._precomputed_options(db, loans, offer_set, top_k)
+            unscored = [loan for loan in loans if loan.id not in options]
+            if unscored:
+                options.update(zip([loan.id for loan in unscored], self.score(unscored, offer_set, top_k)))
+
+            terms = LoanTerms.from_loans(loans)
+            return {
+                "user_id": str(user_id),
+                "catalog_version": catalog.version,
+                "loans": [
+                    {**self.loan_summary(loan, i, terms), "options": options[loan.id]}
+                    for i, loan in enumerate(loans)
+                ],
+            }
+        except Exception as e:
+            logger.error(f"Error getting refinance options for user {user_id}: {str(e)}")
+            raise e
+
+    def _precomputed_options(self, db: Session, loans: Sequence[Any], offer_set: OfferSet, top_k: int) -> Dict[uuid.UUID, List[Dict[str, Any]]]:
+        """The precomputed options of the loans whose opportunity is current."""
+        modified_at = {loan.id: loan.modified_at for loan in loans}
+        since = scored_since()
+        return {
+            row.id: row.options[:top_k]
+            for row in self.crud_opportunity.get_by_loan_ids(db, list(modified_at))
+            if row.loan_modified_at == modified_at[row.id] and row.catalog_digest == offer_set.digest
+            and row.top_k >= top_k and row.modified_at >= since
+        }
+
+    def score(self, loans: Sequence[Any], offer_set: OfferSet, top_k: int) -> List[List[Dict[str, Any]]]:
+        """Score loans against every offer, in one batch.
+
+        Returns:
+        ---
+            List[List[Dict[str, Any]]] : The best options of each loan by net savings, at most ``top_k``.
+        """
+        terms = LoanTerms.from_loans(loans)
+        matrix = refinance(terms, offer_set.terms)
+        best = matrix.top(top_k)
+        return [self.offer_options(i, terms, matrix, offer_set.offers, best[i]) for i in range(len(loans))]
+
+    def loan_summary(self, loan: Any, i: int, terms: LoanTerms) -> Dict[str, Any]:
+        """The current EMI and what is left to pay on loan ``i`` of ``terms``."""
+        remaining_months = terms.months[i]
+        return {
+            "loan_id": str(loan.id),
+            "lender": loan.lender,
+            "loan_type": loan.loan_type,
+            "current_balance": loan.current_balance,
+            "interest_rate": loan.interest_rate,
+            "current_emi": _money(terms.emi[i]),
+            "remaining_months": int(remaining_months) if math.isfinite(remaining_months) else None,
+            "remaining_interest": _money(max(terms.emi[i] * remaining_months - terms.balance[i], 0)),
+        }
+
+    def offer_options(self, i: int, terms: LoanTerms, matrix: RefinanceMatrix, offers: Sequence[CatalogLoan], columns: Sequence[int]) -> List[Dict[str, Any]]:
+        """The offers in ``columns`` for row ``i`` of the matrix, -1 columns skipped."""
+        return [
+            {
+                "market_loan_id": str(offers[j].id),
+                "lender_name": offers[j].lender_name,
+                "loan_type": offers[j].loan_type,
+                "interest_rate": offers[j].roi_start,
+                "tenure_months": int(matrix.new_months[i, j]),
+                "new_emi": _money(matrix.new_emi[i, j]),
+                "monthly_savings": _money(matrix.monthly_savings[i, j]),
+                "total_interest": _money(matrix.total_interest[i, j]),
+                "processing_fee": _money(terms.balance[i] * (offers[j].processing_fee or 0) / 100),
+                "foreclosure_penalty": _money(terms.balance[i] * terms.foreclosure_penalty[i] / 100),
+                "net_savings": _money(matrix.net_savings[i, j]),
+                "break_even_month": int(matrix.break_even_month[i, j]),
+                "prepayment_penalty": offers[j].prepayment_penalty,
+            }
+            for j in columns if j >= 0
+        ]
+
+
+refinance_service = RefinanceService()
+async_refinance_service = AsyncSessionAdapter(refinance_service)
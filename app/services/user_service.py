@@ -1,12 +1,20 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from app.crud.crud_user import user as crud_user
 from app.crud.crud_bank_account import bank_account as crud_bank_account
 from app.crud.crud_loan import loan as crud_loan
 from app.crud.crud_investment import investment as crud_investment
+from app.crud.crud_sync import sync as crud_sync
+from app.database.models import User, BankAccount, Loan, Investment
+from app.core.exception import NotFoundException
 from app.schemas.user_details import UserInfo
 from app.core.logger import logger
 from app.schemas.response import BaseResponse
+import time
+import uuid
+from app.database.async_adapter import AsyncSessionAdapter
+from app.database.session import recent_writes, shard_router
+from app.database.sharding import pinned_shard
 
 
 class UserService:
@@ -15,9 +23,14 @@ class UserService:
         self.crud_bank_account = crud_bank_account
         self.crud_loan = crud_loan
         self.crud_investment = crud_investment
+        self.crud_sync = crud_sync
     
-    async def store_user_info_from_fi_mcp(self, db: Session, user_info: UserInfo) -> Dict[str, Any]:
+    def store_user_info_from_fi_mcp(self, db: Session, user_info: UserInfo) -> Dict[str, Any]:
         """Store user info from FiMCP response.
+
+        The user and all of their bank accounts, loans and investments are written
+        in a single transaction, so a failure leaves no partial data behind. A user
+        that already exists is resynced instead.
         
         Args:
             db (Session) : The database session.
@@ -30,9 +43,11 @@ class UserService:
             Exception : If an error occurs while creating the user.
         """
         try:
+            if isinstance(user_info, dict):
+                user_info = UserInfo(**user_info)
+
             # Validate user data
-            user_data = user_info.user if hasattr(user_info, 'user') else user_info.get('user', {})
-            if not user_data:
+            if not user_info.user:
                 logger.error("No user data found in UserInfo")
                 return {
                     "success": False,
@@ -40,105 +55,28 @@ class UserService:
                     "error": "User data is missing"
                 }
             
-            # Convert user data to dict if it's a Pydantic model
-            if hasattr(user_data, 'model_dump'):
-                user_data = user_data.model_dump()
-            elif hasattr(user_data, 'dict'):
-                user_data = user_data.dict()
-            
-            logger.info(f"Processing user data: {user_data}")
+            logger.info(f"Processing user data: {user_info.user}")
             
-            # Check if user already exists
-            existing_user = self.crud_user.get_by_email(db, user_data['email'])
+            # Existing users are refreshed with only the rows that changed
+            existing_user = self.crud_user.get_by_email(db, user_info.user.email)
             if existing_user:
-                logger.info(f"User with email {user_data['email']} already exists")
+                logger.info(f"User with email {user_info.user.email} already exists, resyncing...")
+                result = self.resync_user_info_from_fi_mcp(db, user_info, user=existing_user)
+                return BaseResponse(
+                    status="success",
+                    message="User info resynced successfully",
+                    data=result
+                )
+
+            result = self.bulk_store_user_info_from_fi_mcp(db, [user_info])
+            if not result["users_created"]:
                 return BaseResponse(
                     status="error",
                     message="User already exists",
                     data=user_info
                 )
-
-            # Create user
-            try:
-                user = self.crud_user.create(db, obj_in=user_data)
-                logger.info(f"Created user with ID: {user.id}")
-            except Exception as e:
-                logger.error(f"Error creating user: {str(e)}")
-                raise e
-            
-            # Store bank accounts
-            bank_accounts_created = []
-            bank_accounts = user_info.bank_accounts if hasattr(user_info, 'bank_accounts') else user_info.get('bank_accounts', [])
-            if bank_accounts:
-                logger.info(f"Processing {len(bank_accounts)} bank accounts")
-                for i, bank_data in enumerate(bank_accounts):
-                    try:
-                        # Convert to dict if it's a Pydantic model
-                        if hasattr(bank_data, 'model_dump'):
-                            bank_data = bank_data.model_dump()
-                        elif hasattr(bank_data, 'dict'):
-                            bank_data = bank_data.dict()
-                        
-                        bank_data["user_id"] = user.id
-                        logger.info(f"Creating bank account {i+1}: {bank_data}")
-                        bank_account = self.crud_bank_account.create(db, obj_in=bank_data)
-                        bank_accounts_created.append(bank_account)
-                        logger.info(f"Created bank account: {bank_account.id} for bank: {bank_data.get('bank_name', 'Unknown')}")
-                    except Exception as e:
-                        logger.error(f"Error creating bank account {i+1}: {str(e)}")
-                        raise e
-            else:
-                logger.info("No bank accounts found in response")
             
-            # Store loans
-            loans_created = []
-            loans = user_info.loans if hasattr(user_info, 'loans') else user_info.get('loans', [])
-            if loans:
-                logger.info(f"Processing {len(loans)} loans")
-                for i, loan_data in enumerate(loans):
-                    try:
-                        # Convert to dict if it's a Pydantic model
-                        if hasattr(loan_data, 'model_dump'):
-                            loan_data = loan_data.model_dump()
-                        elif hasattr(loan_data, 'dict'):
-                            loan_data = loan_data.dict()
-                        
-                        loan_data["user_id"] = user.id
-                        logger.info(f"Creating loan {i+1}: {loan_data}")
-                        loan = self.crud_loan.create(db, obj_in=loan_data)
-                        loans_created.append(loan)
-                        logger.info(f"Created loan: {loan.id} for lender: {loan_data.get('lender', 'Unknown')}")
-                    except Exception as e:
-                        logger.error(f"Error creating loan {i+1}: {str(e)}")
-                        raise e
-            else:
-                logger.info("No loans found in response")
-            
-            # Store investments
-            investments_created = []
-            investments = user_info.investments if hasattr(user_info, 'investments') else user_info.get('investments', [])
-            if investments:
-                logger.info(f"Processing {len(investments)} investments")
-                for i, investment_data in enumerate(investments):
-                    try:
-                        # Convert to dict if it's a Pydantic model
-                        if hasattr(investment_data, 'model_dump'):
-                            investment_data = investment_data.model_dump()
-                        elif hasattr(investment_data, 'dict'):
-                            investment_data = investment_data.dict()
-                        
-                        investment_data["user_id"] = user.id
-                        logger.info(f"Creating investment {i+1}: {investment_data}")
-                        investment = self.crud_investment.create(db, obj_in=investment_data)
-                        investments_created.append(investment)
-                        logger.info(f"Created investment: {investment.id} for institution: {investment_data.get('institution', 'Unknown')}")
-                    except Exception as e:
-                        logger.error(f"Error creating investment {i+1}: {str(e)}")
-                        raise e
-            else:
-                logger.info("No investments found in response")
-            
-            logger.info(f"Successfully stored user info from FiMCP for user {user.id} with {len(bank_accounts_created)} bank accounts, {len(loans_created)} loans, and {len(investments_created)} investments")
+            logger.info(f"Successfully stored user info from FiMCP for user {user_info.user.email} with {result['bank_accounts_created']} bank accounts, {result['loans_created']} loans, and {result['investments_created']} investments")
             
             return BaseResponse(
                 status="success",
@@ -150,15 +88,172 @@ class UserService:
             logger.error(f"Error storing user info from FiMCP: {str(e)}")
             db.rollback()
             raise e
+
+    def bulk_store_user_info_from_fi_mcp(self, db: Session, user_infos: List[UserInfo], batch_size: int = 500) -> Dict[str, Any]:
+        """Store many FiMCP user snapshots using multi-row INSERT ... RETURNING.
+
+        Each batch writes its users and all of their bank accounts, loans and
+        investments in one transaction: one statement per table instead of one
+        INSERT, COMMIT and SELECT per row. Users whose email or phone number
+        already exists are skipped together with their related rows. When the
+        database is sharded each shard gets its own statements and the batch
+        commits on every shard it touched.
+
+        A phone number always maps to the same shard, so its unique index
+        catches duplicates, but an email is only unique per shard: emails taken
+        on any shard, or by an earlier snapshot of the batch, are looked up on
+        every shard and skipped first. Two imports running at once can still
+        store the same email on two shards.
+
+        Args:
+            db (Session) : The database session.
+            user_infos (List[UserInfo]) : The user snapshots from FiMCP.
+            batch_size (int) : The number of users written per transaction.
+
+        Returns:
+            Dict[str, Any] : The created row counts, elapsed time and users per second.
+        """
+        start = time.perf_counter()
+        result = {
+            "users_created": 0,
+            "users_skipped": 0,
+            "bank_accounts_created": 0,
+            "loans_created": 0,
+            "investments_created": 0,
+        }
+        for i in range(0, len(user_infos), batch_size):
+            batch = user_infos[i:i + batch_size]
+            try:
+                batch_result: Dict[str, int] = {}
+                user_ids: List[uuid.UUID] = []
+                if shard_router.shard_count > 1:
+                    unique_batch = self._without_taken_emails(db, batch)
+                    batch_result["users_skipped"] = len(batch) - len(unique_batch)
+                    batch = unique_batch
+                # One INSERT per table and shard, every user's rows go to the shard of their phone number
+                for shard_id, shard_batch in shard_router.group_by_phone(batch, _phone_number).items():
+                    with pinned_shard(db, shard_id):
+                        counts, shard_user_ids = self._bulk_store_batch(db, shard_batch)
+                    for key, value in counts.items():
+                        batch_result[key] = batch_result.get(key, 0) + value
+                    user_ids.extend(shard_user_ids)
+                db.commit()
+                # The chat and its tools read these users by phone or id next, before replicas may have caught up
+                recent_writes.add(*(user_info.user.phone_number for user_info in batch if user_info.user), *user_ids)
+            except Exception as e:
+                logger.error(f"Error bulk storing user info batch {i // batch_size + 1}: {str(e)}")
+                db.rollback()
+                raise e
+            for key, value in batch_result.items():
+                result[key] += value
+
+        elapsed = time.perf_counter() - start
+        result["elapsed_seconds"] = round(elapsed, 4)
+        result["users_per_second"] = round(result["users_created"] / elapsed, 2) if elapsed > 0 else 0.0
+        logger.info(f"Bulk stored {result['users_created']} users ({result['users_skipped']} skipped) in {result['elapsed_seconds']}s, {result['users_per_second']} users/s")
+        return result
+
+    def resync_user_info_from_fi_mcp(self, db: Session, user_info: UserInfo, user: Optional[User] = None) -> Dict[str, Any]:
+        """Refresh an existing user from a newer FiMCP snapshot.
+
+        Rows are matched on their natural keys (``BankAccount.account_number``,
+        ``Loan.loan_id``, ``Investment.investment_id``) and only new rows, changed
+        columns and removed rows are written, all in one transaction.
+
+        Args:
+            db (Session) : The database session.
+            user_info (UserInfo) : The latest user info from FiMCP.
+            user (Optional[User]) : The stored user, looked up by email if not given.
+
+        Returns:
+            Dict[str, Any] : The inserted, updated, deleted and unchanged counts per table.
+        """
+        try:
+            if user is None:
+                user = self.crud_user.get_by_email(db, user_info.user.email)
+            if user is None:
+                raise NotFoundException(f"User with email {user_info.user.email} not found")
+
+            user_changes = {
+                field: value
+                for field, value in _row(user_info.user).items()
+                if hasattr(User, field) and getattr(user, field) != value
+            }
+            for field, value in user_changes.items():
+                setattr(user, field, value)
+
+            result = {
+                "user_id": str(user.id),
+                "user_fields_updated": sorted(user_changes),
+                "bank_accounts": self.crud_sync.sync_user_rows(
+                    db, BankAccount, user_id=user.id, key="account_number",
+                    incoming_rows=[_row(bank_account) for bank_account in user_info.bank_accounts],
+                ).counts(),
+                "loans": self.crud_sync.sync_user_rows(
+                    db, Loan, user_id=user.id, key="loan_id",
+                    incoming_rows=[_row(loan) for loan in user_info.loans],
+                ).counts(),
+                "investments": self.crud_sync.sync_user_rows(
+                    db, Investment, user_id=user.id, key="investment_id",
+                    incoming_rows=[_row(investment) for investment in user_info.investments],
+                ).counts(),
+            }
+            db.commit()
+            recent_writes.add(user.phone_number, user.id)
+            logger.info(f"Resynced user {user.id}: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Error resyncing user info from FiMCP: {str(e)}")
+            db.rollback()
+            raise e
+
+    def _without_taken_emails(self, db: Session, user_infos: List[UserInfo]) -> List[UserInfo]:
+        """The snapshots whose email no user on any shard, nor an earlier snapshot, has."""
+        taken = self.crud_user.get_existing_emails(db, [user_info.user.email for user_info in user_infos if user_info.user])
+        kept = []
+        for user_info in user_infos:
+            if user_info.user:
+                if user_info.user.email in taken:
+                    continue
+                taken.add(user_info.user.email)
+            kept.append(user_info)
+        return kept
+
+    def _bulk_store_batch(self, db: Session, user_infos: List[UserInfo]) -> Tuple[Dict[str, int], List[uuid.UUID]]:
+        """Write one batch of user snapshots without committing, returning the row counts and the created users' ids."""
+        # Keep the first snapshot per email, ON CONFLICT would skip the others anyway
+        snapshots: Dict[str, UserInfo] = {}
+        for user_info in user_infos:
+            if user_info.user and user_info.user.email not in snapshots:
+                snapshots[user_info.user.email] = user_info
+
+        user_rows = [_row(user_info.user) for user_info in snapshots.values()]
+        created_users = self.crud_user.create_many(db, objs_in=user_rows)
+
+        bank_account_rows, loan_rows, investment_rows = [], [], []
+        for user_id, email in created_users:
+            user_info = snapshots[email]
+            bank_account_rows.extend(_row(bank_account, user_id=user_id) for bank_account in user_info.bank_accounts)
+            loan_rows.extend(_row(loan, user_id=user_id) for loan in user_info.loans)
+            investment_rows.extend(_row(investment, user_id=user_id) for investment in user_info.investments)
+
+        self.crud_bank_account.create_many(db, objs_in=bank_account_rows)
+        self.crud_loan.create_many(db, objs_in=loan_rows)
+        self.crud_investment.create_many(db, objs_in=investment_rows)
+
+        return {
+            "users_created": len(created_users),
+            "users_skipped": len(user_infos) - len(created_users),
+            "bank_accounts_created": len(bank_account_rows),
+            "loans_created": len(loan_rows),
+            "investments_created": len(investment_rows),
+        }, [user_id for user_id, _ in created_users]
         
     def get_user_details_by_phone(self, db: Session, phone_number: str) -> Optional[Dict[str, Any]]:
         """Get user details by phone number."""
         try:
             logger.info(f"Getting user details by phone number: {phone_number}")
-            user = self.crud_user.get_by_phone(db, phone_number)
-            if not user:
-                return None
-            return self.get_user(db, user.id)
+            return self.crud_user.get_aggregate_by_phone(db, phone_number)
         
         except Exception as e:
             logger.error(f"Error getting user details by phone number {phone_number}: {str(e)}")
@@ -167,24 +262,15 @@ class UserService:
     def get_all_users(self, db: Session) -> List[Dict[str, Any]]:
         """Get all users."""
         try:
-            users = self.crud_user.get_multi(db, skip=0, limit=100, filters=None)
-            return [user.to_dict() for user in users]
+            page = self.crud_user.get_multi(db, limit=100, filters=None)
+            return [user.to_dict() for user in page.items]
         except Exception as e:
             logger.error(f"Error getting all users: {str(e)}")
     
     def get_user(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user with all related data."""
         try:
-            user = self.crud_user.get_user_with_relationships(db, user_id)
-            if not user:
-                return None
-            
-            return {
-                "user": user.to_dict(),
-                "bank_accounts": [bank_account.to_dict() for bank_account in user.bank_accounts],
-                "loans": [loan.to_dict() for loan in user.loans],
-                "investments": [investment.to_dict() for investment in user.investments]
-            }
+            return self.crud_user.get_aggregate(db, user_id)
         except Exception as e:
             logger.error(f"Error getting user {user_id}: {str(e)}")
             raise e
@@ -201,11 +287,14 @@ class UserService:
             logger.error(f"Error getting user by email {email}: {str(e)}")
             raise e
     
-    def get_users(self, db: Session, skip: int = 0, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Get multiple users with optional filtering."""
+    def get_users(self, db: Session, cursor: Optional[str] = None, limit: int = 100, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get a page of users with optional filtering."""
         try:
-            users = self.crud_user.get_multi(db, skip=skip, limit=limit, filters=filters)
-            return [{"user": user} for user in users]
+            page = self.crud_user.get_multi(db, cursor=cursor, limit=limit, filters=filters)
+            return {
+                "users": [{"user": user} for user in page.items],
+                "next_cursor": page.next_cursor
+            }
         except Exception as e:
             logger.error(f"Error getting users: {str(e)}")
             raise e
@@ -218,57 +307,77 @@ class UserService:
                 return None
             
             updated_user = self.crud_user.update(db, db_obj=user, obj_in=update_data)
+            db.commit()
             return {"user": updated_user}
         except Exception as e:
             logger.error(f"Error updating user {user_id}: {str(e)}")
+            db.rollback()
             raise e
     
     def delete_user(self, db: Session, user_id: int) -> bool:
         """Delete user and all related data."""
         try:
-            user = self.crud_user.get(db, user_id)
-            if not user:
+            if not self.crud_user.delete(db, user_id=user_id):
                 return False
-            
-            self.crud_user.delete(db, user_id=user_id)
+            db.commit()
             logger.info(f"Deleted user {user_id} and all related data")
             return True
         except Exception as e:
             logger.error(f"Error deleting user {user_id}: {str(e)}")
+            db.rollback()
             raise e
     
+    def purge_users(self, db: Session, user_ids: List[uuid.UUID], batch_size: int = 500) -> Dict[str, Any]:
+        """Erase many users and all of their related data, e.g. for data deletion requests.
+
+        Each batch is one DELETE committed on its own, with the related rows
+        removed by the database cascade, so a failure keeps the batches already
+        purged and no batch holds its locks for long.
+
+        Args:
+            db (Session) : The database session.
+            user_ids (List[uuid.UUID]) : The IDs of the users to erase.
+            batch_size (int) : The number of users deleted per transaction.
+
+        Returns:
+            Dict[str, Any] : The number of users deleted and the IDs that were not found.
+        """
+        deleted = set()
+        for i in range(0, len(user_ids), batch_size):
+            batch = user_ids[i:i + batch_size]
+            try:
+                deleted.update(self.crud_user.delete_many(db, user_ids=batch))
+                db.commit()
+            except Exception as e:
+                logger.error(f"Error purging users batch {i // batch_size + 1}: {str(e)}")
+                db.rollback()
+                raise e
+
+        not_found = [str(user_id) for user_id in dict.fromkeys(user_ids) if user_id not in deleted]
+        logger.info(f"Purged {len(deleted)} users, {len(not_found)} not found")
+        return {"deleted": len(deleted), "not_found": not_found}
+    
     def get_user_financial_summary(self, db: Session, user_id: int) -> Optional[Dict[str, Any]]:
         """Get comprehensive financial summary for a user."""
         try:
-            user = self.crud_user.get(db, user_id)
-            if not user:
+            row = self.crud_user.get_financial_summary(db, user_id)
+            if not row:
                 return None
-            
-            # Get all related data
-            bank_accounts = self.crud_bank_account.get_by_user_id(db, user_id)
-            loans = self.crud_loan.get_by_user_id(db, user_id)
-            investments = self.crud_investment.get_by_user_id(db, user_id)
-            
-            # Calculate totals
-            total_bank_balance = sum(account.balance or 0 for account in bank_accounts)
-            total_loan_liability = sum(loan.current_balance or 0 for loan in loans)
-            total_investment_value = sum(investment.current_value or 0 for investment in investments)
-            
-            # Calculate net worth
-            total_assets = total_bank_balance + total_investment_value
-            net_worth = total_assets - total_loan_liability
+            user, summary = row
             
             return {
                 "user_id": user_id,
                 "user_name": user.full_name,
-                "total_bank_balance": total_bank_balance,
-                "total_loan_liability": total_loan_liability,
-                "total_investment_value": total_investment_value,
-                "total_assets": total_assets,
-                "net_worth": net_worth,
-                "bank_accounts_count": len(bank_accounts),
-                "loans_count": len(loans),
-                "investments_count": len(investments),
+                "total_bank_balance": summary.total_bank_balance if summary else 0,
+                "total_loan_liability": summary.total_loan_liability if summary else 0,
+                "total_investment_value": summary.total_investment_value if summary else 0,
+                "total_emi": summary.total_emi if summary else 0,
+                "total_assets": summary.total_assets if summary else 0,
+                "net_worth": summary.net_worth if summary else 0,
+                "weighted_average_interest_rate": round(summary.weighted_average_interest_rate, 2) if summary else 0,
+                "bank_accounts_count": summary.bank_accounts_count if summary else 0,
+                "loans_count": summary.loans_count if summary else 0,
+                "investments_count": summary.investments_count if summary else 0,
                 "cibil_score": user.cibil_score
             }
         except Exception as e:
@@ -281,11 +390,26 @@ class UserService:
             updated_user = self.crud_user.update_financial_summary(db, user_id)
             if not updated_user:
                 return None
+            db.commit()
             
             return {"user": updated_user}
         except Exception as e:
             logger.error(f"Error updating financial summary for user {user_id}: {str(e)}")
+            db.rollback()
             raise e
 
 
+def _phone_number(user_info: UserInfo) -> str:
+    """The shard key of a FiMCP snapshot."""
+    return user_info.user.phone_number if user_info.user else ""
+
+
+def _row(obj: Any, **extra: Any) -> Dict[str, Any]:
+    """Convert a FiMCP schema object to an insertable row, dropping the empty schema id so the model default assigns one."""
+    row = obj.model_dump(exclude={"id"})
+    row.update(extra)
+    return row
+
+
 user_service = UserService()
+async_user_service = AsyncSessionAdapter(user_service)
@@ -0,0 +1,111 @@
+"""Benchmark Fi MCP user snapshot ingestion: row-by-row vs bulk INSERT ... RETURNING.
+
+Runs against the database configured in settings and removes the users it
+creates. Usage:
+
+    python -m benchmarks.bench_bulk_ingest --users 1000 --children 10
+"""
+import argparse
+import time
+import uuid
+from typing import List
+
+from app.crud.crud_bank_account import bank_account as crud_bank_account
+from app.crud.crud_investment import investment as crud_investment
+from app.crud.crud_loan import loan as crud_loan
+from app.crud.crud_user import user as crud_user
+from app.database.models.user import User
+from app.database.session import SessionLocal, create_tables
+from app.schemas.user_details import UserInfo
+from app.services.user_service import user_service
+
+EMAIL_DOMAIN = "bench.emisaver.local"
+
+
+def make_user_infos(count: int, children: int) -> List[UserInfo]:
+    """Build synthetic snapshots with ``children`` rows spread across the three collections."""
+    run = uuid.uuid4().hex[:8]
+    user_infos = []
+    for i in range(count):
+        key = f"{run}{i}"
+        user_infos.append(UserInfo(
+            user={"full_name": f"Bench User {i}", "email": f"{key}@{EMAIL_DOMAIN}", "phone_number": f"+91{key}"},
+            bank_accounts=[
+                {"bank_name": "ICICI Bank", "account_number": f"BA{key}{j}", "account_type": "savings", "balance": 1000.0 * j}
+                for j in range(children // 3)
+            ],
+            loans=[
+                {"loan_id": f"LN{key}{j}", "lender": "HDFC Bank", "loan_type": "personal", "current_balance": 50000.0,
+                 "interest_rate": 12.5, "tenure_months": 36, "emi_amount": 1700.0, "status": "active"}
+                for j in range(children - 2 * (children // 3))
+            ],
+            investments=[
+                {"investment_id": f"IN{key}{j}", "investment_type": "etf", "institution": "CDSL", "current_value": 2500.0}
+                for j in range(children // 3)
+            ],
+        ))
+    return user_infos
+
+
+def store_row_by_row(user_infos: List[UserInfo]) -> None:
+    """The previous ingestion path: one INSERT and COMMIT per row."""
+    db = SessionLocal()
+    try:
+        for user_info in user_infos:
+            user = crud_user.create(db, obj_in=user_info.user.model_dump(exclude={"id"}))
+            db.commit()
+            for bank_account in user_info.bank_accounts:
+                crud_bank_account.create(db, obj_in={**bank_account.model_dump(exclude={"id"}), "user_id": user.id})
+                db.commit()
+            for loan in user_info.loans:
+                crud_loan.create(db, obj_in={**loan.model_dump(exclude={"id"}), "user_id": user.id})
+                db.commit()
+            for investment in user_info.investments:
+                crud_investment.create(db, obj_in={**investment.model_dump(exclude={"id"}), "user_id": user.id})
+                db.commit()
+    finally:
+        db.close()
+
+
+def store_bulk(user_infos: List[UserInfo], batch_size: int) -> None:
+    db = SessionLocal()
+    try:
+        user_service.bulk_store_user_info_from_fi_mcp(db, user_infos, batch_size=batch_size)
+    finally:
+        db.close()
+
+
+def cleanup() -> None:
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email.like(f"%@{EMAIL_DOMAIN}")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--children", type=int, default=10, help="bank accounts + loans + investments per user")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    create_tables()
+    cleanup()
+    try:
+        for name, run in (
+            ("row-by-row", lambda infos: store_row_by_row(infos)),
+            ("bulk", lambda infos: store_bulk(infos, args.batch_size)),
+        ):
+            user_infos = make_user_infos(args.users, args.children)
+            start = time.perf_counter()
+            run(user_infos)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>11}: {args.users} users x {args.children} rows in {elapsed:.2f}s -> {args.users / elapsed:,.1f} users/s")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
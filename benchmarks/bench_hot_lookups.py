@@ -0,0 +1,151 @@
+"""Benchmark the per-chat-turn lookups: rebuilt Query objects vs lambda statements and prepared statements.
+
+Runs get_by_phone, CRUDLoan.get_by_user_id, the market loan search and
+get_by_to_loan_id through the async engine, as the ADK tools do, once per
+variant:
+
+* query:    the previous ``db.query(...)`` code, asyncpg prepared statement cache disabled
+* prepared: the same Query code with the prepared statement cache
+* lambda:   the current CRUD lambda statements with the prepared statement cache
+
+and prints per-statement driver time from StatementStats plus the end-to-end
+latency per lookup. Removes the users and market loans it creates. Usage:
+
+    python -m benchmarks.bench_hot_lookups --users 200 --iterations 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.crud.crud_loan import loan as crud_loan
+from app.crud.crud_loan_request import loan_request as crud_loan_request
+from app.crud.crud_market_loan import market_loan as crud_market_loan
+from app.crud.crud_user import user as crud_user
+from app.database.models import Loan, LoanRequest, MarketLoan, User
+from app.database.pool import pool_kwargs
+from app.database.session import SessionLocal, create_tables
+from app.database.statement_stats import StatementStats
+from benchmarks.bench_bulk_ingest import cleanup, make_user_infos, store_bulk
+
+BENCH_LENDER = "Bench Lender"
+
+
+def query_lookups() -> Dict[str, Callable[..., Any]]:
+    """The previous implementations, rebuilding a Query on every call."""
+    def search(db: Any, loan_type: str, amount: float, interest_rate: float, tenure: int) -> List[MarketLoan]:
+        return db.query(MarketLoan).filter(
+            func.lower(MarketLoan.loan_type).ilike(f"%{loan_type.lower()}%"), MarketLoan.min_loan_amount <= amount,
+            MarketLoan.max_loan_amount >= amount, MarketLoan.roi_start <= interest_rate, MarketLoan.roi_end >= interest_rate,
+            MarketLoan.tenure_upto >= tenure,
+        ).order_by(MarketLoan.roi_start.asc()).limit(5).all()
+
+    return {
+        "get_by_phone": lambda db, phone_number: db.query(User).filter(
+            User.phone_number == phone_number, User.is_active == True, User.is_superuser == False
+        ).first(),
+        "loans_by_user": lambda db, user_id: db.query(Loan).filter(Loan.user_id == user_id).all(),
+        "market_search": search,
+        "get_by_to_loan_id": lambda db, to_loan_id: db.query(LoanRequest).filter(LoanRequest.to_loan_id == to_loan_id).first(),
+    }
+
+
+def lambda_lookups() -> Dict[str, Callable[..., Any]]:
+    return {
+        "get_by_phone": crud_user.get_by_phone,
+        "loans_by_user": crud_loan.get_by_user_id,
+        "market_search": crud_market_loan.get_by_loan_type_and_amount_and_interest_rate_and_tenure,
+        "get_by_to_loan_id": crud_loan_request.get_by_to_loan_id,
+    }
+
+
+async def run(name: str, lookups: Dict[str, Callable[..., Any]], cache_size: int, users: List[Dict[str, Any]], iterations: int) -> None:
+    engine = create_async_engine(
+        settings.SQLALCHEMY_ASYNC_DATABASE_URL,
+        **pool_kwargs(is_async=True),
+        connect_args={"prepared_statement_cache_size": cache_size},
+    )
+    stats = StatementStats()
+    stats.attach(engine.sync_engine)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    latencies: Dict[str, List[float]] = {lookup: [] for lookup in lookups}
+    try:
+        async with sessions() as db:
+            for i in range(iterations):
+                user = users[i % len(users)]
+                args = {
+                    "get_by_phone": (user["phone_number"],),
+                    "loans_by_user": (user["id"],),
+                    "market_search": ("personal", 300000.0 + i % 100, 11.0, 24),
+                    "get_by_to_loan_id": (uuid.uuid4(),),
+                }
+                for lookup, function in lookups.items():
+                    start = time.perf_counter()
+                    await db.run_sync(function, *args[lookup])
+                    latencies[lookup].append(time.perf_counter() - start)
+                db.expunge_all()
+    finally:
+        await engine.dispose()
+
+    print(f"\n{name} (prepared statement cache {cache_size})")
+    for lookup, values in latencies.items():
+        print(f"  {lookup:>18}: p50 {statistics.median(values) * 1000:.3f}ms end to end")
+    for entry in stats.snapshot(top=len(lookups)):
+        print(f"  {entry['mean_ms']:>8.3f}ms driver  {entry['compiled_cache_hits']}/{entry['calls']} compiled cache hits  {entry['statement'][:70]!r}")
+
+
+def seed(count: int) -> List[Dict[str, Any]]:
+    user_infos = make_user_infos(count, 9)
+    store_bulk(user_infos, batch_size=500)
+    db = SessionLocal()
+    try:
+        db.execute(insert(MarketLoan), [
+            {"lender_name": BENCH_LENDER, "loan_type": "Personal Loan", "roi_start": 9.0 + i / 10, "roi_end": 16.0,
+             "min_loan_amount": 50000.0, "max_loan_amount": 2000000.0, "tenure_upto": 60, "status": True}
+            for i in range(50)
+        ])
+        db.commit()
+        return [
+            {"id": user.id, "phone_number": user.phone_number}
+            for user in (crud_user.get_by_email(db, user_info.user.email) for user_info in user_infos)
+        ]
+    finally:
+        db.close()
+
+
+def remove_market_loans() -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(MarketLoan).where(MarketLoan.lender_name == BENCH_LENDER))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    create_tables()
+    cleanup()
+    remove_market_loans()
+    try:
+        users = seed(args.users)
+        asyncio.run(run("query", query_lookups(), 0, users, args.iterations))
+        asyncio.run(run("prepared", query_lookups(), settings.DB_PREPARED_STATEMENT_CACHE_SIZE, users, args.iterations))
+        asyncio.run(run("lambda", lambda_lookups(), settings.DB_PREPARED_STATEMENT_CACHE_SIZE, users, args.iterations))
+    finally:
+        cleanup()
+        remove_market_loans()
+
+
+if __name__ == "__main__":
+    main()
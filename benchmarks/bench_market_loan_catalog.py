@@ -0,0 +1,123 @@
+"""Benchmark the market loan search: the SQL query vs the in-memory MarketLoanCatalog.
+
+Seeds synthetic market loans into a scratch copy of ``market_loans`` and runs
+the same random searches through
+``CRUDMarketLoan.get_by_loan_type_and_amount_and_interest_rate_and_tenure`` and
+``MarketLoanCatalog.search``, checking that both return the same loans. Then
+commits a write to the table and checks that the catalog is rebuilt. Prints
+the latency per search and the catalog build time, and drops the scratch
+schema afterwards. Usage:
+
+    python -m benchmarks.bench_market_loan_catalog --loans 2000 --searches 5000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.crud.crud_market_loan import market_loan as crud_market_loan
+from app.database.models import MarketLoan
+from app.database.session import create_tables, engine
+from app.services.market_loan_catalog import market_loan_catalog
+
+SCHEMA = "bench_catalog"
+LOAN_TYPES = ["Personal Loan", "Star Personal Loan", "Home Loan", "Car Loan", "Business Loan", "Gold Loan"]
+LENDERS = ["ICICI Bank", "HDFC Bank", "State Bank of India (SBI)", "Axis Bank", "Kotak Mahindra Bank", "Bajaj Finserv"]
+QUERY_TYPES = ["personal", "Personal Loan", "home", "car", "business", "loan", "education"]
+
+
+def scratch_session() -> Session:
+    return Session(bind=engine.execution_options(schema_translate_map={None: SCHEMA}), expire_on_commit=False)
+
+
+def seed(count: int) -> None:
+    # Distinct roi_start values, so the five cheapest loans are the same in both searches
+    roi_starts = [8.0 + i / 1000 for i in range(count)]
+    random.shuffle(roi_starts)
+    loans: List[Dict[str, Any]] = []
+    for roi_start in roi_starts:
+        min_loan_amount = random.choice([10000, 25000, 50000, 100000, 500000])
+        loans.append({
+            "lender_name": random.choice(LENDERS), "loan_type": random.choice(LOAN_TYPES),
+            "roi_start": roi_start, "roi_end": roi_start + random.uniform(1, 8),
+            "min_loan_amount": min_loan_amount, "max_loan_amount": min_loan_amount * random.choice([10, 40, 100]),
+            "tenure_upto": random.randint(1, 30), "loan_tags": ["Bench"], "status": True,
+            "processing_fee": random.uniform(0, 3), "prepayment_penalty": random.uniform(0, 4),
+        })
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.market_loans (LIKE public.market_loans INCLUDING ALL)"))
+    db = scratch_session()
+    try:
+        db.execute(insert(MarketLoan), loans)
+        db.commit()
+    finally:
+        db.close()
+
+
+def make_searches(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "loan_type": random.choice(QUERY_TYPES), "amount": random.choice([20000, 75000, 300000, 1500000, 8000000]),
+            "interest_rate": round(random.uniform(8, 16), 2), "tenure": random.randint(1, 20),
+            "lender_name": random.choice([None, None, None, "bank", "hdfc"]),
+        }
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=2000)
+    parser.add_argument("--searches", type=int, default=5000)
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.loans)
+    searches = make_searches(args.searches)
+    # The catalog singleton, so the commit events invalidate it, reading the scratch table
+    market_loan_catalog.session_factory = scratch_session
+    market_loan_catalog.invalidate()
+    db = scratch_session()
+    try:
+        start = time.perf_counter()
+        catalog = market_loan_catalog.get()
+        build_seconds = time.perf_counter() - start
+
+        sql_times, catalog_times, mismatches, found = [], [], 0, 0
+        for search in searches:
+            start = time.perf_counter()
+            expected = crud_market_loan.get_by_loan_type_and_amount_and_interest_rate_and_tenure(db, **search)
+            sql_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            actual = market_loan_catalog.get().search(**search)
+            catalog_times.append(time.perf_counter() - start)
+            found += bool(actual)
+            if [loan.id for loan in expected] != [loan.id for loan in actual]:
+                mismatches += 1
+
+        db.add(MarketLoan(lender_name="Bench Lender", loan_type="Education Loan", roi_start=1.0, roi_end=20.0,
+                          min_loan_amount=0, max_loan_amount=10**8, tenure_upto=30))
+        db.commit()
+        rebuilt = market_loan_catalog.get()
+        new_loan = rebuilt.search("education", 100000, 10.0, 5)
+    finally:
+        db.close()
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    print(f"{args.loans} loans, {args.searches} searches, {found} with results")
+    print(f"  catalog build:  {build_seconds * 1000:.1f}ms")
+    print(f"  sql search:     p50 {statistics.median(sql_times) * 10**6:,.1f}us  p99 {statistics.quantiles(sql_times, n=100)[98] * 10**6:,.1f}us")
+    print(f"  catalog search: p50 {statistics.median(catalog_times) * 10**6:,.1f}us  p99 {statistics.quantiles(catalog_times, n=100)[98] * 10**6:,.1f}us")
+    print(f"  mismatches:     {mismatches}")
+    print(f"  rebuilt after commit: version {catalog.version} -> {rebuilt.version}, new loan found: {bool(new_loan)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark the market loan catalog importer on a large generated catalog.
+
+Writes a catalog of synthetic offers in the given format, imports it into a
+scratch copy of ``market_loans`` with ``MarketLoanImportService.import_catalog``,
+then imports a second version of it with some offers changed, removed and
+added. Prints the offers per second, the diff counts and the peak memory of
+the process after each import, which stays flat as the catalog grows. Drops the
+scratch schema afterwards. Usage:
+
+    python -m benchmarks.bench_market_loan_import --offers 100000 --format ndjson
+"""
+import argparse
+import csv
+import json
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.session import create_tables, engine
+from app.services.market_loan_import_service import FORMATS, market_loan_import_service
+
+SCHEMA = "bench_import"
+LOAN_TYPES = ["Personal Loan", "Home Loan", "Car Loan", "Business Loan", "Gold Loan", "Education Loan"]
+
+
+def make_offers(count: int, version: int) -> Iterator[Dict[str, Any]]:
+    """Offers in provider formats. Version 2 changes 10% of them, drops 5% and adds 5% new ones."""
+    rng = random.Random(0)
+    for i in range(count):
+        roi_start = round(rng.uniform(8, 18), 2)
+        offer = {
+            "lender_name": f"Lender {i // len(LOAN_TYPES)}", "loan_type": LOAN_TYPES[i % len(LOAN_TYPES)],
+            "roi_start": f"{roi_start}%", "roi_end": round(roi_start + rng.uniform(0, 8), 2),
+            "min_loan_amount": "₹50,000", "max_loan_amount": f"{rng.randint(5, 50)} Lakh",
+            "tenure_upto": rng.choice(["Upto 5 Years", "84 months", 3]), "loan_tags": ["Bench", f"Tag {i % 7}"],
+            "status": True, "processing_fee": rng.choice(["Nil", "1%", "Up to 2.5%"]), "prepayment_penalty": 0,
+            "offer_valid_till": rng.choice(["2027-03-31", "31/03/2027", "Ongoing"]), "eligibility_criteria": "21-60 years",
+        }
+        if version == 2 and i % 20 == 0:
+            continue
+        if version == 2 and i % 10 == 1:
+            offer["processing_fee"] = "0.5%"
+        yield offer
+    if version == 2:
+        for i in range(count // 20):
+            yield {"lender_name": f"New Lender {i}", "loan_type": "Personal Loan", "roi_start": 11, "roi_end": 14,
+                   "min_loan_amount": 10000, "max_loan_amount": 500000, "tenure_upto": "Upto 4 Years"}
+
+
+def write_catalog(path: Path, format: str, offers: Iterator[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if format == "csv":
+            writer = None
+            for offer in offers:
+                offer = {**offer, "loan_tags": "|".join(offer.get("loan_tags", []))}
+                if writer is None:
+                    writer = csv.DictWriter(file, fieldnames=list(offer), extrasaction="ignore", restval="")
+                    writer.writeheader()
+                writer.writerow(offer)
+        elif format == "ndjson":
+            for offer in offers:
+                file.write(json.dumps(offer, ensure_ascii=False) + "\n")
+        else:
+            file.write("[\n")
+            for i, offer in enumerate(offers):
+                file.write(("," if i else "") + json.dumps(offer, ensure_ascii=False, indent=2) + "\n")
+            file.write("]\n")
+
+
+def run(path: Path, format: str, scratch: Any) -> Dict[str, Any]:
+    db = Session(bind=scratch)
+    try:
+        start = time.perf_counter()
+        with open(path, "rb") as file:
+            result = market_loan_import_service.import_catalog(db, file, format)
+        seconds = time.perf_counter() - start
+    finally:
+        db.close()
+    # Kilobytes on Linux; the catalog is generated and written one offer at a time, so only an import can raise it
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {**result.to_dict(), "seconds": seconds, "max_rss_mib": max_rss}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=100000)
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    args = parser.parse_args()
+
+    create_tables()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.market_loans (LIKE public.market_loans INCLUDING ALL)"))
+    # The importer's SQL names market_loans unqualified, resolve it to the scratch copy
+    scratch = create_engine(settings.SQLALCHEMY_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for version in (1, 2):
+                path = Path(directory) / f"catalog_v{version}.{args.format}"
+                write_catalog(path, args.format, make_offers(args.offers, version))
+                result = run(path, args.format, scratch)
+                print(
+                    f"v{version}: {result['offers_read']:,} offers in {result['seconds']:.1f}s "
+                    f"({result['offers_read'] / result['seconds']:,.0f}/s), max RSS {result['max_rss_mib']:.0f} MiB, "
+                    f"{result['offers_invalid']} invalid, {result['inserted']:,} inserted, {result['updated']:,} updated, "
+                    f"{result['deleted']:,} deleted, {result['unchanged']:,} unchanged"
+                )
+    finally:
+        scratch.dispose()
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark the refinance engine on a matrix of synthetic loans and market offers.
+
+Builds random loans and offers, times ``refinance`` plus ``RefinanceMatrix.top``
+over the whole (loans x offers) matrix, and checks a sample of loans against a
+plain Python loop over every pair, which is also timed to show the speed-up.
+Needs no database. Usage:
+
+    python -m benchmarks.bench_refinance_engine --loans 10000 --offers 100
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from app.services.refinance_engine import NEVER, LoanTerms, OfferTerms, refinance
+
+LOAN_TYPES = ["Personal Loan", "Home Loan", "Car Loan", "Business Loan", "Gold Loan"]
+TODAY = date(2026, 1, 1)
+
+
+def scalar_emi(principal: float, annual_rate: float, months: float) -> float:
+    rate = annual_rate / 1200
+    if rate == 0:
+        return principal / months
+    growth = (1 + rate) ** months
+    return principal * rate * growth / (growth - 1)
+
+
+def make_loans(count: int) -> List[Any]:
+    loans = []
+    for _ in range(count):
+        tenure = random.choice([12, 24, 36, 60, 120, 240])
+        balance = random.uniform(20_000, 5_000_000)
+        rate = random.uniform(8, 24)
+        loans.append(SimpleNamespace(
+            current_balance=balance, interest_rate=rate, tenure_months=tenure,
+            emi_amount=scalar_emi(balance, rate, random.randint(6, tenure)) if random.random() < 0.8 else None,
+            open_date=date(random.randint(2018, 2025), random.randint(1, 12), 1),
+            prepayment_penalty=random.choice([0, 2, 4]), loan_type=random.choice(LOAN_TYPES).split()[0],
+        ))
+    return loans
+
+
+def make_offers(count: int) -> List[Any]:
+    offers = []
+    for _ in range(count):
+        min_amount = random.choice([10_000, 50_000, 100_000])
+        offers.append(SimpleNamespace(
+            roi_start=random.uniform(7, 20), processing_fee=random.uniform(0, 3), tenure_upto=random.randint(1, 30),
+            min_loan_amount=min_amount, max_loan_amount=min_amount * random.choice([20, 50, 100]),
+            loan_type=random.choice(LOAN_TYPES),
+        ))
+    return offers
+
+
+def scalar_best(loans: LoanTerms, offers: List[Any], i: int) -> List[Tuple[int, float, int]]:
+    """The positive net savings and break-even month of loan ``i`` with every offer, one pair at a time."""
+    balance, months, current_emi = loans.balance[i], loans.months[i], loans.emi[i]
+    results = []
+    for j, offer in enumerate(offers):
+        loan_type = (loans.loan_type[i] or "").lower()
+        if loan_type not in offer.loan_type.lower() or not offer.min_loan_amount <= balance <= offer.max_loan_amount:
+            continue
+        new_months = min(months, offer.tenure_upto * 12)
+        new_emi = scalar_emi(balance, offer.roi_start, new_months)
+        upfront_cost = balance * (offer.processing_fee + loans.foreclosure_penalty[i]) / 100
+        net_savings = current_emi * months - new_emi * new_months - upfront_cost
+        monthly_savings = current_emi - new_emi
+        break_even = max(math.ceil(upfront_cost / monthly_savings), 1) if monthly_savings > 0 else NEVER
+        if break_even > new_months:
+            break_even = NEVER
+        if net_savings > 0:
+            results.append((j, net_savings, break_even))
+    return sorted(results, key=lambda result: -result[1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=10000)
+    parser.add_argument("--offers", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--check", type=int, default=200, help="Loans checked against the Python loop")
+    args = parser.parse_args()
+    random.seed(7)
+
+    loans, offers = make_loans(args.loans), make_offers(args.offers)
+    started = time.perf_counter()
+    loan_terms, offer_terms = LoanTerms.from_loans(loans, today=TODAY), OfferTerms.from_offers(offers)
+    terms_seconds = time.perf_counter() - started
+
+    times = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        matrix = refinance(loan_terms, offer_terms)
+        best = matrix.top(args.top_k)
+        times.append(time.perf_counter() - started)
+
+    mismatches = 0
+    started = time.perf_counter()
+    for i in range(min(args.check, args.loans)):
+        expected = scalar_best(loan_terms, offers, i)[:args.top_k]
+        got = [j for j in best[i] if j >= 0]
+        if [j for j, _, _ in expected] != got or any(
+            not math.isclose(matrix.net_savings[i, j], savings, rel_tol=1e-9, abs_tol=1e-6) or matrix.break_even_month[i, j] != break_even
+            for j, savings, break_even in expected
+        ):
+            mismatches += 1
+    scalar_seconds = (time.perf_counter() - started) / max(min(args.check, args.loans), 1) * args.loans
+
+    print(f"{args.loans} loans x {args.offers} offers, top {args.top_k}, {int((best >= 0).any(axis=1).sum())} loans with a saving offer")
+    print(f"  terms from rows:  {terms_seconds * 1000:,.1f}ms")
+    print(f"  matrix + top-k:   p50 {statistics.median(times) * 1000:,.1f}ms  min {min(times) * 1000:,.1f}ms  ({np.prod(matrix.net_savings.shape) / statistics.median(times) / 10**6:,.1f}M pairs/s)")
+    print(f"  python loop:      {scalar_seconds * 1000:,.1f}ms (extrapolated from {min(args.check, args.loans)} loans)")
+    print(f"  mismatches:       {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark the refinance precompute job on a scratch portfolio.
+
+Seeds synthetic active loans and market offers into scratch copies of
+``loans``, ``market_loans`` and ``loan_refinance_opportunities``, then runs
+``RefinancePrecomputeService.precompute``:
+
+* a full run in one process and in ``--workers`` processes, one slice each
+* an incremental run after touching 1% of the loans, which scores only those
+* a run with nothing changed, which scores nothing
+* a run after changing one offer, which scores every loan again
+
+Prints the loans scored and the loans per second of each run, and drops the
+scratch schema afterwards. Usage:
+
+    python -m benchmarks.bench_refinance_precompute --loans 100000 --offers 100 --workers 4
+"""
+import argparse
+import multiprocessing
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.models import Loan, MarketLoan
+from app.database.session import create_tables, engine
+from app.services.market_loan_catalog import MarketLoanCatalogCache
+from app.services.refinance_precompute_service import PrecomputeResult, refinance_precompute_service
+
+SCHEMA = "bench_precompute"
+LOAN_TYPES = ["Personal Loan", "Home Loan", "Car Loan", "Business Loan", "Gold Loan"]
+
+
+def scratch_engine() -> Any:
+    # The job's SQL names its tables unqualified, resolve them to the scratch copies
+    return create_engine(settings.SQLALCHEMY_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+
+
+def seed(loans: int, offers: int) -> None:
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        for table in ("loans", "market_loans", "loan_refinance_opportunities"):
+            conn.execute(text(f"CREATE TABLE {SCHEMA}.{table} (LIKE public.{table} INCLUDING ALL)"))
+    scratch = scratch_engine()
+    try:
+        with Session(bind=scratch) as db:
+            offer_rows = []
+            for _ in range(offers):
+                min_amount = rng.choice([10_000, 50_000, 100_000])
+                offer_rows.append({
+                    "lender_name": f"Lender {rng.randint(1, 40)}", "loan_type": rng.choice(LOAN_TYPES),
+                    "roi_start": rng.uniform(7, 20), "roi_end": 24, "tenure_upto": rng.randint(1, 30),
+                    "min_loan_amount": min_amount, "max_loan_amount": min_amount * rng.choice([20, 50, 100]),
+                    "processing_fee": rng.uniform(0, 3), "prepayment_penalty": 0, "status": True,
+                })
+            db.execute(insert(MarketLoan), offer_rows)
+            users = [uuid.uuid4() for _ in range(max(loans // 3, 1))]
+            for start in range(0, loans, 10_000):
+                rows: List[Dict[str, Any]] = []
+                for _ in range(start, min(start + 10_000, loans)):
+                    balance, rate, tenure = rng.uniform(20_000, 5_000_000), rng.uniform(8, 24), rng.choice([36, 60, 120, 240])
+                    rows.append({
+                        "user_id": rng.choice(users), "lender": "Bench Bank", "loan_type": rng.choice(LOAN_TYPES).split()[0],
+                        "current_balance": balance, "interest_rate": rate, "tenure_months": tenure,
+                        "emi_amount": round(balance * rate / 1200 / (1 - (1 + rate / 1200) ** -tenure)),
+                        "status": "active", "open_date": date(2024, 1, 1), "prepayment_penalty": rng.choice([0, 2]),
+                    })
+                db.execute(insert(Loan), rows)
+            db.commit()
+    finally:
+        scratch.dispose()
+
+
+def precompute_slice(partition: int, partitions: int) -> Dict[str, Any]:
+    """One worker: its own engine, catalog snapshot and slice of the loans."""
+    scratch = scratch_engine()
+    try:
+        catalog = MarketLoanCatalogCache(lambda: Session(bind=scratch), ttl=3600).get()
+        with Session(bind=scratch, expire_on_commit=False) as db:
+            return refinance_precompute_service.precompute(db, catalog, shard_ids=[0], partition=partition, partitions=partitions).to_dict()
+    finally:
+        scratch.dispose()
+
+
+def run(label: str, workers: int) -> PrecomputeResult:
+    start = time.perf_counter()
+    result = PrecomputeResult()
+    if workers <= 1:
+        result.add(PrecomputeResult(**precompute_slice(0, 1)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for slice_result in pool.map(precompute_slice, range(workers), [workers] * workers):
+                result.add(PrecomputeResult(**slice_result))
+    seconds = time.perf_counter() - start
+    print(f"  {label:<28} {result.scored:>9,} scored in {seconds:6.2f}s ({result.scored / seconds:>9,.0f}/s), {result.with_savings:,} with savings, {result.pages} pages")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=100000)
+    parser.add_argument("--offers", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.loans, args.offers)
+    try:
+        print(f"{args.loans:,} active loans x {args.offers} offers, top {settings.REFINANCE_PRECOMPUTE_TOP_K}, pages of {settings.REFINANCE_PRECOMPUTE_CHUNK_SIZE:,} loans per process")
+        run("full, 1 process", 1)
+        with engine.begin() as conn:
+            conn.execute(text(f"TRUNCATE {SCHEMA}.loan_refinance_opportunities"))
+        run(f"full, {args.workers} processes", args.workers)
+
+        with engine.begin() as conn:
+            conn.execute(text(f"UPDATE {SCHEMA}.loans SET interest_rate = interest_rate + 1, modified_at = timezone('utc', now()) WHERE random() < 0.01"))
+        run("1% of loans changed", args.workers)
+        run("nothing changed", args.workers)
+
+        with engine.begin() as conn:
+            conn.execute(text(f"UPDATE {SCHEMA}.market_loans SET roi_start = roi_start - 0.25, modified_at = timezone('utc', now()) WHERE id = (SELECT id FROM {SCHEMA}.market_loans ORDER BY id LIMIT 1)"))
+        run("one offer changed", args.workers)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark random uuid4 vs time-ordered UUIDv7 primary keys on insert-heavy paths.
+
+For each id kind, clones the user-owned tables into a scratch schema (columns,
+defaults and indexes, no foreign keys or triggers), then runs the real service
+code against the clones through ``schema_translate_map``:
+
+* bulk ingest: ``UserService.bulk_store_user_info_from_fi_mcp``
+* loan-request creation: ``LoanRequestService.create_loan_request``, one commit per request
+
+and reports throughput plus the pages of each primary key index. A B-tree only
+grows by splitting a page, so its page count is the number of page splits
+plus the metapage and first leaf. Random keys split pages all over the index
+and leave them half full. Time-ordered keys split only the rightmost leaf and
+keep the pages full. Drops the scratch schema afterwards. Usage:
+
+    python -m benchmarks.bench_time_ordered_ids --users 5000 --children 10 --requests 5000
+"""
+import argparse
+import random
+import time
+import uuid
+from typing import Dict, List
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.models import User
+from app.database.session import create_tables, engine
+from app.services.loan_request_service import loan_request_service
+from app.services.user_service import user_service
+from benchmarks.bench_bulk_ingest import make_user_infos
+
+SCHEMA = "bench_ids"
+TABLES = ["users", "bank_accounts", "loans", "investments", "loan_requests", "loan_request_keys"]
+
+
+def reset_schema() -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        for table in TABLES:
+            conn.execute(text(f"CREATE TABLE {SCHEMA}.{table} (LIKE public.{table} INCLUDING ALL)"))
+
+
+def drop_schema() -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+def scratch_session() -> Session:
+    return Session(bind=engine.execution_options(schema_translate_map={None: SCHEMA}), expire_on_commit=False)
+
+
+def primary_key_pages() -> Dict[str, int]:
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT t.relname, pg_relation_size(i.indexrelid) / current_setting('block_size')::int
+            FROM pg_index i
+            JOIN pg_class t ON t.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = :schema AND i.indisprimary
+        """), {"schema": SCHEMA})
+        return dict(rows.all())
+
+
+def run(time_ordered: bool, users: int, children: int, requests: int, batch_size: int) -> Dict[str, float]:
+    settings.DB_TIME_ORDERED_IDS = time_ordered
+    reset_schema()
+    user_infos = make_user_infos(users, children)
+    db = scratch_session()
+    try:
+        start = time.perf_counter()
+        user_service.bulk_store_user_info_from_fi_mcp(db, user_infos, batch_size=batch_size)
+        ingest_seconds = time.perf_counter() - start
+
+        user_ids: List[uuid.UUID] = list(db.scalars(select(User.id)))
+        start = time.perf_counter()
+        for _ in range(requests):
+            loan_request_service.create_loan_request(db, random.choice(user_ids), "new_loan", "personal", None, uuid.uuid4())
+        request_seconds = time.perf_counter() - start
+    finally:
+        db.close()
+    return {
+        "ingest_users_per_second": users / ingest_seconds,
+        "loan_requests_per_second": requests / request_seconds,
+        **primary_key_pages(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--children", type=int, default=10, help="bank accounts + loans + investments per user")
+    parser.add_argument("--requests", type=int, default=5000, help="loan requests created one commit at a time")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    create_tables()
+    configured = settings.DB_TIME_ORDERED_IDS
+    results = {}
+    try:
+        for name, time_ordered in (("uuid4", False), ("uuid7", True)):
+            results[name] = run(time_ordered, args.users, args.children, args.requests, args.batch_size)
+    finally:
+        settings.DB_TIME_ORDERED_IDS = configured
+        drop_schema()
+
+    print(f"{'':>26} {'uuid4':>10} {'uuid7':>10}")
+    print(f"{'ingest users/s':>26} {results['uuid4']['ingest_users_per_second']:>10,.1f} {results['uuid7']['ingest_users_per_second']:>10,.1f}")
+    print(f"{'loan requests/s':>26} {results['uuid4']['loan_requests_per_second']:>10,.1f} {results['uuid7']['loan_requests_per_second']:>10,.1f}")
+    for table in TABLES:
+        print(f"{table + ' pk pages':>26} {results['uuid4'][table]:>10,} {results['uuid7'][table]:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark user aggregate loading: lazy relationship loads vs one JSON-aggregating SELECT.
+
+Runs against the database configured in settings and removes the users it
+creates. Usage:
+
+    python -m benchmarks.bench_user_aggregate --users 50 --children 30 --iterations 200
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.crud.crud_user import user as crud_user
+from app.database.session import SessionLocal, create_tables, engine
+from app.services.user_service import user_service
+from benchmarks.bench_bulk_ingest import cleanup, make_user_infos, store_bulk
+
+
+def load_lazy(db: Any, phone_number: str) -> Optional[Dict[str, Any]]:
+    """The previous read path: look up the user, then lazy load each relationship."""
+    user = crud_user.get_by_phone(db, phone_number)
+    if not user:
+        return None
+    user = crud_user.get(db, user.id)
+    return {
+        "user": user.to_dict(),
+        "bank_accounts": [bank_account.to_dict() for bank_account in user.bank_accounts],
+        "loans": [loan.to_dict() for loan in user.loans],
+        "investments": [investment.to_dict() for investment in user.investments],
+    }
+
+
+def load_aggregate(db: Any, phone_number: str) -> Optional[Dict[str, Any]]:
+    return user_service.get_user_details_by_phone(db, phone_number)
+
+
+def run(name: str, load: Callable[[Any, str], Any], phone_numbers: List[str], iterations: int) -> None:
+    statements = 0
+
+    def count(*_: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    latencies = []
+    try:
+        for i in range(iterations):
+            # A fresh session per request, as the endpoints get, so nothing is served from the identity map
+            db = SessionLocal()
+            try:
+                start = time.perf_counter()
+                load(db, phone_numbers[i % len(phone_numbers)])
+                latencies.append(time.perf_counter() - start)
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:>9}: {statements / iterations:.1f} round trips/request, "
+        f"p50 {statistics.median(latencies) * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--children", type=int, default=30, help="bank accounts + loans + investments per user")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    cleanup()
+    try:
+        user_infos = make_user_infos(args.users, args.children)
+        store_bulk(user_infos, batch_size=500)
+        phone_numbers = [user_info.user.phone_number for user_info in user_infos]
+
+        db = SessionLocal()
+        try:
+            assert load_lazy(db, phone_numbers[0]) == load_aggregate(db, phone_numbers[0])
+        finally:
+            db.close()
+
+        run("lazy", load_lazy, phone_numbers, args.iterations)
+        run("aggregate", load_aggregate, phone_numbers, args.iterations)
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
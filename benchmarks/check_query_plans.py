@@ -0,0 +1,222 @@
+"""Query-plan regression check: every CRUD hot path must be served by an index.
+
+Seeds synthetic users, ANALYZEs the tables, then runs each read path below
+inside a transaction that is rolled back, captures the SQL it sends and
+EXPLAINs every statement with ``enable_seqscan = off``. The planner then only
+falls back to a sequential scan when no index can serve the query, so a path
+fails when its plan contains
+
+* a ``Seq Scan`` on an application table or one of its partitions, or
+* a full scan of a non-partial index, i.e. an index node without an
+  ``Index Cond`` that is not just feeding a ``LIMIT`` in index order.
+
+Either means an index is missing or a query stopped matching one (e.g. a
+partial index predicate). Exits with status 1 if any path regresses, so it can
+gate CI after migrations. Removes the users it creates. Usage:
+
+    python -m benchmarks.check_query_plans --users 2000 --verbose
+"""
+import argparse
+import json
+import sys
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.uuid_utils import uuid7
+from app.crud.crud_bank_account import bank_account as crud_bank_account
+from app.crud.crud_investment import investment as crud_investment
+from app.crud.crud_loan import loan as crud_loan
+from app.crud.crud_loan_request import loan_request as crud_loan_request
+from app.crud.crud_market_loan import market_loan as crud_market_loan
+from app.crud.crud_pagination import encode_cursor
+from app.crud.crud_user import user as crud_user
+from app.database.migrations import run_migrations
+from app.database.session import SessionLocal, create_tables, engine
+from benchmarks.bench_bulk_ingest import cleanup, make_user_infos, store_bulk
+
+# Tables that must never be read with a sequential scan
+CHECKED_TABLES = {
+    "users", "user_financial_summaries", "loans", "bank_accounts", "investments", "loan_requests", "market_loans",
+}
+
+
+
+class Sample:
+    """Keys of one seeded user, so every lookup hits real rows."""
+    user_id: uuid.UUID = uuid.uuid4()
+    email: str = ""
+    phone_number: str = ""
+    loan_id: str = ""
+    account_number: str = ""
+    investment_id: str = ""
+    cursor: str = encode_cursor(datetime(2024, 1, 1), uuid.uuid4())
+
+
+HOT_PATHS: List[Tuple[str, Callable[[Session], Any]]] = [
+    ("user.get", lambda db: crud_user.get(db, Sample.user_id)),
+    ("user.get_by_email", lambda db: crud_user.get_by_email(db, Sample.email)),
+    ("user.get_by_phone", lambda db: crud_user.get_by_phone(db, Sample.phone_number)),
+    ("user.get_aggregate_by_phone", lambda db: crud_user.get_aggregate_by_phone(db, Sample.phone_number)),
+    ("user.get_financial_summary", lambda db: crud_user.get_financial_summary(db, Sample.user_id)),
+    ("user.get_multi", lambda db: crud_user.get_multi(db, cursor=Sample.cursor, limit=50)),
+    ("user.get_multi[full_name__prefix]", lambda db: crud_user.get_multi(db, filters={"full_name__prefix": "ra"})),
+    ("user.get_multi[full_name__contains]", lambda db: crud_user.get_multi(db, filters={"full_name__contains": "ram"})),
+    ("loan.get_by_user_id", lambda db: crud_loan.get_by_user_id(db, Sample.user_id)),
+    ("loan.get_by_loan_id", lambda db: crud_loan.get_by_loan_id(db, Sample.loan_id)),
+    ("loan.get_active_loans_by_user", lambda db: crud_loan.get_active_loans_by_user(db, Sample.user_id)),
+    ("loan.get_totals_by_user", lambda db: crud_loan.get_totals_by_user(db, Sample.user_id, group_by=("lender", "status"))),
+    ("loan.get_analytics_by_user", lambda db: crud_loan.get_analytics_by_user(db, Sample.user_id)),
+    ("loan.get_overdue_loans", lambda db: crud_loan.get_overdue_loans(db)),
+    ("loan.get_multi[user_id]", lambda db: crud_loan.get_multi(db, cursor=Sample.cursor, filters={"user_id": Sample.user_id})),
+    ("loan.get_multi[status]", lambda db: crud_loan.get_multi(db, filters={"status": "active"})),
+    ("bank_account.get_by_user_id", lambda db: crud_bank_account.get_by_user_id(db, Sample.user_id)),
+    ("bank_account.get_by_account_number", lambda db: crud_bank_account.get_by_account_number(db, Sample.account_number)),
+    ("bank_account.get_totals_by_user", lambda db: crud_bank_account.get_totals_by_user(db, Sample.user_id, group_by=("bank_name",))),
+    ("bank_account.get_multi[user_id]", lambda db: crud_bank_account.get_multi(db, filters={"user_id": Sample.user_id})),
+    ("investment.get_by_user_id", lambda db: crud_investment.get_by_user_id(db, Sample.user_id)),
+    ("investment.get_by_investment_id", lambda db: crud_investment.get_by_investment_id(db, Sample.investment_id)),
+    ("investment.get_analytics_by_user", lambda db: crud_investment.get_analytics_by_user(db, Sample.user_id)),
+    ("investment.get_matured_investments", lambda db: crud_investment.get_matured_investments(db)),
+    ("investment.get_investments_by_date_range", lambda db: crud_investment.get_investments_by_date_range(
+        db, datetime(2024, 1, 1), datetime(2024, 3, 31),
+    )),
+    ("investment.get_multi[user_id]", lambda db: crud_investment.get_multi(db, filters={"user_id": Sample.user_id})),
+    ("loan_request.get", lambda db: crud_loan_request.get(db, uuid7())),
+    ("loan_request.get_by_user_id", lambda db: crud_loan_request.get_by_user_id(db, Sample.user_id)),
+    ("loan_request.get_by_status[pending]", lambda db: crud_loan_request.get_by_status(db, "pending")),
+    ("loan_request.get_by_from_loan_id", lambda db: crud_loan_request.get_by_from_loan_id(db, uuid.uuid4())),
+    ("loan_request.get_by_to_loan_id", lambda db: crud_loan_request.get_by_to_loan_id(db, uuid.uuid4())),
+    ("loan_request.get_multi[status]", lambda db: crud_loan_request.get_multi(db, filters={"status": "pending"})),
+    ("market_loan.search", lambda db: crud_market_loan.get_by_loan_type_and_amount_and_interest_rate_and_tenure(
+        db, "personal", 500000, 11.5, 36, lender_name="hdfc",
+    )),
+]
+
+
+def plan_nodes(plan: Dict[str, Any], parent: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    yield plan, parent
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child, plan)
+
+
+def is_full_scan(node: Dict[str, Any], parent: Optional[Dict[str, Any]], partial_indexes: Set[str], relations: Set[str]) -> bool:
+    if node["Node Type"] == "Seq Scan":
+        return node.get("Relation Name") in relations
+    if "Index Name" not in node or "Index Cond" in node or node["Index Name"] in partial_indexes:
+        return False
+    # Walking an index in order to stop after LIMIT rows is how keyset first pages are meant to run
+    return not (parent is not None and parent["Node Type"] == "Limit")
+
+
+def check(name: str, path: Callable[[Session], Any], partial_indexes: Set[str], relations: Set[str]) -> Tuple[List[str], List[str]]:
+    """Run one hot path and EXPLAIN the statements it sent.
+
+    Returns:
+        Tuple[List[str], List[str]]: The indexes used and the tables or indexes scanned in full.
+    """
+    statements: List[Tuple[str, Any]] = []
+
+    def capture(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    db = SessionLocal()
+    try:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            path(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        indexes, full_scans = [], []
+        # A raw DB-API cursor, so the EXPLAINs are not captured themselves
+        cursor = db.connection().connection.cursor()
+        for statement, parameters in statements:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for node, parent in plan_nodes(plan[0]["Plan"]):
+                if "Index Name" in node:
+                    indexes.append(node["Index Name"])
+                if is_full_scan(node, parent, partial_indexes, relations):
+                    full_scans.append(f"{node['Node Type']} on {node.get('Index Name') or node['Relation Name']}")
+        if not statements:
+            raise RuntimeError(f"{name} sent no SELECT statements")
+        return indexes, full_scans
+    finally:
+        db.rollback()
+        db.close()
+
+
+def seed(users: int) -> None:
+    user_infos = make_user_infos(users, children=9)
+    store_bulk(user_infos, batch_size=500)
+    sample = user_infos[users // 2]
+    Sample.email = sample.user.email
+    Sample.phone_number = sample.user.phone_number
+    Sample.loan_id = sample.loans[0].loan_id
+    Sample.account_number = sample.bank_accounts[0].account_number
+    Sample.investment_id = sample.investments[0].investment_id
+
+    db = SessionLocal()
+    try:
+        Sample.user_id = crud_user.get_by_phone(db, Sample.phone_number).id
+        db.commit()
+    finally:
+        db.close()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in sorted(CHECKED_TABLES):
+            conn.execute(text(f"ANALYZE {table}"))
+
+
+def partial_index_names() -> Set[str]:
+    with engine.connect() as conn:
+        return set(conn.scalars(text("SELECT indexrelid::regclass::text FROM pg_index WHERE indpred IS NOT NULL")))
+
+
+def checked_relations() -> Set[str]:
+    """The checked tables and their partitions, which plans name instead of the partitioned table."""
+    with engine.connect() as conn:
+        partitions = conn.scalars(
+            text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent::regclass::text = ANY(:tables)"),
+            {"tables": sorted(CHECKED_TABLES)},
+        )
+        return CHECKED_TABLES | set(partitions)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000, help="synthetic users to seed, 9 child rows each")
+    parser.add_argument("--verbose", action="store_true", help="also print the indexes each path uses")
+    args = parser.parse_args()
+
+    create_tables()
+    run_migrations(engine)
+    cleanup()
+    try:
+        seed(args.users)
+        partial_indexes = partial_index_names()
+        relations = checked_relations()
+        failures = 0
+        for name, path in HOT_PATHS:
+            indexes, full_scans = check(name, path, partial_indexes, relations)
+            if full_scans:
+                failures += 1
+                print(f"FAIL {name}: {', '.join(dict.fromkeys(full_scans))}")
+            else:
+                print(f"ok   {name}" + (f": {', '.join(dict.fromkeys(indexes))}" if args.verbose else ""))
+    finally:
+        cleanup()
+
+    print(f"{len(HOT_PATHS) - failures}/{len(HOT_PATHS)} hot paths served by indexes")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
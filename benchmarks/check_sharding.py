@@ -0,0 +1,112 @@
+"""Sharding check: every user's rows live on, and are read from, the shard of their phone number.
+
+Needs ``POSTGRES_SHARDS`` to list at least one database next to the primary,
+e.g. two local databases:
+
+    createdb sahiloan_1 && createdb sahiloan_2
+    POSTGRES_SHARDS='["sahiloan_1", "sahiloan_2"]' python -m benchmarks.check_sharding --users 300
+
+Ingests synthetic users, then checks on every shard that each user, loan,
+bank account and investment row carries that shard's number in its id and
+belongs to a user whose phone number hashes to it, and that per-user lookups
+run on exactly one shard. Exits with status 1 on any misplaced row or
+misrouted lookup. Removes the users it creates.
+"""
+import argparse
+import sys
+from typing import Any, Callable, List, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.crud.crud_bank_account import bank_account as crud_bank_account
+from app.crud.crud_loan import loan as crud_loan
+from app.crud.crud_user import user as crud_user
+from app.database.models import BankAccount, Investment, Loan, User
+from app.database.session import SessionLocal, create_tables, shard_engines, shard_router, sharded
+from app.services.user_service import user_service
+from benchmarks.bench_bulk_ingest import EMAIL_DOMAIN, cleanup, make_user_infos
+
+
+def misplaced_rows(shard_id: int) -> List[str]:
+    """The rows on a shard that belong to another shard."""
+    problems = []
+    with Session(shard_engines[shard_id]) as db:
+        users = db.execute(select(User.id, User.phone_number).where(User.email.like(f"%@{EMAIL_DOMAIN}"))).all()
+        for user_id, phone_number in users:
+            if shard_router.shard_for_phone(phone_number) != shard_id or shard_router.shard_for_id(user_id) != shard_id:
+                problems.append(f"user {user_id} ({phone_number})")
+        user_ids = [user_id for user_id, _ in users]
+        for model in (BankAccount, Loan, Investment):
+            for row_id in db.scalars(select(model.id).where(model.user_id.in_(user_ids))):
+                if shard_router.shard_for_id(row_id) != shard_id:
+                    problems.append(f"{model.__tablename__} {row_id}")
+    return problems
+
+
+def shards_used(path: Callable[[Session], Any]) -> Set[int]:
+    """The shards a lookup sends statements to."""
+    used: Set[int] = set()
+    listeners = [(shard, lambda *args, shard_id=i: used.add(shard_id)) for i, shard in enumerate(shard_engines)]
+    for shard, listener in listeners:
+        event.listen(shard, "before_cursor_execute", listener)
+    db = SessionLocal()
+    try:
+        path(db)
+    finally:
+        db.close()
+        for shard, listener in listeners:
+            event.remove(shard, "before_cursor_execute", listener)
+    return used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    args = parser.parse_args()
+    if not sharded:
+        sys.exit("POSTGRES_SHARDS is empty, there is only one database")
+
+    create_tables()
+    cleanup()
+    failures = 0
+    try:
+        user_infos = make_user_infos(args.users, children=3)
+        db = SessionLocal()
+        try:
+            user_service.bulk_store_user_info_from_fi_mcp(db, user_infos)
+        finally:
+            db.close()
+
+        for shard_id, shard in enumerate(shard_engines):
+            problems = misplaced_rows(shard_id)
+            failures += len(problems)
+            print(f"{'FAIL' if problems else 'ok  '} shard {shard_id} ({shard.url.database}): {', '.join(problems[:5]) or 'all rows in place'}")
+
+        sample = user_infos[0].user
+        expected = shard_router.shard_for_phone(sample.phone_number)
+        db = SessionLocal()
+        try:
+            user_id = crud_user.get_by_phone(db, sample.phone_number).id
+        finally:
+            db.close()
+        lookups: List[Tuple[str, Callable[[Session], Any]]] = [
+            ("user.get_by_phone", lambda db: crud_user.get_by_phone(db, sample.phone_number)),
+            ("user.get_aggregate_by_phone", lambda db: crud_user.get_aggregate_by_phone(db, sample.phone_number)),
+            ("user.get", lambda db: crud_user.get(db, user_id)),
+            ("loan.get_by_user_id", lambda db: crud_loan.get_by_user_id(db, user_id)),
+            ("bank_account.get_by_user_id", lambda db: crud_bank_account.get_by_user_id(db, user_id)),
+        ]
+        for name, path in lookups:
+            used = shards_used(path)
+            if used != {expected}:
+                failures += 1
+            print(f"{'ok  ' if used == {expected} else 'FAIL'} {name}: shards {sorted(used)}, expected [{expected}]")
+    finally:
+        cleanup()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 
 
 import os 
+import asyncio
 from google.adk.sessions import InMemorySessionService, Session
 from google.adk.runners import Runner
 from app.adk import root_agent
@@ -13,7 +14,7 @@ from uuid import uuid4
 import uvicorn
 from dotenv import load_dotenv
 from app.adk.tools import get_user_details_tool
-from app.database.init_db import init_db
+from app.database.init_db import init_db, run_partition_maintenance
 from app.core.config import settings
 from google.adk.events import Event, EventActions
 import time
@@ -24,12 +25,16 @@ load_dotenv()
 class ApplicationState:
     def __init__(self):
         self.db = None
+        self.partition_maintenance = None
     
     async def initialize(self):
         init_db()
+        self.partition_maintenance = asyncio.create_task(run_partition_maintenance())
 
     async def shutdown(self):
         self.db = None
+        if self.partition_maintenance:
+            self.partition_maintenance.cancel()
 
 APP_NAME = "sahiloan_agent"
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -174,7 +179,7 @@ async def update_user_details_background(session: Session):
     """Background task to fetch and update user details"""
     try:
         logger.info(f"Getting user details for user: {session.user_id} in background...")
-        user_details = get_user_details_tool(session.user_id)
+        user_details = await get_user_details_tool(session.user_id)
         if user_details is None:
             logger.error(f"User details not found for user: {session.user_id}")
             return